@@ -0,0 +1,11 @@
+from .server import ApiServer
+from .models import ApiConfig
+from .feed import BuildFeed
+from .http import HttpError
+
+__all__ = [
+    "ApiServer",
+    "ApiConfig",
+    "BuildFeed",
+    "HttpError",
+]
@@ -0,0 +1,208 @@
+"""
+Module for fanning build status and output out to API clients.
+"""
+
+# Imports from standard library
+import asyncio
+import json
+from collections import OrderedDict, deque
+from dataclasses import asdict
+from typing import TYPE_CHECKING, Any, Deque, Dict, List, Optional, Set, Tuple
+
+
+if TYPE_CHECKING:
+
+    # Imports from services modules
+    from app.services.job_queue_service import Job
+
+
+# Queued event: (event name, event id, data), or None once the build ended
+Event = Optional[Tuple[str, Optional[int], str]]
+
+
+def job_to_dict(job: "Job") -> Dict[str, Any]:
+    """
+    JSON-ready view of a job.
+    """
+    data = asdict(job)
+    data["status"] = job.status.value
+    del data["worker"]
+    return data
+
+
+class Subscriber:
+    """
+    Client following one build.
+
+    When its queue overflows it is dropped from the build and `overflowed`
+    is set; the client should stop once it has drained the queue.
+    """
+
+    def __init__(self, size: int):
+        self.queue: "asyncio.Queue[Event]" = asyncio.Queue(size)
+        self.overflowed = False
+
+    def put(self, event: Event) -> bool:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            return False
+        return True
+
+
+class _Build:
+    def __init__(self, job: "Job", backlog_lines: int):
+        self.job = job_to_dict(job)
+        self.finished = job.status.finished
+        self.lines: Deque[Tuple[int, str]] = deque(maxlen=backlog_lines)
+        self.sequence = 0
+        self.subscribers: Set[Subscriber] = set()
+
+
+class BuildFeed:
+    """
+    In-memory status and recent output of builds, fed by the job queue.
+
+    Job queue listeners run on worker threads; `job_changed` and
+    `job_output` hand their arguments to the event loop, which owns all
+    state, so nothing here needs a lock. Every output line gets a sequence
+    number per build that clients use to resume. Only the last
+    `backlog_lines` lines are kept, for the `max_builds` most recently
+    updated builds.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        backlog_lines: int = 2000,
+        max_builds: int = 1000,
+        client_queue_size: int = 1000,
+    ):
+        self._loop = loop
+        self._backlog_lines = backlog_lines
+        self._max_builds = max_builds
+        self._client_queue_size = client_queue_size
+        self._builds: "OrderedDict[int, _Build]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._builds)
+
+    @property
+    def subscribers(self) -> int:
+        return sum(len(build.subscribers) for build in self._builds.values())
+
+    def job_changed(self, job: "Job") -> None:
+        """
+        Job queue listener; safe to call from any thread.
+        """
+        self._loop.call_soon_threadsafe(self.update, job)
+
+    def job_output(self, job_id: int, line: str) -> None:
+        """
+        Job queue output listener; safe to call from any thread.
+        """
+        self._loop.call_soon_threadsafe(self.append, job_id, line)
+
+    def update(self, job: "Job") -> None:
+        """
+        Record a job's status and tell its subscribers.
+        """
+        build = self._builds.get(job.id)
+        if build is None:
+            build = self._track(job)
+        else:
+            build.job = job_to_dict(job)
+            build.finished = job.status.finished
+            self._builds.move_to_end(job.id)
+
+        status = (("status", None, json.dumps(build.job)),)
+        self._publish(build, status + ((None,) if build.finished else ()))
+        if build.finished:
+            build.subscribers.clear()
+
+    def append(self, job_id: int, line: str) -> None:
+        """
+        Record a line of a job's output and tell its subscribers.
+        """
+        build = self._builds.get(job_id)
+        if build is None:
+            # Forgotten meanwhile; the status of a running job always
+            # reaches the feed before its output
+            return
+
+        build.sequence += 1
+        build.lines.append((build.sequence, line))
+        self._publish(build, (("log", build.sequence, line),))
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        build = self._builds.get(job_id)
+        return build.job if build is not None else None
+
+    def list(self) -> List[Dict[str, Any]]:
+        """
+        Tracked jobs in id order.
+        """
+        return [self._builds[job_id].job for job_id in sorted(self._builds)]
+
+    def subscribe(self, job_id: int, after: int = 0) -> Optional[Subscriber]:
+        """
+        Follow a build, starting with its retained lines after `after`.
+
+        The subscriber of a finished build receives its backlog and status
+        and then the end of the stream.
+
+        Returns:
+            The subscriber, or None if the build is not tracked
+        """
+        build = self._builds.get(job_id)
+        if build is None:
+            return None
+
+        subscriber = Subscriber(self._client_queue_size)
+        backlog = [line for line in build.lines if line[0] > after]
+
+        # The backlog alone may not fit the queue; older lines go first
+        room = self._client_queue_size - 2
+        for sequence, line in backlog[-room:] if room > 0 else ():
+            subscriber.put(("log", sequence, line))
+        subscriber.put(("status", None, json.dumps(build.job)))
+
+        if build.finished:
+            subscriber.put(None)
+        else:
+            build.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, job_id: int, subscriber: Subscriber) -> None:
+        build = self._builds.get(job_id)
+        if build is not None:
+            build.subscribers.discard(subscriber)
+
+    def track(self, job: "Job") -> None:
+        """
+        Start tracking a job, if not tracked yet, without telling anyone.
+        """
+        if job.id not in self._builds:
+            self._track(job)
+
+    def _track(self, job: "Job") -> _Build:
+        build = self._builds[job.id] = _Build(job, self._backlog_lines)
+
+        # Forget the least recently updated builds nobody is following
+        excess = len(self._builds) - self._max_builds
+        for job_id in list(self._builds):
+            if excess <= 0:
+                break
+            if not self._builds[job_id].subscribers and job_id != job.id:
+                del self._builds[job_id]
+                excess -= 1
+        return build
+
+    def _publish(self, build: _Build, events: Tuple[Event, ...]) -> None:
+        for subscriber in list(build.subscribers):
+            for event in events:
+                if not subscriber.put(event):
+                    # Too slow; it resumes from its last event id
+                    build.subscribers.discard(subscriber)
+                    break
@@ -0,0 +1,167 @@
+"""
+Module for reading HTTP/1.1 requests and writing responses over asyncio.
+"""
+
+# Imports from standard library
+import asyncio
+import json
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, unquote, urlsplit
+
+
+_MAX_HEADERS = 100
+
+
+class HttpError(Exception):
+    """
+    Error answered with `status` and a JSON body holding `message`.
+    """
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+@dataclass
+class HttpRequest:
+    """
+    Parsed request with its body read.
+    """
+
+    method: str
+    path: str
+    query: Dict[str, str] = field(default_factory=dict)
+    headers: Dict[str, str] = field(default_factory=dict)
+    body: bytes = b""
+    version: str = "HTTP/1.1"
+
+    @property
+    def keep_alive(self) -> bool:
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+    def json(self) -> Any:
+        """
+        Decode the body as JSON.
+
+        Raises:
+            HttpError: If the body is not valid JSON
+        """
+        try:
+            return json.loads(self.body or b"null")
+        except ValueError as e:
+            raise HttpError(400, f"Invalid JSON: {e}") from e
+
+
+async def read_request(
+    reader: asyncio.StreamReader, max_body: int
+) -> Optional[HttpRequest]:
+    """
+    Read one request.
+
+    Returns:
+        The request, or None if the client closed the connection first
+
+    Raises:
+        HttpError: If the request is malformed or its body too large
+    """
+    try:
+        request_line = await reader.readline()
+    except (asyncio.LimitOverrunError, ValueError) as e:
+        raise HttpError(414, "Request line too long") from e
+    if not request_line:
+        return None
+
+    try:
+        method, target, version = request_line.decode("latin-1").split()
+    except ValueError as e:
+        raise HttpError(400, "Malformed request line") from e
+
+    headers = {}
+    while True:
+        try:
+            line = await reader.readline()
+        except (asyncio.LimitOverrunError, ValueError) as e:
+            raise HttpError(431, "Header line too long") from e
+        if not line.strip():
+            break
+        if len(headers) >= _MAX_HEADERS:
+            raise HttpError(431, "Too many headers")
+        key, _, value = line.decode("latin-1").partition(":")
+        headers[key.strip().lower()] = value.strip()
+
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        raise HttpError(411, "Chunked request bodies are not supported")
+
+    try:
+        length = int(headers.get("content-length", "0"))
+    except ValueError as e:
+        raise HttpError(400, "Invalid Content-Length") from e
+    if length < 0:
+        raise HttpError(400, "Invalid Content-Length")
+    if length > max_body:
+        raise HttpError(413, f"Body larger than {max_body} bytes")
+
+    body = await reader.readexactly(length) if length else b""
+
+    url = urlsplit(target)
+    query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+    return HttpRequest(
+        method=method.upper(),
+        path=unquote(url.path),
+        query=query,
+        headers=headers,
+        body=body,
+        version=version.upper(),
+    )
+
+
+def response_head(status: int, headers: Optional[Dict[str, str]] = None) -> bytes:
+    """
+    Encode a status line and headers.
+    """
+    lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}"]
+    lines += [f"{key}: {value}" for key, value in (headers or {}).items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+async def write_json(
+    writer: asyncio.StreamWriter, status: int, body: Any, keep_alive: bool = True
+) -> None:
+    """
+    Write a complete JSON response.
+    """
+    payload = json.dumps(body).encode("utf-8") + b"\n"
+    writer.write(
+        response_head(
+            status,
+            {
+                "Content-Type": "application/json",
+                "Content-Length": str(len(payload)),
+                "Connection": "keep-alive" if keep_alive else "close",
+            },
+        )
+        + payload
+    )
+    await writer.drain()
+
+
+def sse_event(
+    data: str, event: Optional[str] = None, id: Optional[int] = None
+) -> bytes:
+    """
+    Encode a server-sent event; multi-line data becomes several data fields.
+    """
+    lines = []
+    if id is not None:
+        lines.append(f"id: {id}")
+    if event is not None:
+        lines.append(f"event: {event}")
+    # Clients treat any of \r, \n and \r\n as the end of a field
+    lines += [f"data: {line}" for line in data.splitlines() or [""]]
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
@@ -0,0 +1,30 @@
+"""
+Module for API models.
+"""
+
+# Imports from standard library
+from dataclasses import dataclass
+
+
+@dataclass
+class ApiConfig:
+    """
+    Configuration for the HTTP API.
+
+    The last `backlog_lines` lines of each build are kept for clients that
+    connect late or reconnect, for at most `max_builds` builds. A client
+    that falls `client_queue_size` events behind is disconnected and can
+    resume from its last event id. Idle keep-alive connections are closed
+    after `keep_alive_timeout` seconds and log streams send a comment every
+    `heartbeat` seconds.
+    """
+
+    host: str = "127.0.0.1"
+    port: int = 8080
+    start_workers: bool = True
+    backlog_lines: int = 2000
+    max_builds: int = 1000
+    client_queue_size: int = 1000
+    heartbeat: float = 15.0
+    keep_alive_timeout: float = 30.0
+    max_body: int = 1024 * 1024
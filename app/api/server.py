@@ -0,0 +1,382 @@
+"""
+Module for the asyncio HTTP API.
+"""
+
+# Imports from standard library
+import asyncio
+import functools
+import re
+from typing import TYPE_CHECKING, Any, Callable, Optional, Set, Tuple
+
+# Imports from local modules
+from app.api.feed import BuildFeed, Subscriber, job_to_dict
+from app.api.http import (
+    HttpError,
+    HttpRequest,
+    read_request,
+    response_head,
+    sse_event,
+    write_json,
+)
+from app.api.models import ApiConfig
+
+# Imports from services modules
+from app.services.job_queue_service import (
+    InvalidJobTransitionError,
+    JobNotFoundError,
+    JobStatus,
+)
+from app.services.os_builder_service import OSBuildConfig
+from app.services.os_builder_service.exceptions import (
+    InvalidOSBuildConfigError,
+    InvalidOSBuildNameError,
+    InvalidPackageError,
+)
+
+
+if TYPE_CHECKING:
+
+    # Imports from standard library
+    import logging
+
+    # Imports from services modules
+    from app.services.job_queue_service import JobQueueService
+
+
+_MAX_LINE = 64 * 1024
+
+_BUILD_PATH = re.compile(r"^/builds/(\d+)(/logs)?/?$")
+
+
+class ApiServer:
+    """
+    HTTP API for submitting and following builds.
+
+    One event loop serves every connection. Submissions go to the job
+    queue and answer with the job id right away; status is answered from
+    the in-memory feed, and only jobs it does not track are read from the
+    queue, off the loop. Routes:
+    - POST /builds: queue a JSON OSBuildConfig, with an optional priority
+    - GET /builds: tracked jobs, optionally `?status=`
+    - GET /builds/{id}: one job
+    - DELETE /builds/{id}: cancel a job
+    - GET /builds/{id}/logs: server-sent events `log` (one output line,
+      with its sequence number as event id), `status`, `end`, and
+      `overflow` when the client fell too far behind. Reconnecting with
+      `Last-Event-ID` or `?after=` resumes after that line.
+    - GET /health
+    """
+
+    def __init__(
+        self,
+        logger: "logging.Logger",
+        job_queue: "JobQueueService",
+        configuration: ApiConfig = None,
+    ):
+        self._logger = logger.getChild("ApiServer")
+        self._job_queue = job_queue
+        self._configuration = configuration or ApiConfig()
+
+        self._logger.debug("ApiConfig: %s", self._configuration)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._feed: Optional[BuildFeed] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._handlers: Set[asyncio.Task] = set()
+
+        self._logger.info("ApiServer initialized")
+
+    @property
+    def address(self) -> Optional[Tuple[str, int]]:
+        """
+        Address the server listens on, once serving.
+        """
+        if self._server is None or not self._server.sockets:
+            return None
+        return self._server.sockets[0].getsockname()[:2]
+
+    @property
+    def feed(self) -> Optional[BuildFeed]:
+        return self._feed
+
+    def run(self) -> None:
+        """
+        Serve until interrupted.
+        """
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            pass
+
+    def stop(self) -> None:
+        """
+        Stop serving; safe to call from any thread.
+        """
+        if self._loop is not None and self._stopping is not None:
+            self._loop.call_soon_threadsafe(self._stopping.set)
+
+    async def serve(self) -> None:
+        """
+        Serve until `stop` is called, running the job queue workers too
+        unless `start_workers` is off.
+        """
+        configuration = self._configuration
+        self._loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        self._feed = BuildFeed(
+            self._loop,
+            backlog_lines=configuration.backlog_lines,
+            max_builds=configuration.max_builds,
+            client_queue_size=configuration.client_queue_size,
+        )
+
+        self._job_queue.add_listener(self._feed.job_changed)
+        self._job_queue.add_output_listener(self._feed.job_output)
+
+        try:
+            for status in (JobStatus.QUEUED, JobStatus.RUNNING):
+                for job in await self._call(
+                    self._job_queue.list, status, configuration.max_builds
+                ):
+                    self._feed.update(job)
+
+            if configuration.start_workers:
+                await self._call(self._job_queue.start)
+
+            self._server = await asyncio.start_server(
+                self._handle, configuration.host, configuration.port, limit=_MAX_LINE
+            )
+            self._logger.info("Serving API on %s:%s", *self.address)
+
+            await self._stopping.wait()
+        finally:
+            await self._shutdown()
+
+    async def _shutdown(self) -> None:
+        self._job_queue.remove_listener(self._feed.job_changed)
+        self._job_queue.remove_output_listener(self._feed.job_output)
+
+        if self._server is not None:
+            self._server.close()
+
+        for handler in list(self._handlers):
+            handler.cancel()
+        if self._handlers:
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+
+        if self._server is not None:
+            await self._server.wait_closed()
+
+        if self._configuration.start_workers and self._job_queue.running:
+            self._logger.info("Waiting for running jobs to finish")
+            await self._call(self._job_queue.stop)
+
+        self._logger.info("API stopped")
+
+    async def _call(self, function: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run a blocking job queue call on the default executor.
+        """
+        return await self._loop.run_in_executor(
+            None, functools.partial(function, *args)
+        )
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        task = asyncio.current_task()
+        self._handlers.add(task)
+
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(
+                        read_request(reader, self._configuration.max_body),
+                        self._configuration.keep_alive_timeout,
+                    )
+                except HttpError as e:
+                    await write_json(
+                        writer, e.status, {"error": e.message}, keep_alive=False
+                    )
+                    break
+                if request is None:
+                    break
+
+                if not await self._dispatch(request, writer):
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._handlers.discard(task)
+            writer.close()
+
+    async def _dispatch(
+        self, request: HttpRequest, writer: asyncio.StreamWriter
+    ) -> bool:
+        """
+        Answer a request.
+
+        Returns:
+            Whether the connection can take another request
+        """
+        keep_alive = request.keep_alive
+        try:
+            match = _BUILD_PATH.match(request.path)
+
+            if match is not None and match.group(2):
+                if request.method != "GET":
+                    raise HttpError(405, f"{request.method} not allowed")
+                await self._stream_logs(int(match.group(1)), request, writer)
+                return False
+
+            if match is not None:
+                status, body = await self._build(int(match.group(1)), request)
+            elif request.path.rstrip("/") == "/builds":
+                status, body = await self._builds(request)
+            elif request.path == "/health":
+                status, body = 200, {
+                    "status": "ok",
+                    "builds": len(self._feed),
+                    "subscribers": self._feed.subscribers,
+                }
+            else:
+                raise HttpError(404, f"No route for {request.path}")
+
+        except HttpError as e:
+            status, body = e.status, {"error": e.message}
+        except JobNotFoundError as e:
+            status, body = 404, {"error": str(e)}
+        except InvalidJobTransitionError as e:
+            status, body = 409, {"error": str(e)}
+        except (InvalidOSBuildNameError, InvalidPackageError) as e:
+            status, body = 400, {"error": str(e)}
+        except InvalidOSBuildConfigError as e:
+            status, body = 422, {"error": str(e)}
+        except ConnectionError:
+            raise
+        except Exception as e:
+            self._logger.exception("Error handling %s %s", request.method, request.path)
+            status, body, keep_alive = 500, {"error": str(e)}, False
+
+        await write_json(writer, status, body, keep_alive)
+        return keep_alive
+
+    async def _builds(self, request: HttpRequest) -> Tuple[int, Any]:
+        if request.method == "GET":
+            jobs = self._feed.list()
+            if "status" in request.query:
+                wanted = request.query["status"].upper()
+                jobs = [job for job in jobs if job["status"] == wanted]
+            return 200, jobs
+
+        if request.method != "POST":
+            raise HttpError(405, f"{request.method} not allowed")
+
+        config, priority = self._parse_build(request.json())
+        job_id = await self._call(self._job_queue.submit, config, priority)
+        return 202, {"id": job_id, "status": JobStatus.QUEUED.value}
+
+    async def _build(self, job_id: int, request: HttpRequest) -> Tuple[int, Any]:
+        if request.method == "GET":
+            job = self._feed.get(job_id)
+            if job is None:
+                job = job_to_dict(await self._call(self._job_queue.get, job_id))
+            return 200, job
+
+        if request.method == "DELETE":
+            job = await self._call(self._job_queue.cancel, job_id)
+            return 202, job_to_dict(job)
+
+        raise HttpError(405, f"{request.method} not allowed")
+
+    async def _stream_logs(
+        self, job_id: int, request: HttpRequest, writer: asyncio.StreamWriter
+    ) -> None:
+        after = request.headers.get("last-event-id") or request.query.get("after")
+        try:
+            after = int(after or 0)
+        except ValueError as e:
+            raise HttpError(400, "Last-Event-ID must be a line number") from e
+
+        subscriber = self._feed.subscribe(job_id, after)
+        if subscriber is None:
+            self._feed.track(await self._call(self._job_queue.get, job_id))
+            subscriber = self._feed.subscribe(job_id, after)
+
+        writer.write(
+            response_head(
+                200,
+                {
+                    "Content-Type": "text/event-stream",
+                    "Cache-Control": "no-cache",
+                    "Connection": "close",
+                    "X-Accel-Buffering": "no",
+                },
+            )
+        )
+        try:
+            await self._follow(subscriber, writer)
+        finally:
+            self._feed.unsubscribe(job_id, subscriber)
+
+    async def _follow(
+        self, subscriber: Subscriber, writer: asyncio.StreamWriter
+    ) -> None:
+        while True:
+            if subscriber.overflowed and subscriber.queue.empty():
+                writer.write(sse_event("Client fell behind", event="overflow"))
+                break
+
+            try:
+                event = await asyncio.wait_for(
+                    subscriber.queue.get(), self._configuration.heartbeat
+                )
+            except asyncio.TimeoutError:
+                # Keeps proxies from timing out and finds dead clients
+                writer.write(b": heartbeat\n\n")
+                await writer.drain()
+                continue
+
+            if event is None:
+                writer.write(sse_event("", event="end"))
+                break
+
+            name, event_id, data = event
+            writer.write(sse_event(data, event=name, id=event_id))
+
+            # Waits while the socket buffer is full; meanwhile the queue
+            # absorbs output until the client is dropped as too slow
+            await writer.drain()
+
+        await writer.drain()
+
+    @staticmethod
+    def _parse_build(payload: Any) -> Tuple[OSBuildConfig, int]:
+        if not isinstance(payload, dict):
+            raise HttpError(400, "Expected a JSON object")
+
+        fields = dict(payload)
+        priority = fields.pop("priority", 0)
+        if not isinstance(priority, int) or isinstance(priority, bool):
+            raise HttpError(400, "priority must be an integer")
+
+        for key in ("name", "distro", "release", "architecture"):
+            if not isinstance(fields.get(key), str):
+                raise HttpError(400, f"{key} must be a string")
+        packages = fields.setdefault("packages", [])
+        if not isinstance(packages, list) or not all(
+            isinstance(package, str) for package in packages
+        ):
+            raise HttpError(400, "packages must be a list of strings")
+        if not isinstance(fields.get("backend", ""), (str, type(None))):
+            raise HttpError(400, "backend must be a string")
+
+        try:
+            return OSBuildConfig(**fields), priority
+        except TypeError as e:
+            raise HttpError(400, f"Invalid build: {e}") from e
+        except (InvalidOSBuildNameError, InvalidPackageError) as e:
+            raise HttpError(400, str(e)) from e
+        except InvalidOSBuildConfigError as e:
+            raise HttpError(422, str(e)) from e
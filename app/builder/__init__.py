@@ -0,0 +1,33 @@
+from .engine import BuildEngine
+from .graph import BuildGraph
+from .models import BuildEngineConfig, BuildPlanResult, StepResult
+from .steps import (
+    BuildStep,
+    ShellStep,
+    BaseImageStep,
+    AptUpdateStep,
+    PackagesStep,
+    FileOverlayStep,
+    CleanupStep,
+    steps_for_packages,
+)
+from .exceptions import BuildEngineError, BuildGraphError, BuildStepFailedError
+
+__all__ = [
+    "BuildEngine",
+    "BuildGraph",
+    "BuildEngineConfig",
+    "BuildPlanResult",
+    "StepResult",
+    "BuildStep",
+    "ShellStep",
+    "BaseImageStep",
+    "AptUpdateStep",
+    "PackagesStep",
+    "FileOverlayStep",
+    "CleanupStep",
+    "steps_for_packages",
+    "BuildEngineError",
+    "BuildGraphError",
+    "BuildStepFailedError",
+]
@@ -0,0 +1,185 @@
+"""
+Module for the step-graph build engine.
+"""
+
+# Imports from standard library
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, List, Optional
+
+# Imports from local modules
+from app.builder.graph import BuildGraph
+from app.builder.models import (
+    BuildEngineConfig,
+    BuildPlanResult,
+    StepContext,
+    StepResult,
+)
+from app.builder.steps import BaseImageStep, BuildStep
+
+# Imports from services modules
+from app.services.container_manager import (
+    ContainerConfig,
+    ROLE_LABEL,
+    build_container_name,
+)
+
+
+if TYPE_CHECKING:
+
+    # Imports from standard library
+    import logging
+
+    # Imports from services modules
+    from app.services.container_manager import ContainerManagerService
+
+
+STEP_KEY_LABEL = "linux_builder.step_key"
+
+
+class BuildEngine:
+    """
+    Engine executing build graphs with per-step layer caching.
+
+    Every completed step is committed as `repository:<step key>`. A build
+    resumes from the deepest step whose image already exists and only runs
+    the steps after it.
+    """
+
+    def __init__(
+        self,
+        logger: "logging.Logger",
+        container_manager: "ContainerManagerService",
+        configuration: BuildEngineConfig = None,
+    ):
+        self._logger = logger.getChild("BuildEngine")
+        self._container_manager = container_manager
+        self._configuration = configuration or BuildEngineConfig()
+
+        self._logger.debug("BuildEngineConfig: %s", self._configuration)
+
+        self._logger.info("BuildEngine initialized")
+
+    def image_ref(self, key: str) -> str:
+        """
+        Get the image reference of a step key.
+        """
+        return f"{self._configuration.repository}:{key}"
+
+    def build(self, graph: BuildGraph, tag: Optional[str] = None) -> BuildPlanResult:
+        """
+        Build a graph.
+
+        Args:
+            graph: Steps to build
+            tag: Optional `repository:tag` to give the final image
+
+        Returns:
+            Final image and the outcome of every step
+        """
+        ordered = graph.order()
+        base: BaseImageStep = ordered[0]
+
+        self._prepare(ordered)
+        keys = graph.keys(ordered)
+
+        # Deepest step whose layer is already cached
+        resume = 0
+        for index in range(len(ordered) - 1, 0, -1):
+            if self._container_manager.image_exists(self.image_ref(keys[index])):
+                resume = index
+                break
+
+        self._logger.info(
+            "Building graph (steps=%s, cached=%s)", len(ordered), resume
+        )
+
+        results = [
+            StepResult(
+                name=step.name,
+                key=key,
+                image=base.image if index == 0 else self.image_ref(key),
+                cached=True,
+            )
+            for index, (step, key) in enumerate(zip(ordered[: resume + 1], keys))
+        ]
+
+        if resume < len(ordered) - 1:
+            results += self._run_steps(
+                ordered[resume + 1 :], keys[resume + 1 :], results[-1].image, base
+            )
+
+        image = results[-1].image
+        if tag:
+            repository, _, name = tag.rpartition(":")
+            self._container_manager.tag_image(image, repository, name)
+            image = tag
+
+        return BuildPlanResult(image=image, steps=results)
+
+    def _prepare(self, steps: List[BuildStep]) -> None:
+        """
+        Run every step's host-side preparation in parallel.
+        """
+        with ThreadPoolExecutor(
+            max_workers=max(1, self._configuration.max_workers),
+            thread_name_prefix="BuildEngine",
+        ) as executor:
+            futures = [
+                executor.submit(step.prepare, self._container_manager)
+                for step in steps
+            ]
+            for future in futures:
+                future.result()
+
+    def _run_steps(
+        self,
+        steps: List[BuildStep],
+        keys: List[str],
+        image: str,
+        base: BaseImageStep,
+    ) -> List[StepResult]:
+        """
+        Run steps in one container, committing a layer after each.
+        """
+        container = self._container_manager.deploy_application(
+            ContainerConfig(
+                image=image,
+                name=build_container_name(f"step_{keys[0][:12]}"),
+                command="sleep infinity",
+                detach=True,
+                remove=False,
+                platform=base.platform,
+                pull=False,
+                labels={ROLE_LABEL: "build"},
+            )
+        )
+        context = StepContext(container_id=container.id, platform=base.platform)
+        results = []
+
+        try:
+            for step, key in zip(steps, keys):
+                self._logger.info("Running step (name=%s, key=%s)", step.name, key)
+                started = time.monotonic()
+
+                step.apply(self._container_manager, context)
+                self._container_manager.commit_application(
+                    container.id,
+                    self._configuration.repository,
+                    key,
+                    labels={STEP_KEY_LABEL: key},
+                )
+
+                results.append(
+                    StepResult(
+                        name=step.name,
+                        key=key,
+                        image=self.image_ref(key),
+                        cached=False,
+                        duration=time.monotonic() - started,
+                    )
+                )
+        finally:
+            self._container_manager.remove_application(container.id, force=True)
+
+        return results
@@ -0,0 +1,21 @@
+"""
+Module for build engine exceptions.
+"""
+
+
+class BuildEngineError(Exception):
+    """
+    Exception for build engine error.
+    """
+
+
+class BuildGraphError(BuildEngineError):
+    """
+    Exception for invalid build graph.
+    """
+
+
+class BuildStepFailedError(BuildEngineError):
+    """
+    Exception for build step failed.
+    """
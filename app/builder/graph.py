@@ -0,0 +1,106 @@
+"""
+Module for build graphs.
+"""
+
+# Imports from standard library
+import hashlib
+import heapq
+import json
+from typing import Dict, Iterable, List
+
+# Imports from local modules
+from app.builder.exceptions import BuildGraphError
+from app.builder.steps import BaseImageStep, BuildStep
+
+
+class BuildGraph:
+    """
+    DAG of build steps.
+
+    A container filesystem is linear, so the graph is executed in a
+    deterministic topological order (ties broken by insertion order) and
+    each step's layer sits on the one before it in that order.
+    """
+
+    def __init__(self, steps: Iterable[BuildStep] = ()):
+        self._steps: Dict[str, BuildStep] = {}
+        for step in steps:
+            self.add(step)
+
+    def add(self, step: BuildStep) -> BuildStep:
+        """
+        Add a step to the graph.
+        """
+        if step.name in self._steps:
+            raise BuildGraphError(f"Duplicate step {step.name}")
+        self._steps[step.name] = step
+        return step
+
+    @property
+    def steps(self) -> List[BuildStep]:
+        return list(self._steps.values())
+
+    def order(self) -> List[BuildStep]:
+        """
+        Get the steps in execution order.
+
+        Raises:
+            BuildGraphError: If the graph has no single base step, an
+                unknown dependency or a cycle
+        """
+        roots = [step for step in self._steps.values() if isinstance(step, BaseImageStep)]
+        if len(roots) != 1:
+            raise BuildGraphError("Build graph needs exactly one base step")
+
+        position = {name: index for index, name in enumerate(self._steps)}
+        pending = {}
+        dependents: Dict[str, List[str]] = {name: [] for name in self._steps}
+
+        for step in self._steps.values():
+            for dependency in step.depends_on:
+                if dependency not in self._steps:
+                    raise BuildGraphError(
+                        f"Step {step.name} depends on unknown step {dependency}"
+                    )
+                dependents[dependency].append(step.name)
+            pending[step.name] = len(set(step.depends_on))
+
+        ready = [position[name] for name, count in pending.items() if count == 0]
+        heapq.heapify(ready)
+        names = list(self._steps)
+        ordered = []
+
+        while ready:
+            name = names[heapq.heappop(ready)]
+            ordered.append(self._steps[name])
+            for dependent in set(dependents[name]):
+                pending[dependent] -= 1
+                if pending[dependent] == 0:
+                    heapq.heappush(ready, position[dependent])
+
+        if len(ordered) != len(self._steps):
+            raise BuildGraphError("Build graph has a cycle")
+
+        if ordered[0] is not roots[0]:
+            raise BuildGraphError("Base step must not depend on other steps")
+
+        return ordered
+
+    @staticmethod
+    def keys(ordered: List[BuildStep]) -> List[str]:
+        """
+        Cache key of every step: a hash of its kind, inputs and parent key.
+        """
+        keys = []
+        parent = ""
+
+        for step in ordered:
+            payload = json.dumps(
+                {"kind": step.kind, "inputs": step.inputs(), "parent": parent},
+                sort_keys=True,
+                separators=(",", ":"),
+            )
+            parent = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+            keys.append(parent)
+
+        return keys
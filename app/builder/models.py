@@ -0,0 +1,57 @@
+"""
+Module for build engine models.
+"""
+
+# Imports from standard library
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+
+@dataclass
+class BuildEngineConfig:
+    """
+    Configuration for build engine.
+    """
+
+    repository: str = "linux_builder/steps"
+    max_workers: int = 4
+
+
+@dataclass
+class StepResult:
+    """
+    Outcome of a single build step.
+    """
+
+    name: str
+    key: str
+    image: str
+    cached: bool
+    duration: float = 0.0
+
+
+@dataclass
+class BuildPlanResult:
+    """
+    Outcome of a build graph.
+    """
+
+    image: str
+    steps: List[StepResult] = field(default_factory=list)
+
+    @property
+    def cached_steps(self) -> int:
+        return sum(1 for step in self.steps if step.cached)
+
+
+@dataclass
+class StepContext:
+    """
+    State a step needs to apply itself to a build container.
+    """
+
+    container_id: str
+    environment: Dict[str, str] = field(
+        default_factory=lambda: {"DEBIAN_FRONTEND": "noninteractive"}
+    )
+    platform: Optional[str] = None
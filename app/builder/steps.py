@@ -0,0 +1,271 @@
+"""
+Module for build steps.
+"""
+
+# Imports from standard library
+import abc
+import hashlib
+import io
+import os
+import tarfile
+import urllib.request
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional
+
+# Imports from local modules
+from app.builder.exceptions import BuildStepFailedError
+from app.builder.models import StepContext
+
+
+if TYPE_CHECKING:
+
+    # Imports from services modules
+    from app.services.container_manager import ContainerManagerService
+
+
+class BuildStep(abc.ABC):
+    """
+    Base class for build steps.
+
+    A step's cache key is derived from `kind` and `inputs()`, so inputs must
+    describe everything that affects what the step writes.
+    """
+
+    kind = "step"
+
+    def __init__(self, name: str, depends_on: Iterable[str] = ()):
+        self.name = name
+        self.depends_on = list(depends_on)
+
+    def inputs(self) -> Dict[str, Any]:
+        """
+        Values identifying what the step does.
+        """
+        return {}
+
+    def prepare(self, manager: "ContainerManagerService") -> None:
+        """
+        Host-side work done before any container starts.
+
+        Runs concurrently with the other steps' prepare.
+        """
+
+    @abc.abstractmethod
+    def apply(self, manager: "ContainerManagerService", context: StepContext) -> None:
+        """
+        Apply the step to the build container.
+        """
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(name={self.name!r})"
+
+
+class ShellStep(BuildStep):
+    """
+    Step running a shell script in the build container.
+    """
+
+    kind = "shell"
+
+    def __init__(self, name: str, script: str, depends_on: Iterable[str] = ()):
+        super().__init__(name, depends_on)
+        self.script = script
+
+    def inputs(self) -> Dict[str, Any]:
+        return {"script": self.script}
+
+    def apply(self, manager: "ContainerManagerService", context: StepContext) -> None:
+        exit_code, output = manager.execute_in_application(
+            context.container_id,
+            f"sh -c '{self.script}'",
+            environment=context.environment,
+        )
+        if exit_code != 0:
+            raise BuildStepFailedError(
+                f"Step {self.name} failed with exit code {exit_code}: {output[-2000:]}"
+            )
+
+
+class BaseImageStep(BuildStep):
+    """
+    Root step selecting the image the build starts from.
+
+    The image is pulled in prepare and its id becomes part of the key, so
+    a moved tag such as `latest` invalidates every step after it.
+    """
+
+    kind = "base"
+
+    def __init__(self, name: str, image: str, platform: Optional[str] = None):
+        super().__init__(name)
+        self.image = image
+        self.platform = platform
+        self.image_id: Optional[str] = None
+
+    def inputs(self) -> Dict[str, Any]:
+        return {"image": self.image, "platform": self.platform, "id": self.image_id}
+
+    def prepare(self, manager: "ContainerManagerService") -> None:
+        self.image_id = manager.ensure_image(self.image, platform=self.platform)
+
+    def apply(self, manager: "ContainerManagerService", context: StepContext) -> None:
+        # The build container is started from the base image
+        return None
+
+
+class AptUpdateStep(ShellStep):
+    """
+    Step refreshing APT package lists.
+    """
+
+    kind = "apt-update"
+
+    def __init__(self, name: str = "apt-update", depends_on: Iterable[str] = ()):
+        super().__init__(name, "apt-get update", depends_on)
+
+
+class PackagesStep(ShellStep):
+    """
+    Step installing a group of packages.
+    """
+
+    kind = "packages"
+
+    def __init__(
+        self, name: str, packages: Iterable[str], depends_on: Iterable[str] = ()
+    ):
+        self.packages = sorted(set(packages))
+        super().__init__(
+            name,
+            "apt-get install -y --no-install-recommends " + " ".join(self.packages),
+            depends_on,
+        )
+
+    def inputs(self) -> Dict[str, Any]:
+        return {"packages": self.packages}
+
+
+class CleanupStep(ShellStep):
+    """
+    Step removing APT caches, package lists and extra paths.
+    """
+
+    kind = "cleanup"
+
+    def __init__(
+        self,
+        name: str = "cleanup",
+        paths: Iterable[str] = (),
+        depends_on: Iterable[str] = (),
+    ):
+        self.paths = sorted(paths)
+        script = "apt-get clean && rm -rf /var/lib/apt/lists/*"
+        if self.paths:
+            script += " && rm -rf " + " ".join(self.paths)
+        super().__init__(name, script, depends_on)
+
+
+class FileOverlayStep(BuildStep):
+    """
+    Step copying files into the build container.
+
+    `source` is a local file or directory or an http(s) URL. It is read in
+    prepare and hashed by content.
+    """
+
+    kind = "overlay"
+
+    def __init__(
+        self, name: str, source: str, destination: str, depends_on: Iterable[str] = ()
+    ):
+        super().__init__(name, depends_on)
+        self.source = source
+        self.destination = destination
+        self.archive: Optional[bytes] = None
+
+    def inputs(self) -> Dict[str, Any]:
+        digest = hashlib.sha256(self.archive).hexdigest() if self.archive else None
+        return {"destination": self.destination, "sha256": digest}
+
+    def prepare(self, manager: "ContainerManagerService") -> None:
+        self.archive = self._build_archive()
+
+    def apply(self, manager: "ContainerManagerService", context: StepContext) -> None:
+        exit_code, output = manager.execute_in_application(
+            context.container_id, f"mkdir -p {self.destination}"
+        )
+        if exit_code != 0:
+            raise BuildStepFailedError(f"Step {self.name} failed: {output}")
+
+        manager.copy_to_application(
+            context.container_id, self.destination, self.archive
+        )
+
+    def _build_archive(self) -> bytes:
+        buffer = io.BytesIO()
+
+        with tarfile.open(fileobj=buffer, mode="w") as tar:
+            if self.source.startswith(("http://", "https://")):
+                with urllib.request.urlopen(self.source) as response:
+                    data = response.read()
+                info = tarfile.TarInfo(os.path.basename(self.source.rstrip("/")))
+                info.size = len(data)
+                info.mode = 0o644
+                tar.addfile(info, io.BytesIO(data))
+
+            elif os.path.isdir(self.source):
+                for entry in sorted(os.listdir(self.source)):
+                    tar.add(
+                        os.path.join(self.source, entry),
+                        arcname=entry,
+                        filter=_normalize_tarinfo,
+                    )
+
+            else:
+                tar.add(
+                    self.source,
+                    arcname=os.path.basename(self.source),
+                    filter=_normalize_tarinfo,
+                )
+
+        return buffer.getvalue()
+
+
+def _normalize_tarinfo(info: tarfile.TarInfo) -> tarfile.TarInfo:
+    """
+    Drop host-specific metadata so equal files hash equally.
+    """
+    info.mtime = 0
+    info.uid = info.gid = 0
+    info.uname = info.gname = "root"
+    return info
+
+
+def steps_for_packages(
+    image: str,
+    platform: Optional[str],
+    package_groups: Dict[str, List[str]],
+    overlays: Optional[Dict[str, str]] = None,
+) -> List[BuildStep]:
+    """
+    Steps for a typical OS build: base, apt update, package groups,
+    file overlays and cleanup.
+
+    Args:
+        package_groups: Package lists by group name, installed in order
+        overlays: Destination paths by overlay source
+    """
+    steps: List[BuildStep] = [BaseImageStep("base", image, platform)]
+    steps.append(AptUpdateStep(depends_on=["base"]))
+
+    previous = "apt-update"
+    for group, packages in package_groups.items():
+        steps.append(PackagesStep(f"packages:{group}", packages, [previous]))
+        previous = f"packages:{group}"
+
+    for index, (source, destination) in enumerate((overlays or {}).items()):
+        steps.append(FileOverlayStep(f"overlay:{index}", source, destination, ["base"]))
+
+    steps.append(
+        CleanupStep(depends_on=[step.name for step in steps if step.name != "base"])
+    )
+    return steps
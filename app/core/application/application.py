@@ -3,42 +3,50 @@ import os
 import logging
 import threading
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 # Imports from third party libraries
 from dependency_injector import providers
 
 # Imports from local modules
+from app.core.application.config_snapshot import default_cache_path, load_config
 from app.core.base.container import Container
-from app.core.base.commander import CommandExecutor
 
-# Imports from services modules
-from app.services.docker_service import DockerService
-from app.services.container_manager import ContainerManagerService
-from app.services.os_builder_service import OSBuilderService
+
+if TYPE_CHECKING:
+
+    # Imports from local modules
+    from app.core.base.commander import CommandExecutor, AsyncCommandExecutor
+
+    # Imports from services modules
+    from app.services.docker_service import DockerService
+    from app.services.container_manager import ContainerManagerService
+    from app.services.os_builder_service import OSBuilderService
+    from app.services.metrics_service import MetricsService
+    from app.services.job_queue_service import JobQueueService
+
+    # Imports from api modules
+    from app.api import ApiServer
 
 
 def _load_config_to_container(container: Container):
     """
     Load configuration from yaml files.
+
+    Loads `config.yaml`, then `{APP_ENV}_config.yaml`, then
+    `local_config.yaml`, each overriding the previous. The merged result
+    is reused from a snapshot while none of the files change.
     """
 
     # Find config directory
-    config_path = Path(container.PROJECT_ROOT()) / "config"
+    project_root = Path(container.PROJECT_ROOT())
+    config_path = project_root / "config"
     container.CONFIG_PATH = providers.Object(config_path)
 
-    def safe_load_config(config_provider: providers.Configuration, path: Path):
-        if path.exists() and path.stat().st_size > 0:
-            config_provider.from_yaml(path)
-
-    # Load config from yaml file
-    safe_load_config(container.config, config_path / "config.yaml")
-
-    # Load config from environment variables
     env = os.getenv("APP_ENV", "development")
-    safe_load_config(container.config, config_path / f"{env}_config.yaml")
+    config, _ = load_config(config_path, env, default_cache_path(project_root, env))
 
-    # Load local config if it exists
-    safe_load_config(container.config, config_path / "local_config.yaml")
+    container.config.from_dict(config)
 
 
 def init_container() -> Container:
@@ -92,21 +100,7 @@ class Application:
         self._logger = self._container.logger()
         self.__inner_logger.debug("Logger initialized")
 
-        # Initialize Commander
-        self._commander = self._container.commander()
-        self.__inner_logger.debug("Commander initialized")
-
-        # Initialize Docker service
-        self._docker_service = self._container.docker_service()
-        self.__inner_logger.debug("Docker service initialized")
-
-        # Initialize Container manager
-        self._container_manager = self._container.container_manager()
-        self.__inner_logger.debug("Container manager initialized")
-
-        # Initialize OS builder
-        self._os_builder = self._container.os_builder()
-        self.__inner_logger.debug("OS builder initialized")
+        # Services are created by their properties on first access
 
         # Set initialized flag
         self._initialized = True
@@ -125,17 +119,33 @@ class Application:
         return self._logger
 
     @property
-    def commander(self) -> CommandExecutor:
-        return self._commander
+    def commander(self) -> "CommandExecutor":
+        return self._container.commander()
+
+    @property
+    def async_commander(self) -> "AsyncCommandExecutor":
+        return self._container.async_commander()
+
+    @property
+    def docker_service(self) -> "DockerService":
+        return self._container.docker_service()
+
+    @property
+    def container_manager(self) -> "ContainerManagerService":
+        return self._container.container_manager()
+
+    @property
+    def os_builder(self) -> "OSBuilderService":
+        return self._container.os_builder()
 
     @property
-    def docker_service(self) -> DockerService:
-        return self._docker_service
+    def metrics(self) -> "MetricsService":
+        return self._container.metrics()
 
     @property
-    def container_manager(self) -> ContainerManagerService:
-        return self._container_manager
+    def job_queue(self) -> "JobQueueService":
+        return self._container.job_queue()
 
     @property
-    def os_builder(self) -> OSBuilderService:
-        return self._os_builder
+    def api(self) -> "ApiServer":
+        return self._container.api()
@@ -0,0 +1,217 @@
+"""
+Merged configuration snapshot cache.
+
+Parsing YAML is a noticeable part of a short CLI run, so the merged result
+of the config files is stored as JSON together with each file's path, mtime
+and size. A snapshot is reused only while every fingerprint still matches.
+"""
+
+# Imports from standard library
+import json
+import os
+import re
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+SNAPSHOT_VERSION = 2
+
+# Set to a directory to move snapshots, or to "off" to disable them
+CACHE_ENV = "APP_CONFIG_CACHE"
+
+# `${NAME}` or `${NAME:default}`, as dependency_injector interpolates
+_ENV_PATTERN = re.compile(r"\$\{(\w+)(?::([^}]*))?\}")
+
+Fingerprint = Tuple[str, Optional[int], Optional[int]]
+
+
+@dataclass
+class ConfigSnapshot:
+    """
+    Merged configuration and the fingerprints of the files it came from.
+    """
+
+    fingerprint: List[Fingerprint]
+    config: Dict[str, Any]
+    created_at: float = field(default_factory=time.time)
+    version: int = SNAPSHOT_VERSION
+
+
+def config_sources(config_path: Path, env: str) -> List[Path]:
+    """
+    Config files in merge order; later files override earlier ones.
+    """
+    return [
+        config_path / "config.yaml",
+        config_path / f"{env}_config.yaml",
+        config_path / "local_config.yaml",
+    ]
+
+
+def default_cache_path(project_root: Path, env: str) -> Optional[Path]:
+    """
+    Snapshot location for an APP_ENV, or None if the cache is disabled.
+    """
+    override = os.getenv(CACHE_ENV)
+    if override and override.lower() in ("0", "off", "false", "no"):
+        return None
+    if override:
+        return Path(override) / f"config_snapshot.{env}.json"
+    return Path(project_root) / "cache" / f"config_snapshot.{env}.json"
+
+
+def fingerprint(paths: List[Path]) -> List[Fingerprint]:
+    """
+    Path, mtime and size of each file; missing files are recorded too so
+    creating one invalidates the snapshot.
+    """
+    result = []
+    for path in paths:
+        try:
+            stat = path.stat()
+            result.append((str(path), stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            result.append((str(path), None, None))
+    return result
+
+
+def read_snapshot(cache_path: Path) -> Optional[ConfigSnapshot]:
+    """
+    Read a snapshot, ignoring unreadable or outdated files.
+    """
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data["version"] != SNAPSHOT_VERSION:
+            return None
+        return ConfigSnapshot(
+            fingerprint=[tuple(entry) for entry in data["fingerprint"]],
+            config=data["config"],
+            created_at=data["created_at"],
+            version=data["version"],
+        )
+    except (OSError, ValueError, TypeError, KeyError):
+        return None
+
+
+def write_snapshot(cache_path: Path, snapshot: ConfigSnapshot) -> None:
+    """
+    Write a snapshot atomically.
+
+    Raises:
+        TypeError: If the configuration holds values JSON cannot store
+    """
+    content = json.dumps(asdict(snapshot))
+    # Keys that are not strings would come back as strings
+    if json.loads(content)["config"] != snapshot.config:
+        raise TypeError("Configuration does not round-trip through JSON")
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_path.parent, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def parse_sources(paths: List[Path]) -> Dict[str, Any]:
+    """
+    Parse and deep-merge the non-empty config files.
+    """
+    import yaml
+
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+    merged: Dict[str, Any] = {}
+    for path in paths:
+        if path.exists() and path.stat().st_size > 0:
+            with open(path, "r", encoding="utf-8") as f:
+                merged = deep_merge(merged, yaml.load(f, Loader=loader) or {})
+    return merged
+
+
+def deep_merge(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Merge mappings recursively; other values in `override` replace.
+    """
+    result = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(result.get(key), dict):
+            result[key] = deep_merge(result[key], value)
+        else:
+            result[key] = value
+    return result
+
+
+def interpolate_env(value: Any) -> Any:
+    """
+    Substitute `${NAME}` and `${NAME:default}` in string values.
+
+    Done after loading, so a snapshot stays valid when the environment
+    changes. Substituted values are read again as YAML scalars, so
+    `port: ${PORT}` gives an int as it would if substituted before parsing.
+    """
+    if isinstance(value, dict):
+        return {key: interpolate_env(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [interpolate_env(item) for item in value]
+    if isinstance(value, str) and "${" in value:
+        return _parse_scalar(
+            _ENV_PATTERN.sub(
+                lambda match: os.getenv(match.group(1), match.group(2) or ""), value
+            )
+        )
+    return value
+
+
+def _parse_scalar(text: str) -> Any:
+    """
+    Resolve text as an unquoted YAML scalar, keeping it if it is not one.
+    """
+    import yaml
+
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+    try:
+        value = yaml.load(text, Loader=loader)
+    except yaml.YAMLError:
+        return text
+    if isinstance(value, (dict, list)):
+        return text
+    return value
+
+
+def load_config(
+    config_path: Path, env: str, cache_path: Optional[Path]
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    Load the merged configuration, from the snapshot when it is fresh.
+
+    Returns:
+        Configuration and whether it came from the snapshot
+    """
+    sources = config_sources(config_path, env)
+    current = fingerprint(sources)
+
+    if cache_path is not None:
+        snapshot = read_snapshot(cache_path)
+        if snapshot is not None and snapshot.fingerprint == current:
+            return interpolate_env(snapshot.config), True
+
+    config = parse_sources(sources)
+
+    if cache_path is not None:
+        try:
+            write_snapshot(cache_path, ConfigSnapshot(current, config))
+        except (OSError, TypeError):
+            # A read-only checkout or a config holding dates still works,
+            # just without the cache
+            pass
+
+    return interpolate_env(config), False
@@ -1,5 +1,13 @@
 from .commander import CommandExecutor
-from .models import CommandResult
-from .enums import CommandStatus
+from .async_commander import AsyncCommandExecutor
+from .models import CommandResult, CommandOutput
+from .enums import CommandStatus, OutputStream
 
-__all__ = ["CommandExecutor", "CommandResult", "CommandStatus"]
+__all__ = [
+    "CommandExecutor",
+    "AsyncCommandExecutor",
+    "CommandResult",
+    "CommandOutput",
+    "CommandStatus",
+    "OutputStream",
+]
@@ -0,0 +1,130 @@
+"""
+Module for executing commands through asyncio subprocesses.
+"""
+
+# Imports from standard library
+import asyncio
+import logging
+from typing import Iterable, List, Optional
+
+# Imports from package
+from .models import CommandResult
+from .enums import CommandStatus
+
+
+class AsyncCommandExecutor:
+    """Class for executing commands through asyncio subprocesses"""
+
+    def __init__(self, logger: logging.Logger, timeout: int = 300, concurrency: int = 8):
+        """
+        Initialize async command executor
+
+        Args:
+            timeout: Default command execution timeout in seconds
+            concurrency: Default number of commands execute_many runs at once
+        """
+        self._logger = logger.getChild("AsyncCommandExecutor")
+        self.timeout = timeout
+        self.concurrency = concurrency
+
+    def _prepare_command(self, command: str, use_sudo: bool = False) -> List[str]:
+        """
+        Prepare command to execute
+
+        Args:
+            command: Command to execute
+
+        Returns:
+            List of command arguments
+        """
+        if use_sudo:
+            return ["sudo"] + command.split()
+        return command.split()
+
+    async def execute(
+        self, command: str, use_sudo: bool = False, timeout: Optional[float] = None
+    ) -> CommandResult:
+        """
+        Execute command
+
+        Args:
+            command: Command to execute
+            timeout: Timeout in seconds, defaults to the executor timeout
+
+        Returns:
+            Command result
+        """
+        timeout = self.timeout if timeout is None else timeout
+
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *self._prepare_command(command, use_sudo),
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+        except Exception as e:
+            return CommandResult(
+                status=CommandStatus.FAILED,
+                stdout="",
+                stderr=str(e),
+                return_code=-1,
+                command=command,
+            )
+
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            return CommandResult(
+                status=CommandStatus.TIMEOUT,
+                stdout="",
+                stderr=f"Command timed out after {timeout} seconds",
+                return_code=-1,
+                command=command,
+            )
+        except asyncio.CancelledError:
+            process.kill()
+            await process.wait()
+            raise
+
+        return_code = process.returncode
+        status = CommandStatus.SUCCESS if return_code == 0 else CommandStatus.FAILED
+
+        return CommandResult(
+            status=status,
+            stdout=stdout.decode(errors="replace").strip(),
+            stderr=stderr.decode(errors="replace").strip(),
+            return_code=return_code,
+            command=command,
+        )
+
+    async def execute_many(
+        self,
+        commands: Iterable[str],
+        use_sudo: bool = False,
+        timeout: Optional[float] = None,
+        concurrency: Optional[int] = None,
+    ) -> List[CommandResult]:
+        """
+        Execute a batch of commands concurrently
+
+        Args:
+            commands: Commands to execute
+            timeout: Timeout in seconds applied to each command
+            concurrency: Maximum number of commands running at once,
+                defaults to the executor concurrency
+
+        Returns:
+            Command results in the order of the commands
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency or self.concurrency))
+
+        async def run(command: str) -> CommandResult:
+            async with semaphore:
+                return await self.execute(command, use_sudo, timeout)
+
+        commands = list(commands)
+        self._logger.debug("Executing %s commands", len(commands))
+
+        return list(await asyncio.gather(*(run(command) for command in commands)))
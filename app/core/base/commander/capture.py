@@ -0,0 +1,79 @@
+"""
+Module for capturing command output with bounded memory.
+"""
+
+# Imports from standard library
+import os
+import tempfile
+from collections import deque
+from typing import Optional
+
+
+class OutputBuffer:
+    """
+    Output kept in memory up to a threshold, then spilled to a temp file.
+
+    After spilling, the file holds the full output and only the last
+    `threshold` characters stay in memory.
+    """
+
+    def __init__(self, threshold: int, suffix: str):
+        self._threshold = threshold
+        self._suffix = suffix
+        self._chunks = deque()
+        self._size = 0
+        self._file = None
+
+    @property
+    def path(self) -> Optional[str]:
+        """
+        Path of the spill file, None if output fit in memory.
+        """
+        return self._file.name if self._file is not None else None
+
+    @property
+    def text(self) -> str:
+        """
+        Captured output, or its tail if it was spilled.
+        """
+        return "".join(self._chunks)
+
+    def write(self, data: str) -> None:
+        if self._file is None and self._size + len(data) > self._threshold:
+            self._file = tempfile.NamedTemporaryFile(
+                mode="w",
+                encoding="utf-8",
+                prefix="command-",
+                suffix=f".{self._suffix}",
+                delete=False,
+            )
+            self._file.write(self.text)
+
+        if self._file is not None:
+            self._file.write(data)
+
+        self._chunks.append(data)
+        self._size += len(data)
+
+        # Keep only the tail in memory once spilled
+        while (
+            self._file is not None
+            and self._size > self._threshold
+            and len(self._chunks) > 1
+        ):
+            self._size -= len(self._chunks.popleft())
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+
+    def discard(self) -> None:
+        """
+        Close and delete the spill file.
+        """
+        self.close()
+        if self._file is not None:
+            try:
+                os.unlink(self._file.name)
+            except FileNotFoundError:
+                pass
@@ -3,27 +3,44 @@ Module for executing commands through subprocess.
 """
 
 # Imports from standard library
+import queue
 import subprocess
 import logging
-from typing import List
+import threading
+import time
+from typing import IO, Callable, Generator, List, Optional
 
 # Imports from package
-from .models import CommandResult
-from .enums import CommandStatus
+from .capture import OutputBuffer
+from .models import CommandResult, CommandOutput
+from .enums import CommandStatus, OutputStream
+
+
+# Lines read ahead of the consumer per command; past this the pipes fill
+# and the command blocks on its writes
+_PENDING_LINES = 1024
 
 
 class CommandExecutor:
     """Class for executing commands through subprocess"""
 
-    def __init__(self, logger: logging.Logger, timeout: int = 300):
+    def __init__(
+        self,
+        logger: logging.Logger,
+        timeout: int = 300,
+        spill_threshold: int = 1024 * 1024,
+    ):
         """
         Initialize command executor
 
         Args:
             timeout: Command execution timeout in seconds
+            spill_threshold: Characters of streamed output kept in memory
+                per stream before spilling to a temp file
         """
         self._logger = logger.getChild("CommandExecutor")
         self.timeout = timeout
+        self.spill_threshold = spill_threshold
 
     def _prepare_command(self, command: str, use_sudo: bool = False) -> List[str]:
         """
@@ -140,3 +157,169 @@ class CommandExecutor:
                 return_code=-1,
                 command=command,
             )
+
+    def stream(
+        self, command: str, use_sudo: bool = False
+    ) -> Generator[CommandOutput, None, CommandResult]:
+        """
+        Execute command and yield its output lines as they arrive
+
+        Output past `spill_threshold` is written to temp files whose paths
+        are set on the result, which only keeps the tail in memory; closing
+        the result deletes them. Output is read no faster than it is
+        consumed. Closing the generator early kills the command and deletes
+        its spill files.
+
+        Args:
+            command: Command to execute
+
+        Yields:
+            Output lines
+
+        Returns:
+            Command result, as the value of StopIteration
+        """
+        try:
+            process = subprocess.Popen(
+                self._prepare_command(command, use_sudo),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                errors="replace",
+                bufsize=1,
+            )
+        except Exception as e:
+            return CommandResult(
+                status=CommandStatus.FAILED,
+                stdout="",
+                stderr=str(e),
+                return_code=-1,
+                command=command,
+            )
+
+        lines = queue.Queue(maxsize=_PENDING_LINES)
+        stopped = threading.Event()
+        for pipe, stream in (
+            (process.stdout, OutputStream.STDOUT),
+            (process.stderr, OutputStream.STDERR),
+        ):
+            threading.Thread(
+                target=self._pump, args=(pipe, stream, lines, stopped), daemon=True
+            ).start()
+
+        buffers = {
+            OutputStream.STDOUT: OutputBuffer(self.spill_threshold, "stdout"),
+            OutputStream.STDERR: OutputBuffer(self.spill_threshold, "stderr"),
+        }
+        deadline = time.monotonic() + self.timeout
+        open_streams = len(buffers)
+
+        try:
+            while open_streams:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise subprocess.TimeoutExpired(command, self.timeout)
+
+                try:
+                    stream, line = lines.get(timeout=remaining)
+                except queue.Empty:
+                    continue
+
+                if line is None:
+                    open_streams -= 1
+                    continue
+
+                buffers[stream].write(line)
+                yield CommandOutput(stream=stream, line=line.rstrip("\n"))
+
+            return_code = process.wait(timeout=max(deadline - time.monotonic(), 0))
+            status = CommandStatus.SUCCESS if return_code == 0 else CommandStatus.FAILED
+            stderr = buffers[OutputStream.STDERR].text.strip()
+
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+            status = CommandStatus.TIMEOUT
+            return_code = -1
+            stderr = f"Command timed out after {self.timeout} seconds"
+
+        except BaseException:
+            # Early close or error, no result will point at the spill files
+            for buffer in buffers.values():
+                buffer.discard()
+            raise
+
+        finally:
+            # Runs on early close too, the command must not outlive us
+            stopped.set()
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            for buffer in buffers.values():
+                buffer.close()
+
+        return CommandResult(
+            status=status,
+            stdout=buffers[OutputStream.STDOUT].text.strip(),
+            stderr=stderr,
+            return_code=return_code,
+            command=command,
+            stdout_path=buffers[OutputStream.STDOUT].path,
+            stderr_path=buffers[OutputStream.STDERR].path,
+        )
+
+    def execute_streaming(
+        self,
+        command: str,
+        use_sudo: bool = False,
+        on_output: Optional[Callable[[CommandOutput], None]] = None,
+    ) -> CommandResult:
+        """
+        Execute command passing each output line to a callback
+
+        Args:
+            command: Command to execute
+            on_output: Called with every output line as it arrives
+
+        Returns:
+            Command result
+        """
+        output = self.stream(command, use_sudo)
+        while True:
+            try:
+                line = next(output)
+            except StopIteration as stop:
+                return stop.value
+
+            if on_output is not None:
+                on_output(line)
+
+    @staticmethod
+    def _pump(
+        pipe: IO[str],
+        stream: OutputStream,
+        lines: queue.Queue,
+        stopped: threading.Event,
+    ) -> None:
+        """
+        Forward lines from a pipe to a queue, then None when it closes
+
+        Gives up once `stopped` is set, as nobody reads the queue anymore
+        """
+
+        def put(item) -> bool:
+            while not stopped.is_set():
+                try:
+                    lines.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        try:
+            for line in iter(pipe.readline, ""):
+                if not put((stream, line)):
+                    return
+        finally:
+            pipe.close()
+            put((stream, None))
@@ -17,3 +17,10 @@ class CommandStatus(Enum):
     SUCCESS = "SUCCESS"
     FAILED = "FAILED"
     TIMEOUT = "TIMEOUT"
+
+
+class OutputStream(Enum):
+    """Command output streams"""
+
+    STDOUT = "stdout"
+    STDERR = "stderr"
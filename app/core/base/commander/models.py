@@ -3,10 +3,12 @@ Models for working with commands.
 """
 
 # Imports from standard library
+import os
 from dataclasses import dataclass
+from typing import Optional
 
 # Imports from enums
-from .enums import CommandStatus
+from .enums import CommandStatus, OutputStream
 
 
 # ------------------------------------
@@ -16,10 +18,40 @@ from .enums import CommandStatus
 
 @dataclass
 class CommandResult:
-    """Command execution result"""
+    """Command execution result
+
+    Spilled output stays in the files at `stdout_path` and `stderr_path`
+    until `close`, also called when used as a context manager.
+    """
 
     status: CommandStatus
     stdout: str
     stderr: str
     return_code: int
     command: str
+    stdout_path: Optional[str] = None
+    stderr_path: Optional[str] = None
+
+    def close(self) -> None:
+        """Delete the spill files"""
+        for path in (self.stdout_path, self.stderr_path):
+            if path is not None:
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+        self.stdout_path = self.stderr_path = None
+
+    def __enter__(self) -> "CommandResult":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+@dataclass
+class CommandOutput:
+    """Line of command output"""
+
+    stream: OutputStream
+    line: str
@@ -3,8 +3,9 @@ Module for dependency injection container.
 """
 
 # Imports from standard library
+import importlib
 import os
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any, Callable, Optional
 
 # Imports from third party libraries
 from dependency_injector import containers, providers
@@ -16,12 +17,40 @@ if TYPE_CHECKING:
     import logging
 
     # Imports from core modules
-    from app.core.base.commander import CommandExecutor
+    from app.core.base.commander import CommandExecutor, AsyncCommandExecutor
 
     # Imports from services modules
-    from app.services.docker_service import DockerService
+    from app.services.metrics_service import MetricsService
+    from app.services.docker_service import DockerService, AsyncDockerService
     from app.services.container_manager import ContainerManagerService
+    from app.services.apt_proxy_service import AptProxyService
     from app.services.os_builder_service import OSBuilderService
+    from app.services.os_builder_service.chroot_backend import ChrootBackend
+    from app.services.os_builder_service.package_index import PackageIndexStore
+    from app.services.image_cache_service import ImageCacheService
+    from app.services.export_service import ExportService
+    from app.services.artifact_store_service import ArtifactStoreService
+    from app.services.job_queue_service import JobQueueService
+
+    # Imports from api modules
+    from app.api import ApiServer
+
+    # Imports from builder modules
+    from app.builder import BuildEngine
+
+
+def _deferred(module: str, name: str) -> Callable[..., Any]:
+    """
+    Callable importing `module` on first call and forwarding to its
+    attribute `name`, so a service's modules load only when its provider
+    is first resolved.
+    """
+
+    def create(*args, **kwargs):
+        return getattr(importlib.import_module(module), name)(*args, **kwargs)
+
+    create.__name__ = create.__qualname__ = name
+    return create
 
 
 def _find_project_root() -> str:
@@ -38,7 +67,7 @@ def _find_project_root() -> str:
     current_dir = os.getcwd()
 
     while current_dir != os.path.dirname(current_dir):
-        if ".root" in os.listdir(current_dir):
+        if os.path.exists(os.path.join(current_dir, ".root")):
             return current_dir
         current_dir = os.path.dirname(current_dir)
 
@@ -64,6 +93,10 @@ def _init_logger(config: providers.Configuration) -> "logging.Logger":
         fmt=config.logging.format,
         datefmt=config.logging.datefmt,
         use_colors=config.logging.use_colors,
+        use_queue=config.logging.use_queue,
+        json=config.logging.json,
+        batch_size=config.logging.batch_size,
+        flush_interval=config.logging.flush_interval,
     )
 
     return providers.Singleton(get_logger, log_config)
@@ -76,24 +109,73 @@ def _init_commander(
     Initialize commander.
     """
 
-    from app.core.base.commander import CommandExecutor
+    CommandExecutor = _deferred("app.core.base.commander", "CommandExecutor")
 
     return providers.Singleton(
         CommandExecutor,
         logger=logger,
         timeout=config.commander.timeout,
+        spill_threshold=config.commander.spill_threshold,
+    )
+
+
+def _init_async_commander(
+    config: providers.Configuration, logger: providers.Singleton
+) -> "AsyncCommandExecutor":
+    """
+    Initialize async commander.
+    """
+
+    AsyncCommandExecutor = _deferred("app.core.base.commander", "AsyncCommandExecutor")
+
+    return providers.Singleton(
+        AsyncCommandExecutor,
+        logger=logger,
+        timeout=config.commander.timeout,
+        concurrency=config.commander.concurrency,
+    )
+
+
+def _init_metrics(
+    config: providers.Configuration, logger: providers.Singleton
+) -> "MetricsService":
+    """
+    Initialize metrics.
+    """
+
+    MetricsService = _deferred("app.services.metrics_service", "MetricsService")
+    MetricsConfig = _deferred("app.services.metrics_service", "MetricsConfig")
+
+    # Metrics config
+    metrics_config = providers.Factory(
+        MetricsConfig,
+        namespace=config.metrics.namespace,
+        file_path=config.metrics.file_path,
+        file_interval=config.metrics.file_interval,
+        http_host=config.metrics.http_host,
+        http_port=config.metrics.http_port,
+    )
+
+    return providers.Singleton(
+        MetricsService,
+        logger=logger,
+        configuration=metrics_config,
     )
 
 
 def _init_docker_service(
     config: providers.Configuration,
     logger: providers.Singleton,
+    metrics: providers.Singleton,
 ) -> "DockerService":
     """
     Initialize docker service.
     """
 
-    from app.services.docker_service import DockerService, DockerServiceConfig
+    DockerService = _deferred("app.services.docker_service", "DockerService")
+    DockerServiceConfig = _deferred(
+        "app.services.docker_service", "DockerServiceConfig"
+    )
 
     # Docker service config
     docker_config = providers.Factory(
@@ -101,46 +183,435 @@ def _init_docker_service(
         base_url=config.docker.base_url,
         version=config.docker.version,
         timeout=config.docker.timeout,
+        max_connections=config.docker.max_connections,
+        image_ttl=config.docker.image_ttl,
+        watch_containers=config.docker.watch_containers,
     )
 
     return providers.Singleton(
         DockerService,
         logger=logger,
         configuration=docker_config,
+        metrics=metrics,
+    )
+
+
+def _init_async_docker_service(
+    config: providers.Configuration,
+    logger: providers.Singleton,
+) -> "AsyncDockerService":
+    """
+    Initialize async docker service.
+    """
+
+    AsyncDockerService = _deferred("app.services.docker_service", "AsyncDockerService")
+    DockerServiceConfig = _deferred(
+        "app.services.docker_service", "DockerServiceConfig"
+    )
+
+    # Docker service config
+    docker_config = providers.Factory(
+        DockerServiceConfig,
+        base_url=config.docker.base_url,
+        version=config.docker.version,
+        timeout=config.docker.timeout,
+        max_connections=config.docker.max_connections,
+    )
+
+    return providers.Singleton(
+        AsyncDockerService,
+        logger=logger,
+        configuration=docker_config,
+    )
+
+
+def _init_apt_proxy(
+    config: providers.Configuration,
+    logger: providers.Singleton,
+) -> "AptProxyService":
+    """
+    Initialize APT proxy.
+    """
+
+    AptProxyService = _deferred("app.services.apt_proxy_service", "AptProxyService")
+    AptProxyConfig = _deferred("app.services.apt_proxy_service", "AptProxyConfig")
+
+    # APT proxy config
+    apt_proxy_config = providers.Factory(
+        AptProxyConfig,
+        enabled=config.apt_proxy.enabled,
+        host=config.apt_proxy.host,
+        port=config.apt_proxy.port,
+        advertise_host=config.apt_proxy.advertise_host,
+        cache_dir=config.apt_proxy.cache_dir,
+        max_size=config.apt_proxy.max_size,
+        mirror=config.apt_proxy.mirror,
+        timeout=config.apt_proxy.timeout,
+    )
+
+    return providers.Singleton(
+        AptProxyService,
+        logger=logger,
+        configuration=apt_proxy_config,
     )
 
 
 def _init_container_manager(
+    config: providers.Configuration,
     logger: providers.Singleton,
     docker_service: providers.Singleton,
+    apt_proxy: providers.Singleton,
+    metrics: providers.Singleton,
 ) -> "ContainerManagerService":
     """
     Initialize container manager.
     """
 
-    from app.services.container_manager import ContainerManagerService
+    ContainerManagerService = _deferred(
+        "app.services.container_manager", "ContainerManagerService"
+    )
+    ContainerManagerConfig = _deferred(
+        "app.services.container_manager", "ContainerManagerConfig"
+    )
+
+    # Container manager config
+    container_manager_config = providers.Factory(
+        ContainerManagerConfig,
+        gc_ttl=config.container_manager.gc_ttl,
+        gc_interval=config.container_manager.gc_interval,
+    )
 
     return providers.Singleton(
         ContainerManagerService,
         logger=logger,
         docker_service=docker_service,
+        configuration=container_manager_config,
+        apt_proxy=apt_proxy,
+        metrics=metrics,
+    )
+
+
+def _init_image_cache(
+    config: providers.Configuration,
+    logger: providers.Singleton,
+    docker_service: providers.Singleton,
+) -> "ImageCacheService":
+    """
+    Initialize image cache.
+    """
+
+    ImageCacheService = _deferred(
+        "app.services.image_cache_service", "ImageCacheService"
+    )
+    ImageCacheConfig = _deferred("app.services.image_cache_service", "ImageCacheConfig")
+
+    # Image cache config
+    image_cache_config = providers.Factory(
+        ImageCacheConfig,
+        enabled=config.image_cache.enabled,
+        repository=config.image_cache.repository,
+        max_size=config.image_cache.max_size,
+        index_path=config.image_cache.index_path,
+    )
+
+    return providers.Singleton(
+        ImageCacheService,
+        logger=logger,
+        docker_service=docker_service,
+        configuration=image_cache_config,
+    )
+
+
+def _init_exporter(
+    config: providers.Configuration,
+    logger: providers.Singleton,
+    docker_service: providers.Singleton,
+) -> "ExportService":
+    """
+    Initialize exporter.
+    """
+
+    ExportService = _deferred("app.services.export_service", "ExportService")
+    ExportConfig = _deferred("app.services.export_service", "ExportConfig")
+
+    # Export config
+    export_config = providers.Factory(
+        ExportConfig,
+        output_path=config.export.output_path,
+        format=config.export.format,
+        level=config.export.level,
+        threads=config.export.threads,
+        chunk_size=config.export.chunk_size,
+        block_size=config.export.block_size,
+    )
+
+    return providers.Singleton(
+        ExportService,
+        logger=logger,
+        docker_service=docker_service,
+        configuration=export_config,
+    )
+
+
+def _init_artifact_store(
+    config: providers.Configuration,
+    logger: providers.Singleton,
+    docker_service: providers.Singleton,
+) -> "ArtifactStoreService":
+    """
+    Initialize artifact store.
+    """
+
+    ArtifactStoreService = _deferred(
+        "app.services.artifact_store_service", "ArtifactStoreService"
+    )
+    ArtifactStoreConfig = _deferred(
+        "app.services.artifact_store_service", "ArtifactStoreConfig"
+    )
+
+    # Artifact store config
+    artifact_store_config = providers.Factory(
+        ArtifactStoreConfig,
+        path=config.artifact_store.path,
+        min_chunk_size=config.artifact_store.min_chunk_size,
+        avg_chunk_size=config.artifact_store.avg_chunk_size,
+        max_chunk_size=config.artifact_store.max_chunk_size,
+        compression_level=config.artifact_store.compression_level,
+        threads=config.artifact_store.threads,
+    )
+
+    return providers.Singleton(
+        ArtifactStoreService,
+        logger=logger,
+        docker_service=docker_service,
+        configuration=artifact_store_config,
+    )
+
+
+def _init_chroot_backend(
+    config: providers.Configuration,
+    logger: providers.Singleton,
+    exporter: providers.Singleton,
+    metrics: providers.Singleton,
+) -> "ChrootBackend":
+    """
+    Initialize chroot build backend.
+    """
+
+    CommandExecutor = _deferred("app.core.base.commander", "CommandExecutor")
+    ChrootBackend = _deferred(
+        "app.services.os_builder_service.chroot_backend", "ChrootBackend"
+    )
+    ChrootBackendConfig = _deferred(
+        "app.services.os_builder_service", "ChrootBackendConfig"
+    )
+
+    # Debootstrap and apt-get run far longer than the default timeout
+    commander = providers.Factory(
+        CommandExecutor,
+        logger=logger,
+        timeout=config.chroot.command_timeout,
+        spill_threshold=config.commander.spill_threshold,
+    )
+
+    # Chroot backend config
+    chroot_config = providers.Factory(
+        ChrootBackendConfig,
+        root_path=config.chroot.root_path,
+        tmpfs=config.chroot.tmpfs,
+        tmpfs_size=config.chroot.tmpfs_size,
+        mirror=config.chroot.mirror,
+        variant=config.chroot.variant,
+        use_sudo=config.chroot.use_sudo,
+        command_timeout=config.chroot.command_timeout,
+    )
+
+    return providers.Singleton(
+        ChrootBackend,
+        logger=logger,
+        commander=commander,
+        exporter=exporter,
+        configuration=chroot_config,
+        metrics=metrics,
+    )
+
+
+def _init_package_index(
+    config: providers.Configuration,
+    logger: providers.Singleton,
+) -> Optional["PackageIndexStore"]:
+    """
+    Initialize package index, None without `os_builder.package_index_path`.
+    """
+
+    PackageIndexStore = _deferred(
+        "app.services.os_builder_service.package_index", "PackageIndexStore"
+    )
+
+    def create(logger, path, **kwargs):
+        return PackageIndexStore(logger, path, **kwargs) if path is not None else None
+
+    return providers.Singleton(
+        create,
+        logger=logger,
+        path=config.os_builder.package_index_path,
+        fetch=config.os_builder.package_index_fetch,
+        mirror=config.os_builder.package_index_mirror,
+        components=config.os_builder.package_index_components,
+        max_age=config.os_builder.package_index_max_age,
     )
 
 
 def _init_os_builder(
+    config: providers.Configuration,
     logger: providers.Singleton,
     container_manager: providers.Singleton,
+    image_cache: providers.Singleton,
+    exporter: providers.Singleton,
+    artifact_store: providers.Singleton,
+    metrics: providers.Singleton,
+    chroot_backend: providers.Singleton,
+    package_index: providers.Singleton,
 ) -> "OSBuilderService":
     """
     Initialize OS builder.
     """
 
-    from app.services.os_builder_service import OSBuilderService
+    OSBuilderService = _deferred("app.services.os_builder_service", "OSBuilderService")
+    OSBuilderServiceConfig = _deferred(
+        "app.services.os_builder_service", "OSBuilderServiceConfig"
+    )
+
+    # OS builder config
+    os_builder_config = providers.Factory(
+        OSBuilderServiceConfig,
+        backend=config.os_builder.backend,
+        max_workers=config.os_builder.max_workers,
+        max_builds_per_target=config.os_builder.max_builds_per_target,
+        image_repository=config.os_builder.image_repository,
+        manifest_path=config.os_builder.manifest_path,
+        export_after_build=config.os_builder.export_after_build,
+        warm_pool_size=config.os_builder.warm_pool_size,
+        warm_pool_targets=config.os_builder.warm_pool_targets,
+        warm_pool_max_idle=config.os_builder.warm_pool_max_idle,
+        package_index_path=config.os_builder.package_index_path,
+        package_index_fetch=config.os_builder.package_index_fetch,
+        package_index_mirror=config.os_builder.package_index_mirror,
+        package_index_components=config.os_builder.package_index_components,
+        package_index_max_age=config.os_builder.package_index_max_age,
+        minimize=config.os_builder.minimize,
+        minimize_keep_locales=config.os_builder.minimize_keep_locales,
+        squash=config.os_builder.squash,
+        max_layers=config.os_builder.max_layers,
+    )
 
     return providers.Singleton(
         OSBuilderService,
         logger=logger,
         container_manager=container_manager,
+        configuration=os_builder_config,
+        image_cache=image_cache,
+        exporter=exporter,
+        artifact_store=artifact_store,
+        metrics=metrics,
+        backends=providers.Dict(chroot=chroot_backend),
+        package_index=package_index,
+    )
+
+
+def _init_job_queue(
+    config: providers.Configuration,
+    logger: providers.Singleton,
+    os_builder: providers.Singleton,
+    metrics: providers.Singleton,
+    package_index: providers.Singleton,
+) -> "JobQueueService":
+    """
+    Initialize job queue. The OS builder and package index are passed as
+    providers, so submitting and listing jobs leave them unresolved.
+    """
+
+    JobQueueService = _deferred("app.services.job_queue_service", "JobQueueService")
+    JobQueueConfig = _deferred("app.services.job_queue_service", "JobQueueConfig")
+
+    # Job queue config
+    job_queue_config = providers.Factory(
+        JobQueueConfig,
+        path=config.job_queue.path,
+        workers=config.job_queue.workers,
+        poll_interval=config.job_queue.poll_interval,
+        job_timeout=config.job_queue.job_timeout,
+        max_attempts=config.job_queue.max_attempts,
+    )
+
+    return providers.Singleton(
+        JobQueueService,
+        logger=logger,
+        os_builder=os_builder.provider,
+        configuration=job_queue_config,
+        metrics=metrics,
+        package_index=package_index.provider,
+    )
+
+
+def _init_api(
+    config: providers.Configuration,
+    logger: providers.Singleton,
+    job_queue: providers.Singleton,
+) -> "ApiServer":
+    """
+    Initialize HTTP API.
+    """
+
+    ApiServer = _deferred("app.api", "ApiServer")
+    ApiConfig = _deferred("app.api", "ApiConfig")
+
+    # API config
+    api_config = providers.Factory(
+        ApiConfig,
+        host=config.api.host,
+        port=config.api.port,
+        start_workers=config.api.start_workers,
+        backlog_lines=config.api.backlog_lines,
+        max_builds=config.api.max_builds,
+        client_queue_size=config.api.client_queue_size,
+        heartbeat=config.api.heartbeat,
+        keep_alive_timeout=config.api.keep_alive_timeout,
+        max_body=config.api.max_body,
+    )
+
+    return providers.Singleton(
+        ApiServer,
+        logger=logger,
+        job_queue=job_queue,
+        configuration=api_config,
+    )
+
+
+def _init_build_engine(
+    config: providers.Configuration,
+    logger: providers.Singleton,
+    container_manager: providers.Singleton,
+) -> "BuildEngine":
+    """
+    Initialize build engine.
+    """
+
+    BuildEngine = _deferred("app.builder", "BuildEngine")
+    BuildEngineConfig = _deferred("app.builder", "BuildEngineConfig")
+
+    # Build engine config
+    build_engine_config = providers.Factory(
+        BuildEngineConfig,
+        repository=config.builder.repository,
+        max_workers=config.builder.max_workers,
+    )
+
+    return providers.Singleton(
+        BuildEngine,
+        logger=logger,
+        container_manager=container_manager,
+        configuration=build_engine_config,
     )
 
 
@@ -163,11 +634,59 @@ class Container(containers.DeclarativeContainer):
     # Commander Core
     commander = _init_commander(config, logger)
 
+    # Async commander Core
+    async_commander = _init_async_commander(config, logger)
+
+    # Metrics
+    metrics = _init_metrics(config, logger)
+
     # Docker service
-    docker_service = _init_docker_service(config, logger)
+    docker_service = _init_docker_service(config, logger, metrics)
+
+    # Async docker service
+    async_docker_service = _init_async_docker_service(config, logger)
+
+    # APT proxy
+    apt_proxy = _init_apt_proxy(config, logger)
 
     # Container manager
-    container_manager = _init_container_manager(logger, docker_service)
+    container_manager = _init_container_manager(
+        config, logger, docker_service, apt_proxy, metrics
+    )
+
+    # Image cache
+    image_cache = _init_image_cache(config, logger, docker_service)
+
+    # Exporter
+    exporter = _init_exporter(config, logger, docker_service)
+
+    # Artifact store
+    artifact_store = _init_artifact_store(config, logger, docker_service)
+
+    # Chroot build backend
+    chroot_backend = _init_chroot_backend(config, logger, exporter, metrics)
+
+    # Package index
+    package_index = _init_package_index(config, logger)
 
     # OS builder
-    os_builder = _init_os_builder(logger, container_manager)
+    os_builder = _init_os_builder(
+        config,
+        logger,
+        container_manager,
+        image_cache,
+        exporter,
+        artifact_store,
+        metrics,
+        chroot_backend,
+        package_index,
+    )
+
+    # Job queue
+    job_queue = _init_job_queue(config, logger, os_builder, metrics, package_index)
+
+    # HTTP API
+    api = _init_api(config, logger, job_queue)
+
+    # Build engine
+    build_engine = _init_build_engine(config, logger, container_manager)
@@ -1,4 +1,5 @@
+from .formatters import JsonFormatter
 from .logger import get_logger
 from .models import LogConfig
 
-__all__ = ["get_logger", "LogConfig"]
+__all__ = ["get_logger", "LogConfig", "JsonFormatter"]
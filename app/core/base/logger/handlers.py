@@ -0,0 +1,214 @@
+"""
+Logger handlers for the queue-based pipeline.
+"""
+
+# Imports from standard library
+import atexit
+import copy
+import queue
+import threading
+import time
+import weakref
+from typing import Iterable, List, Tuple
+
+# Imports from third party libraries
+import logging
+from logging.handlers import QueueHandler, RotatingFileHandler
+
+
+class LogQueueHandler(QueueHandler):
+    """
+    Queue handler doing only what must happen on the calling thread.
+
+    Arguments are merged into the message and the traceback is rendered to
+    `exc_text`; layout is left to the listener's formatters.
+    """
+
+    _exception_formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+
+        if record.exc_info:
+            record.exc_text = self._exception_formatter.formatException(
+                record.exc_info
+            )
+        record.exc_info = None
+        return record
+
+
+class BatchWriteMixin:
+    """
+    Handler mixin writing a batch of records with one write and one flush.
+    """
+
+    def handle_batch(self, records: List[logging.LogRecord]) -> None:
+        messages = []
+        for record in records:
+            if record.levelno < self.level or not self.filter(record):
+                continue
+            try:
+                messages.append((record, self.format(record) + self.terminator))
+            except Exception:
+                self.handleError(record)
+
+        if not messages:
+            return
+
+        self.acquire()
+        try:
+            self._write_messages(messages)
+        except Exception:
+            self.handleError(messages[-1][0])
+        finally:
+            self.release()
+
+    def _write_messages(self, messages: List[Tuple[logging.LogRecord, str]]) -> None:
+        self.stream.write("".join(message for _, message in messages))
+        self.flush()
+
+
+class BatchStreamHandler(BatchWriteMixin, logging.StreamHandler):
+    """
+    Stream handler accepting batches.
+    """
+
+
+class BatchFileHandler(BatchWriteMixin, logging.FileHandler):
+    """
+    File handler accepting batches.
+    """
+
+
+class BatchRotatingFileHandler(BatchWriteMixin, RotatingFileHandler):
+    """
+    Rotating file handler accepting batches.
+
+    The file position is tracked across the batch instead of asking the
+    stream for it per record, which would flush every line.
+    """
+
+    def _write_messages(self, messages: List[Tuple[logging.LogRecord, str]]) -> None:
+        if self.stream is None:
+            self.stream = self._open()
+
+        rotate = self.maxBytes > 0
+        position = self.stream.tell() if rotate else 0
+        pending = []
+
+        for _, message in messages:
+            if rotate and position and position + len(message) >= self.maxBytes:
+                self.stream.write("".join(pending))
+                self.doRollover()
+                pending, position = [], 0
+
+            pending.append(message)
+            position += len(message)
+
+        self.stream.write("".join(pending))
+        self.flush()
+
+
+class BatchingQueueListener:
+    """
+    Listener thread draining a log queue in batches.
+
+    After the first record of a batch arrives the listener keeps collecting
+    for up to `flush_interval` seconds or `batch_size` records, then hands
+    the batch to each handler. Handlers with `handle_batch` write it in one
+    go; others get the records one by one.
+    """
+
+    _sentinel = None
+
+    def __init__(
+        self,
+        log_queue: "queue.SimpleQueue",
+        handlers: Iterable[logging.Handler],
+        batch_size: int = 256,
+        flush_interval: float = 0.05,
+    ):
+        self.queue = log_queue
+        self.handlers = tuple(handlers)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.0, flush_interval)
+        self._thread = None
+
+    def start(self) -> None:
+        """
+        Start the listener thread.
+        """
+        self._thread = threading.Thread(
+            target=self._monitor, name="LogListener", daemon=True
+        )
+        self._thread.start()
+        _listeners.add(self)
+
+    def stop(self) -> None:
+        """
+        Write the queued records and stop the listener thread.
+        """
+        if self._thread is not None:
+            self.queue.put_nowait(self._sentinel)
+            self._thread.join()
+            self._thread = None
+        _listeners.discard(self)
+
+    def add_handler(self, handler: logging.Handler) -> None:
+        """
+        Add a handler to a running listener.
+        """
+        self.handlers = self.handlers + (handler,)
+
+    def _monitor(self) -> None:
+        while True:
+            record = self.queue.get()
+            if record is self._sentinel:
+                return
+
+            batch = [record]
+            deadline = time.monotonic() + self.flush_interval
+            stopping = False
+
+            while len(batch) < self.batch_size:
+                try:
+                    remaining = deadline - time.monotonic()
+                    if remaining > 0:
+                        record = self.queue.get(timeout=remaining)
+                    else:
+                        record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+
+                if record is self._sentinel:
+                    stopping = True
+                    break
+                batch.append(record)
+
+            self._dispatch(batch)
+            if stopping:
+                return
+
+    def _dispatch(self, records: List[logging.LogRecord]) -> None:
+        for handler in self.handlers:
+            handle_batch = getattr(handler, "handle_batch", None)
+            if handle_batch is not None:
+                handle_batch(records)
+                continue
+
+            for record in records:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+
+
+# Running listeners, stopped at exit so queued records are written
+_listeners: "weakref.WeakSet[BatchingQueueListener]" = weakref.WeakSet()
+
+
+@atexit.register
+def _stop_listeners() -> None:
+    for listener in list(_listeners):
+        listener.stop()
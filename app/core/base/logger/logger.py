@@ -3,29 +3,42 @@ Logger module.
 """
 
 # Imports from standard library
+import importlib.util
 import os
-from typing import Optional
+import queue
+from typing import Dict, List, Optional
 
 # Imports from third party libraries
 import logging
 from logging.handlers import RotatingFileHandler
 
 # Imports from local modules
+from .formatters import JsonFormatter
+from .handlers import (
+    BatchFileHandler,
+    BatchingQueueListener,
+    BatchRotatingFileHandler,
+    BatchStreamHandler,
+    LogQueueHandler,
+)
 from .models import LogConfig
 
 
-# Try set colormode output
-try:
-    import colorlog
+# Check for colormode output; colorlog itself is imported when used
+COLORLOG_INSTALLED = importlib.util.find_spec("colorlog") is not None
 
-    COLORLOG_INSTALLED = True
-except ImportError:
-    COLORLOG_INSTALLED = False
+
+# Queue listeners by logger name
+_queue_listeners: Dict[str, BatchingQueueListener] = {}
 
 
 def get_logger(config: Optional[LogConfig] = None, **kwargs) -> logging.Logger:
     """
     Get instance of logger.
+
+    With `use_queue` the logger only enqueues records; a listener thread
+    formats and writes them in batches. Calling it again for the same name
+    does not add handlers that already exist.
     """
 
     # Allow legacy kwargs for backward compatibility
@@ -38,6 +51,8 @@ def get_logger(config: Optional[LogConfig] = None, **kwargs) -> logging.Logger:
         "datefmt",
         "propagate",
         "use_colors",
+        "use_queue",
+        "json",
     ]:
         if key in kwargs and getattr(config, key, None) is None:
             setattr(config, key, kwargs[key])
@@ -55,11 +70,27 @@ def get_logger(config: Optional[LogConfig] = None, **kwargs) -> logging.Logger:
 
     log_datefmt = config.datefmt or "%Y-%m-%d %H:%M:%S"
 
+    # Handlers already writing for this logger, directly or via its listener
+    listener = _queue_listeners.get(config.name)
+    existing = list(logger.handlers) + list(listener.handlers if listener else [])
+    new_handlers: List[logging.Handler] = []
+
     # Configure console handler
-    if "console" in config.handlers:
+    if "console" in config.handlers and not any(
+        isinstance(handler, logging.StreamHandler)
+        and not isinstance(handler, logging.FileHandler)
+        for handler in existing
+    ):
+        ch = BatchStreamHandler() if config.use_queue else logging.StreamHandler()
+
+        # Configure structured output if requested
+        if config.json:
+            ch.setFormatter(JsonFormatter(datefmt=config.datefmt))
 
         # Configure colorized output if supported
-        if config.use_colors and COLORLOG_INSTALLED:
+        elif config.use_colors and COLORLOG_INSTALLED:
+            import colorlog
+
             color_formatter = colorlog.ColoredFormatter(
                 "%(log_color)s" + log_format,
                 datefmt=log_datefmt,
@@ -71,21 +102,13 @@ def get_logger(config: Optional[LogConfig] = None, **kwargs) -> logging.Logger:
                     "CRITICAL": "bold_red",
                 },
             )
-            ch = logging.StreamHandler()
             ch.setFormatter(color_formatter)
 
         # Configure plain text output if not supported
         else:
-            formatter = logging.Formatter(log_format, datefmt=log_datefmt)
-            ch = logging.StreamHandler()
-            ch.setFormatter(formatter)
-
-        # Add handler to logger
+            ch.setFormatter(logging.Formatter(log_format, datefmt=log_datefmt))
 
-        if not any(
-            isinstance(handler, logging.StreamHandler) for handler in logger.handlers
-        ):
-            logger.addHandler(ch)
+        new_handlers.append(ch)
 
     # Configure file handler
     if "file" in config.handlers and config.file_config:
@@ -104,28 +127,61 @@ def get_logger(config: Optional[LogConfig] = None, **kwargs) -> logging.Logger:
 
         fh = None
 
-        # Create rotating file handler if max bytes is set
-        if max_bytes > 0:
-            fh = RotatingFileHandler(
-                file_path,
-                maxBytes=max_bytes,
-                backupCount=backup_count,
-                encoding="utf-8",
-            )
+        # Skip if a handler already writes to this file
+        if not any(
+            isinstance(handler, logging.FileHandler)
+            and handler.baseFilename == os.path.abspath(file_path)
+            for handler in existing
+        ):
 
-        # Create file handler if max bytes is not set
-        else:
-            if not any(
-                isinstance(handler, logging.FileHandler) for handler in logger.handlers
-            ):
-                fh = logging.FileHandler(file_path, encoding="utf-8")
+            # Create rotating file handler if max bytes is set
+            if max_bytes > 0:
+                rotating_handler = RotatingFileHandler
+                if config.use_queue:
+                    rotating_handler = BatchRotatingFileHandler
+                fh = rotating_handler(
+                    file_path,
+                    maxBytes=max_bytes,
+                    backupCount=backup_count,
+                    encoding="utf-8",
+                )
+
+            # Create file handler if max bytes is not set
+            else:
+                file_handler = (
+                    BatchFileHandler if config.use_queue else logging.FileHandler
+                )
+                fh = file_handler(file_path, encoding="utf-8")
 
         if fh is not None:
             # Configure formatter
-            formatter = logging.Formatter(log_format, datefmt=log_datefmt)
-            fh.setFormatter(logging.Formatter(log_format, datefmt=log_datefmt))
+            if config.json:
+                fh.setFormatter(JsonFormatter(datefmt=config.datefmt))
+            else:
+                fh.setFormatter(logging.Formatter(log_format, datefmt=log_datefmt))
+
+            new_handlers.append(fh)
+
+    # Hand handlers to the listener thread in queue mode
+    if config.use_queue:
+        if listener is None:
+            log_queue = queue.SimpleQueue()
+            listener = BatchingQueueListener(
+                log_queue,
+                new_handlers,
+                batch_size=config.batch_size,
+                flush_interval=config.flush_interval,
+            )
+            listener.start()
+            _queue_listeners[config.name] = listener
+            logger.addHandler(LogQueueHandler(log_queue))
+        else:
+            for handler in new_handlers:
+                listener.add_handler(handler)
 
-            # Add handler to logger
-            logger.addHandler(fh)
+    # Add handlers to logger
+    else:
+        for handler in new_handlers:
+            logger.addHandler(handler)
 
     return logger
@@ -31,6 +31,10 @@ class LogConfig:
     datefmt: str = None
     propagate: bool = False
     use_colors: bool = True
+    use_queue: bool = False
+    json: bool = False
+    batch_size: int = 256
+    flush_interval: float = 0.05
 
     def __post_init__(self) -> None:
         # Set file name
@@ -0,0 +1,113 @@
+"""
+Check cold start time against the configured budget.
+
+Usage:
+    python -m app.scripts.check_startup [--runs N] [--budget SECONDS]
+
+Starts a fresh interpreter that constructs the Application `runs` times
+and fails when the median exceeds `app.startup_budget` (or --budget).
+On failure the slowest imports of one more run are listed.
+"""
+
+# Imports from standard library
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from typing import List, Optional
+
+
+STARTUP_CODE = "from app.core.application import get_application; get_application()"
+
+
+def measure_startup(cwd: str) -> float:
+    """
+    Time one cold start in seconds, interpreter startup included.
+    """
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", STARTUP_CODE],
+        cwd=cwd,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    elapsed = time.perf_counter() - started
+
+    if result.returncode != 0:
+        raise RuntimeError(f"Application failed to start:\n{result.stderr}")
+    return elapsed
+
+
+def slowest_imports(cwd: str, count: int = 15) -> List[str]:
+    """
+    Top-level imports of one cold start, slowest cumulative time first.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP_CODE],
+        cwd=cwd,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+
+    timings = []
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \| (\s*)(\S+)", line)
+        if match and len(match.group(2)) <= 2:
+            timings.append((int(match.group(1)), match.group(3)))
+
+    return [
+        f"{microseconds / 1000:8.1f} ms  {module}"
+        for microseconds, module in sorted(timings, reverse=True)[:count]
+    ]
+
+
+def configured_budget() -> float:
+    """
+    Read `app.startup_budget` from the project configuration.
+    """
+    from app.core.application.application import init_container
+
+    return float(init_container().config.app.startup_budget() or 0)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, help="Budget in seconds")
+    args = parser.parse_args(argv)
+
+    cwd = os.getcwd()
+    budget = args.budget if args.budget is not None else configured_budget()
+
+    # First run warms the filesystem and bytecode caches
+    try:
+        measure_startup(cwd)
+        samples = [measure_startup(cwd) for _ in range(max(1, args.runs))]
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    median = statistics.median(samples)
+
+    print(
+        f"Startup median {median * 1000:.1f} ms over {len(samples)} runs "
+        f"(min {min(samples) * 1000:.1f} ms, max {max(samples) * 1000:.1f} ms)"
+    )
+
+    if budget and median > budget:
+        print(f"Over budget of {budget * 1000:.1f} ms. Slowest imports:")
+        for line in slowest_imports(cwd):
+            print(line)
+        return 1
+
+    print(f"Within budget of {budget * 1000:.1f} ms" if budget else "No budget set")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Inspect the merged configuration snapshot.
+
+Usage:
+    python -m app.scripts.config_snapshot [status|show|rebuild|clear]
+
+status   Snapshot path, whether it is fresh, and each source's fingerprint
+show     Merged configuration as the application sees it
+rebuild  Parse the config files and write a new snapshot
+clear    Delete the snapshot
+"""
+
+# Imports from standard library
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+# Imports from local modules
+from app.core.application.config_snapshot import (
+    config_sources,
+    default_cache_path,
+    fingerprint,
+    load_config,
+    read_snapshot,
+)
+from app.core.base.container.container import _find_project_root
+
+
+def _status(config_path: Path, env: str, cache_path: Optional[Path]) -> int:
+    print(f"Snapshot: {cache_path or 'disabled'}")
+    print(f"APP_ENV:  {env}")
+
+    current = fingerprint(config_sources(config_path, env))
+    snapshot = read_snapshot(cache_path) if cache_path else None
+
+    if snapshot is None:
+        state = "missing"
+    elif snapshot.fingerprint == current:
+        state = "fresh"
+    else:
+        state = "stale"
+
+    print(f"State:    {state}")
+    if snapshot is not None:
+        created = time.localtime(snapshot.created_at)
+        print(f"Created:  {time.strftime('%Y-%m-%d %H:%M:%S', created)}")
+
+    cached = {}
+    if snapshot is not None:
+        cached = {path: (mtime, size) for path, mtime, size in snapshot.fingerprint}
+
+    print("Sources:")
+    for path, mtime, size in current:
+        changed = snapshot is not None and cached.get(path) != (mtime, size)
+        if mtime is None:
+            detail = "absent"
+        else:
+            detail = f"size={size} mtime_ns={mtime}"
+        print(f"  {path}: {detail}{' (changed)' if changed else ''}")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Inspect the config snapshot")
+    parser.add_argument(
+        "command",
+        nargs="?",
+        default="status",
+        choices=["status", "show", "rebuild", "clear"],
+    )
+    args = parser.parse_args(argv)
+
+    project_root = Path(_find_project_root())
+    config_path = project_root / "config"
+    env = os.getenv("APP_ENV", "development")
+    cache_path = default_cache_path(project_root, env)
+
+    if args.command == "status":
+        return _status(config_path, env, cache_path)
+
+    if args.command == "show":
+        config, cached = load_config(config_path, env, cache_path)
+        print(f"# from {'snapshot' if cached else 'yaml'}", file=sys.stderr)
+        print(json.dumps(config, indent=2, default=str))
+        return 0
+
+    if cache_path is not None and cache_path.exists():
+        cache_path.unlink()
+
+    if args.command == "rebuild":
+        load_config(config_path, env, cache_path)
+        return _status(config_path, env, cache_path)
+
+    print(f"Removed {cache_path}" if cache_path else "Snapshot disabled")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
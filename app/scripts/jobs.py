@@ -0,0 +1,117 @@
+"""
+Submit and run queued builds.
+
+Usage:
+    python -m app.scripts.jobs submit NAME DISTRO RELEASE ARCH [PACKAGE ...]
+    python -m app.scripts.jobs list [--status STATUS]
+    python -m app.scripts.jobs show ID
+    python -m app.scripts.jobs cancel ID
+    python -m app.scripts.jobs work [--drain]
+
+submit  Queue a build and print its job id
+list    Jobs in submission order
+show    One job as JSON
+cancel  Cancel a queued job
+work    Run the workers until interrupted, or until the queue is empty
+        with --drain, exporting metrics meanwhile
+"""
+
+# Imports from standard library
+import argparse
+import json
+import sys
+import threading
+from dataclasses import asdict
+from typing import List, Optional
+
+
+def _format_job(job) -> str:
+    return (
+        f"{job.id:>6}  {job.status.value:<9}  p={job.priority:<3}  "
+        f"{job.config.name}  {job.config.distro}:{job.config.release}/"
+        f"{job.config.architecture}"
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Submit and run queued builds")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit = commands.add_parser("submit")
+    submit.add_argument("name")
+    submit.add_argument("distro")
+    submit.add_argument("release")
+    submit.add_argument("architecture")
+    submit.add_argument("packages", nargs="*")
+    submit.add_argument("--priority", type=int, default=0)
+    submit.add_argument("--backend")
+
+    listing = commands.add_parser("list")
+    listing.add_argument("--status")
+    listing.add_argument("--limit", type=int, default=100)
+
+    show = commands.add_parser("show")
+    show.add_argument("id", type=int)
+
+    cancel = commands.add_parser("cancel")
+    cancel.add_argument("id", type=int)
+
+    work = commands.add_parser("work")
+    work.add_argument("--drain", action="store_true")
+
+    args = parser.parse_args(argv)
+
+    from app.core.application import get_application
+    from app.services.job_queue_service import JobQueueError, JobStatus
+    from app.services.os_builder_service import OSBuildConfig
+    from app.services.os_builder_service.exceptions import InvalidOSBuildConfigError
+
+    application = get_application()
+    job_queue = application.job_queue
+
+    try:
+        if args.command == "submit":
+            config = OSBuildConfig(
+                name=args.name,
+                distro=args.distro,
+                release=args.release,
+                architecture=args.architecture,
+                packages=args.packages,
+                backend=args.backend,
+            )
+            print(job_queue.submit(config, priority=args.priority))
+
+        elif args.command == "list":
+            status = JobStatus(args.status.upper()) if args.status else None
+            for job in job_queue.list(status=status, limit=args.limit):
+                print(_format_job(job))
+
+        elif args.command == "show":
+            job = job_queue.get(args.id)
+            print(json.dumps(asdict(job), indent=2, default=lambda value: value.value))
+
+        elif args.command == "cancel":
+            print(_format_job(job_queue.cancel(args.id)))
+
+        else:
+            application.metrics.start()
+            job_queue.start()
+            try:
+                if args.drain:
+                    job_queue.join()
+                else:
+                    threading.Event().wait()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                job_queue.stop()
+
+    except (JobQueueError, InvalidOSBuildConfigError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
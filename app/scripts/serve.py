@@ -0,0 +1,27 @@
+"""
+Serve the HTTP API and run queued builds.
+
+Usage:
+    python -m app.scripts.serve
+
+Listens on `api.host:api.port` and, unless `api.start_workers` is off,
+runs the job queue workers in the same process, and exports metrics.
+Stops on Ctrl+C after the running builds finish.
+"""
+
+# Imports from standard library
+import sys
+from typing import List, Optional
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from app.core.application import get_application
+
+    application = get_application()
+    application.metrics.start()
+    application.api.run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,5 @@
+from .apt_proxy_service import AptProxyService
+from .package_store import PackageStore
+from .models import AptProxyConfig
+
+__all__ = ["AptProxyService", "PackageStore", "AptProxyConfig"]
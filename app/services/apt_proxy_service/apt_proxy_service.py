@@ -0,0 +1,316 @@
+"""
+Module for caching APT proxy.
+"""
+
+# Imports from standard library
+import shutil
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, Dict, Optional
+from urllib.parse import unquote, urlsplit
+
+# Imports from local modules
+from app.services.apt_proxy_service.models import AptProxyConfig
+from app.services.apt_proxy_service.package_store import PackageStore
+
+
+if TYPE_CHECKING:
+
+    # Imports from standard library
+    import logging
+
+
+CHUNK_SIZE = 64 * 1024
+
+CACHEABLE_SUFFIXES = (".deb", ".udeb", ".ddeb")
+
+FORWARDED_HEADERS = ("If-Modified-Since", "If-None-Match")
+
+UPSTREAM_SCHEMES = ("http", "https")
+
+
+class _ProxyHandler(BaseHTTPRequestHandler):
+    """
+    Request handler for APT proxy.
+    """
+
+    protocol_version = "HTTP/1.1"
+    server: "_ProxyServer"
+
+    def do_GET(self) -> None:
+        try:
+            upstream = self.server.service.upstream_url(self.path)
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return
+        key = urlsplit(upstream).path
+
+        if key.endswith(CACHEABLE_SUFFIXES):
+            self._serve_cached(upstream, key)
+        else:
+            self._serve_passthrough(upstream)
+
+    def log_message(self, format: str, *args) -> None:
+        self.server.service.logger.debug(format, *args)
+
+    def _open_upstream(self, url: str):
+        request = urllib.request.Request(url)
+        for header in FORWARDED_HEADERS:
+            if self.headers.get(header):
+                request.add_header(header, self.headers[header])
+
+        try:
+            return urllib.request.urlopen(
+                request, timeout=self.server.service.configuration.timeout
+            )
+        except urllib.error.HTTPError as e:
+            self.send_error(e.code)
+        except urllib.error.URLError as e:
+            # Missing files of a local mirror stand-in
+            if isinstance(e.reason, FileNotFoundError):
+                self.send_error(404)
+            else:
+                self.server.service.logger.warning(
+                    "Upstream error (url=%s): %s", url, e
+                )
+                self.send_error(502, "Bad Gateway")
+        except (OSError, ValueError) as e:
+            self.server.service.logger.warning("Upstream error (url=%s): %s", url, e)
+            self.send_error(502, "Bad Gateway")
+        return None
+
+    def _send_headers(self, headers: Dict[str, str], length: Optional[int]) -> None:
+        self.send_response(200)
+        self.send_header(
+            "Content-Type", headers.get("Content-Type", "application/octet-stream")
+        )
+        if headers.get("Last-Modified"):
+            self.send_header("Last-Modified", headers["Last-Modified"])
+
+        if length is None:
+            self.close_connection = True
+            self.send_header("Connection", "close")
+        else:
+            self.send_header("Content-Length", str(length))
+        self.end_headers()
+
+    def _serve_passthrough(self, url: str) -> None:
+        response = self._open_upstream(url)
+        if response is None:
+            return
+
+        with response:
+            length = response.headers.get("Content-Length")
+            self._send_headers(response.headers, int(length) if length else None)
+            shutil.copyfileobj(response, self.wfile, CHUNK_SIZE)
+
+    def _serve_cached(self, url: str, key: str) -> None:
+        service = self.server.service
+        store = service.store
+
+        cached = store.lookup(key)
+        if cached is None:
+            # Concurrent requests for the same file wait for one download;
+            # hits are served without the lock
+            with store.key_lock(key):
+                cached = store.lookup(key)
+                if cached is None:
+                    self._fill_cache(url, key)
+                    return
+
+        path, size = cached
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            # Evicted since the lookup
+            with store.key_lock(key):
+                self._fill_cache(url, key)
+            return
+
+        service.record(hit=True)
+        with f:
+            self._send_headers({}, size)
+            shutil.copyfileobj(f, self.wfile, CHUNK_SIZE)
+
+    def _fill_cache(self, url: str, key: str) -> None:
+        """
+        Download a file into the cache while sending it to the client.
+        """
+        service = self.server.service
+
+        response = self._open_upstream(url)
+        if response is None:
+            return
+
+        service.record(hit=False)
+        with response, service.store.begin(key) as pending:
+            length = response.headers.get("Content-Length")
+            length = int(length) if length else None
+            self._send_headers(response.headers, length)
+
+            client_connected = True
+            while True:
+                chunk = response.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                pending.write(chunk)
+
+                # Keep filling the cache if the client goes away
+                if client_connected:
+                    try:
+                        self.wfile.write(chunk)
+                    except OSError:
+                        client_connected = False
+
+            try:
+                pending.commit(expected_size=length)
+            except IOError as e:
+                service.logger.warning("Not caching %s: %s", key, e)
+
+
+class _ProxyServer(ThreadingHTTPServer):
+    """
+    HTTP server bound to an APT proxy service.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, service: "AptProxyService"):
+        self.service = service
+        super().__init__(address, _ProxyHandler)
+
+
+class AptProxyService:
+    """
+    Caching HTTP proxy for APT.
+
+    Package files are stored by checksum in `cache_dir` and shared by
+    every build container on the host. Index files are passed through.
+    """
+
+    def __init__(self, logger: "logging.Logger", configuration: AptProxyConfig):
+        self.logger = logger.getChild("AptProxyService")
+        self.configuration = configuration
+
+        self.logger.debug("AptProxyConfig: %s", self.configuration)
+
+        self.store = PackageStore(configuration.cache_dir, configuration.max_size)
+        self.hits = 0
+        self.misses = 0
+
+        self._server: Optional[_ProxyServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self.logger.info("AptProxyService initialized")
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.configuration.enabled)
+
+    @property
+    def running(self) -> bool:
+        return self._server is not None
+
+    @property
+    def port(self) -> int:
+        """
+        Port the proxy listens on, resolved once started.
+        """
+        if self._server is not None:
+            return self._server.server_address[1]
+        return self.configuration.port
+
+    @property
+    def proxy_url(self) -> str:
+        """
+        Proxy URL as seen from build containers.
+        """
+        return f"http://{self.configuration.advertise_host}:{self.port}/"
+
+    def start(self) -> None:
+        """
+        Start serving in a background thread.
+        """
+        with self._lock:
+            if self._server is not None:
+                return
+
+            self._server = _ProxyServer(
+                (self.configuration.host, self.configuration.port), self
+            )
+            self._thread = threading.Thread(
+                target=self._server.serve_forever,
+                name="AptProxyService",
+                daemon=True,
+            )
+            self._thread.start()
+
+        self.logger.info(
+            "APT proxy listening on %s:%s", self.configuration.host, self.port
+        )
+
+    def stop(self) -> None:
+        """
+        Stop serving and persist the cache index.
+        """
+        with self._lock:
+            if self._server is None:
+                return
+
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+            self._thread = None
+
+        self.store.flush()
+        self.logger.info("APT proxy stopped (hits=%s, misses=%s)", self.hits, self.misses)
+
+    def record(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def upstream_url(self, path: str) -> str:
+        """
+        Map a proxied request path to the URL to fetch.
+
+        Raises:
+            ValueError: If the request is not for an http(s) URL, or its
+                path leaves the mirror with `..`
+        """
+        parts = urlsplit(path)
+        if ".." in unquote(parts.path).split("/"):
+            raise ValueError("Paths with .. segments are not proxied")
+
+        if self.configuration.mirror:
+            target = parts.path
+            if not target.startswith("/"):
+                raise ValueError(f"Invalid request path {path}")
+            if parts.query:
+                target = f"{target}?{parts.query}"
+            return self.configuration.mirror.rstrip("/") + target
+
+        # Anything else, e.g. file://, would read the proxy host's files
+        if parts.scheme not in UPSTREAM_SCHEMES or not parts.netloc:
+            raise ValueError(f"Only http and https URLs are proxied, not {path}")
+        return path
+
+    def container_environment(self) -> Dict[str, str]:
+        """
+        Environment pointing APT in a container at the proxy.
+        """
+        return {"http_proxy": self.proxy_url}
+
+    def container_extra_hosts(self) -> Dict[str, str]:
+        """
+        Extra hosts making the proxy host reachable from a container.
+        """
+        if self.configuration.advertise_host == "host.docker.internal":
+            return {"host.docker.internal": "host-gateway"}
+        return {}
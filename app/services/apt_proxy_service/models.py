@@ -0,0 +1,39 @@
+"""
+Module for APT proxy service models.
+"""
+
+# Imports from standard library
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class AptProxyConfig:
+    """
+    Configuration for APT proxy.
+
+    `mirror` replaces the scheme and host of every proxied URL, e.g.
+    `file:///srv/mirror` to serve packages from a local directory. `host`
+    defaults to the address of Docker's default bridge, which
+    `host.docker.internal` resolves to in build containers.
+    """
+
+    enabled: bool = False
+    host: str = "172.17.0.1"
+    port: int = 3142
+    advertise_host: str = "host.docker.internal"
+    cache_dir: str = "cache/apt"
+    max_size: int = 10 * 1024 * 1024 * 1024
+    mirror: Optional[str] = None
+    timeout: int = 60
+
+
+@dataclass
+class CachedObject:
+    """
+    Package file stored in the cache.
+    """
+
+    checksum: str
+    size: int
+    last_used: float
@@ -0,0 +1,227 @@
+"""
+Module for checksum-addressed package storage.
+"""
+
+# Imports from standard library
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Imports from local modules
+from app.services.apt_proxy_service.models import CachedObject
+
+
+class PendingObject:
+    """
+    Package file being downloaded into the store.
+    """
+
+    def __init__(self, store: "PackageStore", key: str):
+        self._store = store
+        self._key = key
+        self._hash = hashlib.sha256()
+        self._size = 0
+
+        fd, self._path = tempfile.mkstemp(dir=store.tmp_dir)
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, data: bytes) -> None:
+        self._file.write(data)
+        self._hash.update(data)
+        self._size += len(data)
+
+    def commit(self, expected_size: Optional[int] = None) -> None:
+        """
+        Move the downloaded file into the store.
+
+        Raises:
+            IOError: If the download is shorter or longer than expected
+        """
+        self._file.close()
+
+        if expected_size is not None and expected_size != self._size:
+            raise IOError(
+                f"Incomplete download of {self._key}: "
+                f"got {self._size} of {expected_size} bytes"
+            )
+
+        self._store.add(self._key, self._path, self._hash.hexdigest(), self._size)
+
+    def discard(self) -> None:
+        self._file.close()
+        if os.path.exists(self._path):
+            os.unlink(self._path)
+
+    def __enter__(self) -> "PendingObject":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        # Committed files have already been moved out of tmp_dir
+        self.discard()
+
+
+class PackageStore:
+    """
+    Package files stored once per SHA-256 checksum.
+
+    URL paths map to checksums, so the same file fetched from two mirrors
+    is kept once. Least recently used files are evicted when the total
+    size exceeds `max_size`.
+    """
+
+    def __init__(self, root: str, max_size: int):
+        self._root = root
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        # Lock and number of holders and waiters per key being downloaded
+        self._key_locks: Dict[str, List] = {}
+
+        self.objects_dir = os.path.join(root, "objects")
+        self.tmp_dir = os.path.join(root, "tmp")
+        self._index_path = os.path.join(root, "index.json")
+
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+        self._paths: Dict[str, str] = {}
+        self._objects: Dict[str, CachedObject] = {}
+        self._load_index()
+
+    @property
+    def size(self) -> int:
+        return sum(obj.size for obj in self._objects.values())
+
+    @contextmanager
+    def key_lock(self, key: str) -> Iterator[None]:
+        """
+        Hold the lock serializing downloads of the same key; it is dropped
+        once nobody holds or waits for it.
+        """
+        with self._lock:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._key_locks[key]
+
+    def object_path(self, checksum: str) -> str:
+        return os.path.join(self.objects_dir, checksum[:2], checksum)
+
+    def lookup(self, key: str) -> Optional[Tuple[str, int]]:
+        """
+        Get the stored file for a key and mark it as recently used.
+
+        Returns:
+            File path and size or None if the key is not stored
+        """
+        with self._lock:
+            checksum = self._paths.get(key)
+            obj = self._objects.get(checksum) if checksum else None
+            if obj is None:
+                return None
+
+            path = self.object_path(checksum)
+            if not os.path.exists(path):
+                self._forget(checksum)
+                return None
+
+            obj.last_used = time.time()
+            return path, obj.size
+
+    def begin(self, key: str) -> PendingObject:
+        """
+        Start downloading a file for a key.
+        """
+        return PendingObject(self, key)
+
+    def add(self, key: str, tmp_path: str, checksum: str, size: int) -> None:
+        """
+        Add a downloaded file to the store.
+        """
+        path = self.object_path(checksum)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with self._lock:
+            if os.path.exists(path):
+                os.unlink(tmp_path)
+            else:
+                os.replace(tmp_path, path)
+
+            self._paths[key] = checksum
+            self._objects[checksum] = CachedObject(
+                checksum=checksum, size=size, last_used=time.time()
+            )
+            self._evict(keep=checksum)
+            self._save_index()
+
+    def flush(self) -> None:
+        """
+        Persist the index with current usage times.
+        """
+        with self._lock:
+            self._save_index()
+
+    def _evict(self, keep: str) -> None:
+        total = self.size
+        by_age = sorted(self._objects.values(), key=lambda obj: obj.last_used)
+
+        for obj in by_age:
+            if total <= self._max_size:
+                break
+            if obj.checksum == keep:
+                continue
+
+            total -= obj.size
+            self._forget(obj.checksum)
+
+    def _forget(self, checksum: str) -> None:
+        self._objects.pop(checksum, None)
+        self._paths = {
+            key: value for key, value in self._paths.items() if value != checksum
+        }
+
+        path = self.object_path(checksum)
+        if os.path.exists(path):
+            os.unlink(path)
+
+    def _load_index(self) -> None:
+        if not os.path.exists(self._index_path):
+            return
+
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._objects = {
+                item["checksum"]: CachedObject(**item) for item in data["objects"]
+            }
+            self._paths = {
+                key: checksum
+                for key, checksum in data["paths"].items()
+                if checksum in self._objects
+            }
+        except (OSError, ValueError, TypeError, KeyError):
+            self._paths, self._objects = {}, {}
+
+    def _save_index(self) -> None:
+        tmp_path = f"{self._index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "paths": self._paths,
+                    "objects": [asdict(obj) for obj in self._objects.values()],
+                },
+                f,
+            )
+        os.replace(tmp_path, self._index_path)
@@ -0,0 +1,11 @@
+from .artifact_store_service import ArtifactStoreService
+from .chunker import TarChunker
+from .models import ArtifactStoreConfig, ArtifactManifest, StoreStats
+
+__all__ = [
+    "ArtifactStoreService",
+    "TarChunker",
+    "ArtifactStoreConfig",
+    "ArtifactManifest",
+    "StoreStats",
+]
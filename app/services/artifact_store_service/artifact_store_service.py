@@ -0,0 +1,290 @@
+"""
+Module for deduplicating artifact storage.
+"""
+
+# Imports from standard library
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional
+
+# Imports from local modules
+from app.services.artifact_store_service.chunker import TarChunker
+from app.services.artifact_store_service.models import (
+    ArtifactManifest,
+    ArtifactStoreConfig,
+    StoreStats,
+)
+
+
+if TYPE_CHECKING:
+
+    # Imports from standard library
+    import logging
+
+    # Imports from local modules
+    from app.services.docker_service.docker_service import DockerService
+
+
+class ArtifactStoreService:
+    """
+    Service storing exported root filesystems as deduplicated chunks.
+
+    Chunks are stored once per SHA-256 under `chunks/` and each artifact
+    is a manifest listing its chunks in order. Several processes may write
+    at once: chunk and manifest files are written atomically, and garbage
+    collection takes an exclusive lock that writers hold shared.
+    """
+
+    def __init__(
+        self,
+        logger: "logging.Logger",
+        docker_service: "DockerService",
+        configuration: ArtifactStoreConfig,
+    ):
+        self._logger = logger.getChild("ArtifactStoreService")
+        self._docker_service = docker_service
+        self._configuration = configuration
+
+        self._logger.debug("ArtifactStoreConfig: %s", self._configuration)
+
+        self._chunks_path = os.path.join(configuration.path, "chunks")
+        self._manifests_path = os.path.join(configuration.path, "manifests")
+        self._lock_path = os.path.join(configuration.path, ".lock")
+
+        os.makedirs(self._chunks_path, exist_ok=True)
+        os.makedirs(self._manifests_path, exist_ok=True)
+
+        self._chunker = TarChunker(
+            configuration.min_chunk_size,
+            configuration.avg_chunk_size,
+            configuration.max_chunk_size,
+        )
+
+        self._logger.info("ArtifactStoreService initialized")
+
+    def put_container(self, container_id: str, name: str) -> ArtifactManifest:
+        """
+        Export a container's filesystem into the store.
+        """
+        self._logger.info(
+            "Storing container (container_id=%s, name=%s)", container_id, name
+        )
+        return self.put(name, self._docker_service.export_container(container_id))
+
+    def put(self, name: str, stream: Iterable[bytes]) -> ArtifactManifest:
+        """
+        Store a tar stream under a name, replacing any previous artifact.
+        """
+        chunks: List[List] = []
+        size = 0
+        threads = max(1, self._configuration.threads)
+
+        with self._locked(fcntl.LOCK_SH), ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix="ArtifactStore"
+        ) as executor:
+            # Hash and compress on the pool, bounded to two chunks per thread
+            pending = deque()
+            for chunk in self._chunker.split(stream):
+                pending.append(executor.submit(self._store_chunk, chunk))
+                while len(pending) > threads * 2:
+                    chunks.append(pending.popleft().result())
+
+            while pending:
+                chunks.append(pending.popleft().result())
+
+            size = sum(chunk_size for _, chunk_size in chunks)
+            manifest = ArtifactManifest(
+                name=name, size=size, chunks=chunks, created_at=time.time()
+            )
+            self._write_atomic(
+                self._manifest_file(name), json.dumps(asdict(manifest)).encode()
+            )
+
+        self._logger.info(
+            "Stored artifact (name=%s, size=%s, chunks=%s)", name, size, len(chunks)
+        )
+        return manifest
+
+    def get_manifest(self, name: str) -> Optional[ArtifactManifest]:
+        """
+        Get the manifest of an artifact.
+        """
+        try:
+            with open(self._manifest_file(name), "r", encoding="utf-8") as f:
+                return ArtifactManifest(**json.load(f))
+        except FileNotFoundError:
+            return None
+
+    def list_artifacts(self) -> List[str]:
+        """
+        List stored artifact names.
+        """
+        return sorted(
+            entry[: -len(".json")]
+            for entry in os.listdir(self._manifests_path)
+            if entry.endswith(".json")
+        )
+
+    def open_stream(self, name: str) -> Iterator[bytes]:
+        """
+        Stream an artifact's bytes, reading ahead on the thread pool.
+
+        Raises:
+            FileNotFoundError: If the artifact does not exist
+        """
+        manifest = self.get_manifest(name)
+        if manifest is None:
+            raise FileNotFoundError(f"Artifact {name} not found")
+
+        threads = max(1, self._configuration.threads)
+        with ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix="ArtifactStore"
+        ) as executor:
+            pending = deque()
+            for digest, _ in manifest.chunks:
+                pending.append(executor.submit(self._read_chunk, digest))
+                if len(pending) > threads * 2:
+                    yield pending.popleft().result()
+
+            while pending:
+                yield pending.popleft().result()
+
+    def restore(self, name: str, path: str) -> None:
+        """
+        Reassemble an artifact into a file atomically.
+        """
+        directory = os.path.dirname(path) or "."
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for data in self.open_stream(name):
+                    f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def delete(self, name: str) -> None:
+        """
+        Delete an artifact's manifest. Its chunks are freed by gc.
+        """
+        try:
+            os.unlink(self._manifest_file(name))
+        except FileNotFoundError:
+            pass
+
+    def gc(self) -> int:
+        """
+        Remove chunks no manifest references.
+
+        Returns:
+            Number of bytes freed
+        """
+        freed = 0
+        with self._locked(fcntl.LOCK_EX):
+            referenced = set(self._referenced_chunks())
+
+            for digest, path in self._iter_chunk_files():
+                if digest not in referenced:
+                    freed += os.path.getsize(path)
+                    os.unlink(path)
+
+        self._logger.info("Garbage collected %s bytes", freed)
+        return freed
+
+    def stats(self) -> StoreStats:
+        """
+        Get store usage and the dedup ratio.
+        """
+        logical = 0
+        unique: Dict[str, int] = {}
+        names = self.list_artifacts()
+
+        for name in names:
+            manifest = self.get_manifest(name)
+            if manifest is None:
+                continue
+            logical += manifest.size
+            unique.update({digest: size for digest, size in manifest.chunks})
+
+        stored = sum(os.path.getsize(path) for _, path in self._iter_chunk_files())
+
+        return StoreStats(
+            artifacts=len(names),
+            chunks=len(unique),
+            logical_bytes=logical,
+            unique_bytes=sum(unique.values()),
+            stored_bytes=stored,
+        )
+
+    def _store_chunk(self, chunk: bytes) -> List:
+        digest = hashlib.sha256(chunk).hexdigest()
+        path = self._chunk_file(digest)
+
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._write_atomic(
+                path, zlib.compress(chunk, self._configuration.compression_level)
+            )
+
+        return [digest, len(chunk)]
+
+    def _read_chunk(self, digest: str) -> bytes:
+        with open(self._chunk_file(digest), "rb") as f:
+            data = zlib.decompress(f.read())
+
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise IOError(f"Chunk {digest} is corrupt")
+        return data
+
+    def _referenced_chunks(self) -> Iterator[str]:
+        for name in self.list_artifacts():
+            manifest = self.get_manifest(name)
+            if manifest is not None:
+                yield from (digest for digest, _ in manifest.chunks)
+
+    def _iter_chunk_files(self) -> Iterator:
+        for prefix in os.listdir(self._chunks_path):
+            directory = os.path.join(self._chunks_path, prefix)
+            for digest in os.listdir(directory):
+                if not digest.endswith(".tmp"):
+                    yield digest, os.path.join(directory, digest)
+
+    def _chunk_file(self, digest: str) -> str:
+        return os.path.join(self._chunks_path, digest[:2], digest)
+
+    def _manifest_file(self, name: str) -> str:
+        return os.path.join(self._manifests_path, f"{name}.json")
+
+    @contextmanager
+    def _locked(self, operation: int):
+        with open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes) -> None:
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(path), prefix=".", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
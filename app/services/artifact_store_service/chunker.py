@@ -0,0 +1,147 @@
+"""
+Module for content-defined chunking of tar streams.
+"""
+
+# Imports from standard library
+import zlib
+from typing import Iterable, Iterator
+
+
+BLOCK_SIZE = 512
+
+# Entries describing the entry that follows them
+_META_TYPES = (b"x", b"g", b"L", b"K")
+
+
+class _Reader:
+    """
+    Reads exact byte counts from an iterable of chunks.
+
+    Reads advance an offset into the buffer, which is only compacted when
+    more data is appended, so reading a chunk in blocks copies it once.
+    """
+
+    def __init__(self, stream: Iterable[bytes]):
+        self._stream = iter(stream)
+        self._buffer = bytearray()
+        self._offset = 0
+
+    def read(self, size: int) -> bytes:
+        """
+        Read up to size bytes, less only at the end of the stream.
+        """
+        while len(self._buffer) - self._offset < size:
+            data = next(self._stream, None)
+            if data is None:
+                break
+            if self._offset:
+                del self._buffer[: self._offset]
+                self._offset = 0
+            self._buffer += data
+
+        data = bytes(self._buffer[self._offset : self._offset + size])
+        self._offset += len(data)
+        return data
+
+
+def _is_header(block: bytes) -> bool:
+    if len(block) < BLOCK_SIZE or not any(block):
+        return False
+
+    try:
+        stored = int(block[148:156].strip(b"\0 ") or b"-1", 8)
+    except ValueError:
+        return False
+
+    return stored == sum(block[:148]) + sum(block[156:]) + 8 * 32
+
+
+def _entry_size(header: bytes) -> int:
+    field = header[124:136]
+    if field[0] & 0x80:
+        # GNU base-256 encoding for large files
+        return int.from_bytes(field[1:], "big")
+    return int(field.strip(b"\0 ") or b"0", 8)
+
+
+class TarChunker:
+    """
+    Splits tar streams into content-defined chunks.
+
+    Boundaries are placed after tar entries whose header hash matches a
+    mask, so an inserted or changed file only changes the chunks around
+    it. Entries larger than `max_size` start a new chunk and are cut every
+    `max_size` bytes from their header, which keeps big files aligned
+    across archives. Input that is not a tar archive is cut into fixed
+    `max_size` pieces.
+    """
+
+    def __init__(self, min_size: int, avg_size: int, max_size: int):
+        self._min_size = min_size
+        self._avg_size = avg_size
+        self._max_size = max_size
+
+    def _is_boundary(self, header: bytes, size: int) -> bool:
+        if size < self._min_size:
+            return False
+
+        # Normalized chunking: cut rarely below the average, often above
+        bits = 3 if size < self._avg_size else 1
+        return zlib.crc32(header) & ((1 << bits) - 1) == 0
+
+    def split(self, stream: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Split a stream of bytes into chunks.
+        """
+        reader = _Reader(stream)
+        chunk = bytearray()
+
+        while True:
+            header = reader.read(BLOCK_SIZE)
+            if not _is_header(header):
+                # End of archive blocks or not a tar stream at all
+                chunk += header
+                yield from self._split_fixed(chunk, reader)
+                return
+
+            padded = (_entry_size(header) + BLOCK_SIZE - 1) // BLOCK_SIZE * BLOCK_SIZE
+            if chunk and BLOCK_SIZE + padded > self._max_size:
+                yield bytes(chunk)
+                chunk.clear()
+
+            chunk += header
+            remaining = padded
+            while remaining:
+                data = reader.read(min(remaining, self._max_size - len(chunk)))
+                if not data:
+                    break
+                chunk += data
+                remaining -= len(data)
+
+                if len(chunk) >= self._max_size:
+                    yield bytes(chunk)
+                    chunk.clear()
+
+            if remaining:
+                # Truncated archive
+                if chunk:
+                    yield bytes(chunk)
+                return
+
+            if header[156:157] not in _META_TYPES and self._is_boundary(
+                header, len(chunk)
+            ):
+                yield bytes(chunk)
+                chunk.clear()
+
+    def _split_fixed(self, chunk: bytearray, reader: _Reader) -> Iterator[bytes]:
+        while True:
+            data = reader.read(self._max_size - len(chunk))
+            chunk += data
+
+            if len(chunk) >= self._max_size or (not data and chunk):
+                yield bytes(chunk)
+                chunk.clear()
+
+            if not data:
+                return
@@ -0,0 +1,58 @@
+"""
+Module for artifact store service models.
+"""
+
+# Imports from standard library
+from dataclasses import dataclass, field
+from typing import List
+
+
+@dataclass
+class ArtifactStoreConfig:
+    """
+    Configuration for artifact store.
+
+    Chunk sizes are in bytes; `compression_level` is the zlib level used
+    for stored chunks, 0 stores them uncompressed.
+    """
+
+    path: str = "artifacts/store"
+    min_chunk_size: int = 512 * 1024
+    avg_chunk_size: int = 2 * 1024 * 1024
+    max_chunk_size: int = 8 * 1024 * 1024
+    compression_level: int = 1
+    threads: int = 4
+
+
+@dataclass
+class ArtifactManifest:
+    """
+    Ordered chunks making up an artifact.
+
+    Every chunk is a [sha256, size] pair.
+    """
+
+    name: str
+    size: int
+    chunks: List[List] = field(default_factory=list)
+    created_at: float = 0.0
+
+
+@dataclass
+class StoreStats:
+    """
+    Artifact store usage.
+    """
+
+    artifacts: int
+    chunks: int
+    logical_bytes: int
+    unique_bytes: int
+    stored_bytes: int
+
+    @property
+    def dedup_ratio(self) -> float:
+        """
+        Bytes referenced by artifacts per unique byte stored.
+        """
+        return self.logical_bytes / self.unique_bytes if self.unique_bytes else 1.0
@@ -1,4 +1,18 @@
-from .container_manager import ContainerManagerService
-from .models import ContainerConfig
+from .container_manager import (
+    ContainerManagerService,
+    MANAGED_LABEL,
+    ROLE_LABEL,
+    UNMANAGED_LABELS,
+    build_container_name,
+)
+from .models import ContainerConfig, ContainerManagerConfig
 
-__all__ = ["ContainerManagerService", "ContainerConfig"]
+__all__ = [
+    "ContainerManagerService",
+    "ContainerConfig",
+    "ContainerManagerConfig",
+    "MANAGED_LABEL",
+    "ROLE_LABEL",
+    "UNMANAGED_LABELS",
+    "build_container_name",
+]
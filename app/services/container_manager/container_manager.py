@@ -3,30 +3,99 @@ Module for managing containers.
 """
 
 # Imports from standard library
-from typing import TYPE_CHECKING, Optional
+import atexit
+import re
+import threading
+import time
+import uuid
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
 
 # Imports from local modules
-from app.services.container_manager.models import ContainerConfig
+from app.services.container_manager.models import (
+    ContainerConfig,
+    ContainerManagerConfig,
+)
+
+# Imports from services modules
+from app.services.metrics_service import MetricsService
 
 
 if TYPE_CHECKING:
 
     # Imports from local modules
     from app.services.docker_service.docker_service import DockerService
+    from app.services.apt_proxy_service import AptProxyService
 
     # Imports from third party libraries
     import logging
     import docker
 
 
+# Set on every container this service runs
+MANAGED_LABEL = "linux_builder.managed"
+
+# Set to "build" on containers that only live for a build
+ROLE_LABEL = "linux_builder.role"
+
+# Blanks the labels above on committed images. A commit cannot drop labels,
+# and containers inherit the labels of their image
+UNMANAGED_LABELS = {MANAGED_LABEL: "", ROLE_LABEL: ""}
+
+# Build containers keep a name like this until their build succeeds
+_BUILD_NAME = re.compile(r"\.build-[0-9a-f]{8}$")
+
+
+def build_container_name(name: str) -> str:
+    """
+    Temporary name of a container building `name`.
+
+    Build containers under such a name are removed by the garbage
+    collector once stale, so they are renamed when their build succeeds.
+    """
+    return f"{name}.build-{uuid.uuid4().hex[:8]}"
+
+
 class ContainerManagerService:
     """
     Service for managing containers.
+
+    Every container it runs carries MANAGED_LABEL, so they can be found
+    and removed in bulk. Build containers also carry ROLE_LABEL and a name
+    from build_container_name, which is how the garbage collector tells
+    leftovers of crashed or abandoned builds from finished ones.
     """
 
-    def __init__(self, logger: "logging.Logger", docker_service: "DockerService"):
+    def __init__(
+        self,
+        logger: "logging.Logger",
+        docker_service: "DockerService",
+        configuration: ContainerManagerConfig = None,
+        apt_proxy: "AptProxyService" = None,
+        metrics: Optional[MetricsService] = None,
+    ):
         self._logger = logger.getChild("ContainerManagerService")
         self._docker_service = docker_service
+        self._configuration = configuration or ContainerManagerConfig()
+        self._metrics = metrics or MetricsService(logger)
+
+        self._logger.debug("ContainerManagerConfig: %s", self._configuration)
+
+        self._reaped = self._metrics.counter(
+            "containers_reaped_total", "Managed containers removed by the collector"
+        )
+
+        # Shared package cache for every container we run
+        self._apt_proxy = apt_proxy if apt_proxy and apt_proxy.enabled else None
+        if self._apt_proxy is not None:
+            self._apt_proxy.start()
+
+        # Collector of stale containers, first pass right away
+        self._gc_stopped = threading.Event()
+        if self._configuration.gc_ttl > 0:
+            threading.Thread(
+                target=self._collect_periodically, name="ContainerGC", daemon=True
+            ).start()
+            atexit.register(self._gc_stopped.set)
 
         self._logger.info("ContainerManagerService initialized")
 
@@ -46,22 +115,8 @@ class ContainerManagerService:
         container = None
 
         try:
-
-            self._logger.info("Pulling image (image=%s)", parameters.image)
-            self._docker_service.pull_image(parameters.image)
-
-            self._logger.info("Running container (image=%s)", parameters.image)
-            container = self._docker_service.run_container(
-                image=parameters.image,
-                name=parameters.name,
-                command=parameters.command,
-                environment=parameters.environment,
-                ports=parameters.ports,
-                volumes=parameters.volumes,
-                restart_policy=parameters.restart_policy,
-                detach=parameters.detach,
-                remove=parameters.remove,
-            )
+            with self._metrics.span("deploy"):
+                container = self._deploy(parameters)
 
         except Exception as e:
             self._logger.error("Error deploying application: %s", e)
@@ -69,20 +124,320 @@ class ContainerManagerService:
 
         return container
 
+    def _deploy(
+        self, parameters: ContainerConfig
+    ) -> "docker.models.containers.Container":
+        """
+        Pull the image if asked to and run the container.
+        """
+        if parameters.pull:
+            self._logger.info("Ensuring image (image=%s)", parameters.image)
+            self._docker_service.ensure_image(
+                parameters.image, platform=parameters.platform
+            )
+
+        extra_hosts = dict(parameters.extra_hosts or {})
+        if self._apt_proxy is not None:
+            extra_hosts.update(self._apt_proxy.container_extra_hosts())
+
+        labels = {**(parameters.labels or {}), MANAGED_LABEL: "true"}
+
+        self._logger.info("Running container (image=%s)", parameters.image)
+        return self._docker_service.run_container(
+            image=parameters.image,
+            name=parameters.name,
+            command=parameters.command,
+            environment=parameters.environment,
+            ports=parameters.ports,
+            volumes=parameters.volumes,
+            restart_policy=parameters.restart_policy,
+            platform=parameters.platform,
+            extra_hosts=extra_hosts,
+            detach=parameters.detach,
+            remove=parameters.remove,
+            labels=labels,
+        )
+
     def remove_application(
-        self, container_id: str
+        self, container_id: str, force: bool = False
     ) -> "docker.models.containers.Container":
         """
         Remove an application.
+
+        With force the container is killed and removed in one call instead
+        of waiting for a graceful stop.
         """
-        self._logger.info("Removing application (container_id=%s)", container_id)
-        self._docker_service.stop_container(container_id)
-        container = self._docker_service.remove_container(container_id)
+        self._logger.info(
+            "Removing application (container_id=%s, force=%s)", container_id, force
+        )
+        return self._docker_service.remove_container(
+            container_id, force=force, stop=not force
+        )
 
-        return container
+    def find_applications(
+        self, labels: Optional[Dict[str, str]] = None
+    ) -> List["docker.models.containers.Container"]:
+        """
+        List managed containers matching all the given labels.
+
+        The containers only carry the attributes of the list call.
+        """
+        return self._docker_service.find_containers(
+            {MANAGED_LABEL: "true", **(labels or {})}
+        )
+
+    def stop_applications(
+        self, labels: Optional[Dict[str, str]] = None, timeout: int = 10
+    ) -> List[str]:
+        """
+        Stop managed containers matching the labels in parallel.
+
+        Returns:
+            Ids of the stopped containers
+        """
+        container_ids = [
+            container.id
+            for container in self.find_applications(labels)
+            if container.attrs.get("State") == "running"
+        ]
+        self._logger.info(
+            "Stopping applications (labels=%s, count=%s)", labels, len(container_ids)
+        )
+        return self._docker_service.stop_containers(container_ids, timeout=timeout)
+
+    def remove_applications(
+        self, labels: Optional[Dict[str, str]] = None, force: bool = True
+    ) -> List[str]:
+        """
+        Remove managed containers matching the labels in parallel.
+
+        Returns:
+            Ids of the removed containers
+        """
+        container_ids = [container.id for container in self.find_applications(labels)]
+        self._logger.info(
+            "Removing applications (labels=%s, count=%s)", labels, len(container_ids)
+        )
+        return self._docker_service.remove_containers(container_ids, force=force)
+
+    def collect_garbage(self, ttl: Optional[float] = None) -> List[str]:
+        """
+        Remove build containers created more than `ttl` seconds ago whose
+        build never succeeded.
+
+        `ttl` must be longer than any build, since running builds are
+        removed too.
+
+        Returns:
+            Ids of the removed containers
+        """
+        ttl = self._configuration.gc_ttl if ttl is None else ttl
+        cutoff = time.time() - ttl
+
+        expired = [
+            container.id
+            for container in self.find_applications({ROLE_LABEL: "build"})
+            if container.attrs.get("Created", cutoff) < cutoff
+            and _BUILD_NAME.search((container.attrs.get("Names") or [""])[0])
+        ]
+        if not expired:
+            return []
+
+        self._logger.info(
+            "Removing stale applications (ttl=%s, count=%s)", ttl, len(expired)
+        )
+        removed = self._docker_service.remove_containers(expired, force=True)
+        self._reaped.inc(len(removed))
+        return removed
+
+    def remove_build_containers(self, name: str) -> List[str]:
+        """
+        Remove the containers of unfinished builds of `name`, e.g. ones an
+        interrupted attempt left behind.
+
+        Returns:
+            Ids of the removed containers
+        """
+        pattern = re.compile(re.escape(f"/{name}") + _BUILD_NAME.pattern)
+        leftovers = [
+            container.id
+            for container in self.find_applications({ROLE_LABEL: "build"})
+            if pattern.match((container.attrs.get("Names") or [""])[0])
+        ]
+        if not leftovers:
+            return []
+
+        self._logger.info(
+            "Removing unfinished builds (name=%s, count=%s)", name, len(leftovers)
+        )
+        return self._docker_service.remove_containers(leftovers, force=True)
+
+    def rename_application(
+        self, container_id: str, name: str
+    ) -> "docker.models.containers.Container":
+        """
+        Rename an application.
+        """
+        self._logger.info(
+            "Renaming application (container_id=%s, name=%s)", container_id, name
+        )
+        return self._docker_service.rename_container(container_id, name)
+
+    def execute_in_application(
+        self,
+        container_id: str,
+        command: str,
+        environment: Optional[Dict[str, Any]] = None,
+        output: Optional[Callable[[str], None]] = None,
+    ) -> Tuple[int, str]:
+        """
+        Execute a command in an application container.
+
+        With `output`, it receives the command's output line by line.
+
+        When the APT proxy is enabled the command runs with it configured.
+        It is passed per exec rather than on the container so it never ends
+        up in committed images.
+        """
+        if self._apt_proxy is not None:
+            environment = {
+                **self._apt_proxy.container_environment(),
+                **(environment or {}),
+            }
+
+        self._logger.info(
+            "Executing in application (container_id=%s, command=%s)",
+            container_id,
+            command,
+        )
+        return self._docker_service.exec_in_container(
+            container_id, command, environment=environment, output=output
+        )
+
+    def copy_to_application(self, container_id: str, path: str, data: bytes) -> None:
+        """
+        Extract a tar archive into a directory of an application container.
+        """
+        self._logger.info(
+            "Copying archive to application (container_id=%s, path=%s)",
+            container_id,
+            path,
+        )
+        self._docker_service.put_archive(container_id, path, data)
+
+    def commit_application(
+        self,
+        container_id: str,
+        repository: str,
+        tag: str,
+        labels: Optional[Dict[str, str]] = None,
+    ) -> "docker.models.images.Image":
+        """
+        Commit an application container to an image.
+
+        The image does not carry the managed labels of the container.
+        """
+        self._logger.info(
+            "Committing application (container_id=%s, image=%s:%s)",
+            container_id,
+            repository,
+            tag,
+        )
+        return self._docker_service.commit_container(
+            container_id,
+            repository=repository,
+            tag=tag,
+            labels={**(labels or {}), **UNMANAGED_LABELS},
+        )
+
+    def squash_application(
+        self,
+        container_id: str,
+        repository: str,
+        tag: str,
+        labels: Optional[Dict[str, str]] = None,
+    ) -> str:
+        """
+        Store an application container as a single-layer image.
+
+        The image does not carry the managed labels of the container.
+
+        Returns:
+            Image id
+        """
+        self._logger.info(
+            "Squashing application (container_id=%s, image=%s:%s)",
+            container_id,
+            repository,
+            tag,
+        )
+        return self._docker_service.squash_container(
+            container_id,
+            repository=repository,
+            tag=tag,
+            labels={**(labels or {}), **UNMANAGED_LABELS},
+        )
+
+    def tag_image(self, image: str, repository: str, tag: str) -> None:
+        """
+        Tag an image.
+        """
+        self._docker_service.tag_image(image, repository, tag)
+
+    def ensure_image(self, image: str, platform: Optional[str] = None) -> str:
+        """
+        Make sure an image is present locally.
+
+        Returns:
+            Image id
+        """
+        return self._docker_service.ensure_image(image, platform=platform).image_id
+
+    def image_exists(self, image: str) -> bool:
+        """
+        Check if an image exists locally.
+        """
+        return self._docker_service.get_image(image) is not None
+
+    def get_image_digest(self, image: str) -> Optional[str]:
+        """
+        Get the repo digest of a local image, or its id if it has none.
+        """
+        local_image = self._docker_service.get_image(image)
+        if local_image is None:
+            return None
+
+        digests = local_image.attrs.get("RepoDigests") or []
+        return digests[0] if digests else local_image.id
+
+    def get_image_layers(self, image: str) -> int:
+        """
+        Get the number of filesystem layers of a local image, 0 if missing.
+        """
+        local_image = self._docker_service.get_image(image)
+        if local_image is None:
+            return 0
+        return len((local_image.attrs.get("RootFS") or {}).get("Layers") or [])
+
+    def _collect_periodically(self) -> None:
+        while True:
+            try:
+                self.collect_garbage()
+            except Exception as e:
+                self._logger.warning("Error collecting stale containers: %s", e)
+
+            if self._gc_stopped.wait(self._configuration.gc_interval):
+                return
 
     def application_exists(self, name: str) -> bool:
         """
         Check if an application exists.
         """
-        return self._docker_service.container_exists(name)
+        with self._metrics.span("exists_check"):
+            return self._docker_service.container_exists(name)
+
+    def application_status(self, name: str) -> Optional[str]:
+        """
+        Get the status of an application, None if it does not exist.
+        """
+        return self._docker_service.container_status(name)
@@ -20,7 +20,22 @@ class ContainerConfig:
     ports: Optional[Dict[str, Any]] = field(default_factory=dict)
     volumes: Optional[Dict[str, Any]] = field(default_factory=dict)
     restart_policy: Optional[str] = None
+    platform: Optional[str] = None
+    extra_hosts: Optional[Dict[str, str]] = field(default_factory=dict)
+    pull: bool = True
     detach: bool = True
     remove: bool = True
     tty: bool = False
     stdin_open: bool = False
+    labels: Optional[Dict[str, str]] = field(default_factory=dict)
+
+
+@dataclass
+class ContainerManagerConfig:
+    """
+    Configuration for container manager.
+    """
+
+    # Managed containers older than this many seconds are removed; 0 disables
+    gc_ttl: float = 0
+    gc_interval: float = 3600.0
@@ -1,4 +1,20 @@
 from .docker_service import DockerService
-from .models import DockerServiceConfig
+from .async_docker_service import AsyncDockerService
+from .log_multiplexer import LogMultiplexer
+from .models import DockerServiceConfig, LogLine
+from .exceptions import (
+    DockerEngineError,
+    DockerEngineNotFoundError,
+    DockerEngineConnectionError,
+)
 
-__all__ = ["DockerService", "DockerServiceConfig"]
+__all__ = [
+    "DockerService",
+    "AsyncDockerService",
+    "DockerServiceConfig",
+    "LogLine",
+    "LogMultiplexer",
+    "DockerEngineError",
+    "DockerEngineNotFoundError",
+    "DockerEngineConnectionError",
+]
@@ -0,0 +1,372 @@
+"""
+Module for working with Docker from asyncio.
+"""
+
+# Imports from standard library
+import asyncio
+import io
+import logging
+import shlex
+import tarfile
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
+
+# Imports from local modules
+from app.services.docker_service.engine_client import EngineClient
+from app.services.docker_service.exceptions import (
+    DockerEngineError,
+    DockerEngineNotFoundError,
+)
+from app.services.docker_service.models import DockerServiceConfig, LogLine
+from app.services.docker_service.streams import (
+    MULTIPLEXED_CONTENT_TYPE,
+    STREAM_NAMES,
+    STREAM_STDERR,
+    STREAM_STDOUT,
+    FrameDecoder,
+    JSONLinesDecoder,
+    LineDecoder,
+)
+
+
+class AsyncDockerService:
+    """
+    Asyncio service for working with Docker.
+
+    Mirrors DockerService but talks to the Engine API directly over a
+    pooled keep-alive connection and returns the API's JSON objects
+    instead of docker SDK models.
+    """
+
+    def __init__(self, logger: logging.Logger, configuration: DockerServiceConfig):
+        self._logger = logger.getChild("AsyncDockerService")
+        self._configuration = configuration
+
+        self._logger.debug("DockerServiceConfig: %s", self._configuration)
+
+        self._client = EngineClient(
+            base_url=self._configuration.base_url,
+            version=self._configuration.version,
+            timeout=self._configuration.timeout,
+            max_connections=self._configuration.max_connections,
+        )
+
+        self._logger.info("AsyncDockerService initialized")
+
+    async def close(self) -> None:
+        """
+        Close pooled connections.
+        """
+        await self._client.close()
+
+    async def list_containers(self, all: bool = True) -> List[Dict[str, Any]]:
+        """
+        List all containers.
+        """
+        try:
+            self._logger.debug("Listing containers (all=%s)", all)
+            return await self._client.call("GET", "/containers/json", {"all": all})
+        except DockerEngineError as e:
+            self._logger.error("Error listing containers: %s", e)
+            raise e
+
+    async def run_container(
+        self, image: str, command: str = None, **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Run a container.
+
+        Accepts the keyword arguments of DockerService.run_container that
+        ContainerConfig uses. The image is pulled if it is missing.
+
+        Returns:
+            Container inspect data
+        """
+        try:
+            self._logger.info(
+                "Running container (image=%s, command=%s)", image, command
+            )
+            params = {"name": kwargs.get("name"), "platform": kwargs.get("platform")}
+            body = self._create_body(image, command, kwargs)
+
+            try:
+                created = await self._client.call(
+                    "POST", "/containers/create", params, body
+                )
+            except DockerEngineNotFoundError:
+                await self.pull_image(image, platform=kwargs.get("platform"))
+                created = await self._client.call(
+                    "POST", "/containers/create", params, body
+                )
+
+            container_id = created["Id"]
+            await self._client.call("POST", f"/containers/{container_id}/start")
+
+            if not kwargs.get("detach", False):
+                await self._client.call("POST", f"/containers/{container_id}/wait")
+
+            return await self.inspect_container(container_id)
+        except DockerEngineError as e:
+            self._logger.error("Error running container: %s", e)
+            raise e
+
+    async def inspect_container(self, container_id: str) -> Dict[str, Any]:
+        """
+        Inspect a container.
+        """
+        return await self._client.call("GET", f"/containers/{container_id}/json")
+
+    async def stop_container(self, container_id: str) -> Dict[str, Any]:
+        """
+        Stop a container.
+        """
+        try:
+            self._logger.debug("Stopping container (container_id=%s)", container_id)
+            await self._client.call("POST", f"/containers/{container_id}/stop")
+            return await self.inspect_container(container_id)
+        except DockerEngineError as e:
+            self._logger.error("Error stopping container: %s", e)
+            raise e
+
+    async def remove_container(self, container_id: str, force: bool = False) -> None:
+        """
+        Remove a container.
+        """
+        try:
+            self._logger.debug(
+                "Removing container (container_id=%s, force=%s)", container_id, force
+            )
+            await self._client.call(
+                "DELETE", f"/containers/{container_id}", {"force": force}
+            )
+        except DockerEngineError as e:
+            self._logger.error("Error removing container: %s", e)
+            raise e
+
+    async def get_logs(self, container_id: str, tail: int = 100) -> str:
+        """
+        Get logs from a container.
+        """
+        try:
+            self._logger.debug(
+                "Getting logs from container (container_id=%s, tail=%s)",
+                container_id,
+                tail,
+            )
+            params = {"stdout": True, "stderr": True, "tail": tail}
+            async with self._client.stream(
+                "GET", f"/containers/{container_id}/logs", params
+            ) as response:
+                body = await response.read()
+
+                if response.content_type.startswith(MULTIPLEXED_CONTENT_TYPE):
+                    body = b"".join(data for _, data in FrameDecoder().feed(body))
+
+            return body.decode(errors="replace")
+        except DockerEngineError as e:
+            self._logger.error("Error getting logs from container: %s", e)
+            raise e
+
+    async def follow_logs(
+        self,
+        container_id: str,
+        tail: Union[int, str] = "all",
+        since: Optional[float] = None,
+        follow: bool = True,
+        timestamps: bool = False,
+    ) -> AsyncIterator[LogLine]:
+        """
+        Stream logs from a container line by line as they are written.
+
+        Lines are decoded incrementally and tagged with the stream they
+        came from. With `follow` the stream stays open until the container
+        stops, on a connection of its own outside the pool. `since` is a
+        Unix timestamp; only lines written after it are sent.
+        """
+        try:
+            self._logger.debug(
+                "Following logs of container (container_id=%s, tail=%s, since=%s)",
+                container_id,
+                tail,
+                since,
+            )
+            params = {
+                "stdout": True,
+                "stderr": True,
+                "follow": follow,
+                "tail": tail,
+                "since": since,
+                "timestamps": timestamps,
+            }
+            async with self._client.stream(
+                "GET", f"/containers/{container_id}/logs", params, dedicated=follow
+            ) as response:
+                # TTY containers send their output as is, all on stdout
+                frames = None
+                if response.content_type.startswith(MULTIPLEXED_CONTENT_TYPE):
+                    frames = FrameDecoder()
+                decoders = {STREAM_STDOUT: LineDecoder(), STREAM_STDERR: LineDecoder()}
+
+                async for chunk in response.iter_chunks():
+                    pieces = frames.feed(chunk) if frames else [(STREAM_STDOUT, chunk)]
+                    for stream, data in pieces:
+                        if stream not in decoders:
+                            continue
+                        for text in decoders[stream].feed(data):
+                            yield LogLine(container_id, STREAM_NAMES[stream], text)
+
+                for stream, decoder in decoders.items():
+                    for text in decoder.flush():
+                        yield LogLine(container_id, STREAM_NAMES[stream], text)
+        except DockerEngineError as e:
+            self._logger.error("Error following logs of container: %s", e)
+            raise e
+
+    async def pull_image(
+        self, image: str, platform: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Pull an image.
+
+        Returns:
+            Image inspect data
+        """
+        try:
+            self._logger.debug("Pulling image (image=%s, platform=%s)", image, platform)
+            repository, tag = self._split_image(image)
+            await self._consume_progress(
+                "POST",
+                "/images/create",
+                {"fromImage": repository, "tag": tag, "platform": platform},
+            )
+            return await self.inspect_image(f"{repository}:{tag}")
+        except DockerEngineError as e:
+            self._logger.error("Error pulling image: %s", e)
+            raise e
+
+    async def build_image(self, path: str, tag: str) -> Dict[str, Any]:
+        """
+        Build an image.
+
+        Returns:
+            Image inspect data
+        """
+        try:
+            self._logger.debug("Building image (path=%s, tag=%s)", path, tag)
+            context = await asyncio.get_running_loop().run_in_executor(
+                None, self._tar_context, path
+            )
+            await self._consume_progress(
+                "POST",
+                "/build",
+                {"t": tag},
+                body=context,
+                headers={"Content-Type": "application/x-tar"},
+            )
+            return await self.inspect_image(tag)
+        except DockerEngineError as e:
+            self._logger.error("Error building image: %s", e)
+            raise e
+
+    async def inspect_image(self, image: str) -> Dict[str, Any]:
+        """
+        Inspect an image.
+        """
+        return await self._client.call("GET", f"/images/{image}/json")
+
+    async def get_container(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a container by name.
+        """
+        try:
+            return await self.inspect_container(name)
+        except DockerEngineError:
+            return None
+
+    async def container_exists(self, name: str) -> bool:
+        """
+        Check if a container with the given name exists.
+        """
+        return await self.get_container(name) is not None
+
+    async def _consume_progress(
+        self,
+        method: str,
+        path: str,
+        params: Dict[str, Any],
+        body: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """
+        Read a JSON progress stream, raising on reported errors.
+        """
+        decoder = JSONLinesDecoder()
+        async with self._client.stream(method, path, params, body, headers) as response:
+            async for chunk in response.iter_chunks():
+                for event in decoder.feed(chunk):
+                    self._raise_for_event(event)
+
+        for event in decoder.flush():
+            self._raise_for_event(event)
+
+    @staticmethod
+    def _raise_for_event(event: Dict[str, Any]) -> None:
+        if "error" in event:
+            raise DockerEngineError(500, event["error"])
+
+    @staticmethod
+    def _split_image(image: str):
+        repository, _, tag = image.rpartition(":")
+        if not repository or "/" in tag:
+            return image, "latest"
+        return repository, tag
+
+    @staticmethod
+    def _tar_context(path: str) -> bytes:
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w") as tar:
+            tar.add(path, arcname=".")
+        return buffer.getvalue()
+
+    @staticmethod
+    def _create_body(image: str, command: Optional[str], kwargs: Dict[str, Any]):
+        """
+        Translate DockerService.run_container arguments to a create body.
+        """
+        environment = kwargs.get("environment") or {}
+        ports = kwargs.get("ports") or {}
+        volumes = kwargs.get("volumes") or {}
+        restart_policy = kwargs.get("restart_policy")
+        if isinstance(restart_policy, str):
+            restart_policy = {"Name": restart_policy}
+
+        host_config = {
+            "AutoRemove": bool(kwargs.get("remove", False)),
+            "ExtraHosts": [
+                f"{host}:{address}"
+                for host, address in (kwargs.get("extra_hosts") or {}).items()
+            ],
+            "Binds": [
+                f"{source}:{bind['bind']}:{bind.get('mode', 'rw')}"
+                for source, bind in volumes.items()
+            ],
+            "PortBindings": {
+                port: [{"HostPort": str(host_port)}]
+                for port, host_port in ports.items()
+            },
+        }
+        if restart_policy:
+            host_config["RestartPolicy"] = restart_policy
+
+        body = {
+            "Image": image,
+            "Env": [f"{key}={value}" for key, value in environment.items()],
+            "Labels": kwargs.get("labels") or {},
+            "Tty": bool(kwargs.get("tty", False)),
+            "OpenStdin": bool(kwargs.get("stdin_open", False)),
+            "ExposedPorts": {port: {} for port in ports},
+            "HostConfig": host_config,
+        }
+        if command:
+            body["Cmd"] = shlex.split(command)
+
+        return body
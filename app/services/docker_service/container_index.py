@@ -0,0 +1,254 @@
+"""
+Module for indexing containers from the Docker event stream.
+"""
+
+# Imports from standard library
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+
+# Event actions and the status they leave a container in
+_STATUS_BY_ACTION = {
+    "create": "created",
+    "start": "running",
+    "restart": "running",
+    "unpause": "running",
+    "pause": "paused",
+    "die": "exited",
+}
+
+# Event attributes that are not container labels
+_EVENT_ATTRIBUTES = {"name", "image", "exitCode", "signal", "oldName"}
+
+# Destroyed container ids remembered to ignore late records of them
+_DESTROYED_MAX = 4096
+
+
+@dataclass
+class IndexedContainer:
+    """
+    Container as last seen in a list call or event.
+    """
+
+    id: str
+    name: str
+    status: str
+    image: Optional[str] = None
+    labels: Dict[str, str] = field(default_factory=dict)
+    # Unix time, as in list calls
+    created: Optional[float] = None
+
+
+class ContainerIndex:
+    """
+    In-memory index of containers by id, name and label.
+
+    It is seeded from a list call and then kept current by applying
+    container events. Lookups should only trust it while `ready`; it is
+    cleared whenever the event stream is lost, until the next seed.
+
+    Recently destroyed ids are remembered, so a container recorded by
+    this process after its destroy event, e.g. one run with `remove`
+    that exited at once, is not added back.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_id: Dict[str, IndexedContainer] = {}
+        self._by_name: Dict[str, str] = {}
+        self._destroyed: "OrderedDict[str, None]" = OrderedDict()
+        self._ready = False
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def seed(self, containers: Iterable[Dict[str, Any]]) -> None:
+        """
+        Replace the index with the output of a container list call.
+        """
+        entries = [
+            IndexedContainer(
+                id=container["Id"],
+                name=(container.get("Names") or ["/"])[0].lstrip("/"),
+                status=container.get("State") or "unknown",
+                image=container.get("Image"),
+                labels=dict(container.get("Labels") or {}),
+                created=container.get("Created"),
+            )
+            for container in containers
+        ]
+
+        with self._lock:
+            self._by_id = {entry.id: entry for entry in entries}
+            self._by_name = {entry.name: entry.id for entry in entries}
+            self._ready = True
+
+    def invalidate(self) -> None:
+        """
+        Forget everything until the next seed.
+        """
+        with self._lock:
+            self._by_id.clear()
+            self._by_name.clear()
+            self._ready = False
+
+    def apply(self, event: Dict[str, Any]) -> None:
+        """
+        Apply a Docker event; events of other object types are ignored.
+        """
+        if event.get("Type", "container") != "container":
+            return
+
+        action = (event.get("Action") or event.get("status") or "").split(":")[0]
+        actor = event.get("Actor") or {}
+        container_id = actor.get("ID") or event.get("id")
+        attributes = actor.get("Attributes") or {}
+        if not container_id:
+            return
+
+        with self._lock:
+            entry = self._by_id.get(container_id)
+
+            if action == "destroy":
+                self._forget(container_id)
+                if entry is not None:
+                    self._drop(entry)
+                return
+
+            if entry is None:
+                # Only creations add containers; anything else about an
+                # unknown container is about one already destroyed
+                if action != "create":
+                    return
+                entry = IndexedContainer(
+                    id=container_id,
+                    name=attributes.get("name", ""),
+                    status="created",
+                    image=attributes.get("image"),
+                    labels={
+                        key: value
+                        for key, value in attributes.items()
+                        if key not in _EVENT_ATTRIBUTES
+                    },
+                    created=event.get("time"),
+                )
+                self._add(entry)
+                return
+
+            if action == "rename" and "name" in attributes:
+                self._rename(entry, attributes["name"])
+            elif action in _STATUS_BY_ACTION:
+                entry.status = _STATUS_BY_ACTION[action]
+
+    def put(
+        self,
+        container_id: str,
+        name: str,
+        status: str,
+        image: Optional[str] = None,
+        labels: Optional[Dict[str, str]] = None,
+        created: Optional[float] = None,
+    ) -> None:
+        """
+        Record a container changed by this process before its event arrives.
+        """
+        with self._lock:
+            if container_id in self._destroyed:
+                return
+
+            entry = self._by_id.get(container_id)
+            if entry is None:
+                self._add(
+                    IndexedContainer(
+                        container_id, name, status, image, labels or {}, created
+                    )
+                )
+            else:
+                self._rename(entry, name)
+                entry.status = status
+
+    def set_status(self, ref: str, status: str) -> None:
+        """
+        Record a status change made by this process.
+        """
+        with self._lock:
+            entry = self._find(ref)
+            if entry is not None:
+                entry.status = status
+
+    def rename(self, ref: str, name: str) -> None:
+        """
+        Record a rename made by this process.
+        """
+        with self._lock:
+            entry = self._find(ref)
+            if entry is not None:
+                self._rename(entry, name)
+
+    def discard(self, ref: str) -> None:
+        """
+        Record a removal made by this process.
+        """
+        with self._lock:
+            entry = self._find(ref)
+            if entry is not None:
+                self._forget(entry.id)
+                self._drop(entry)
+
+    def get(self, ref: str) -> Optional[IndexedContainer]:
+        """
+        Get a container by name, id or unique id prefix.
+        """
+        with self._lock:
+            return self._find(ref)
+
+    def with_labels(self, labels: Dict[str, Optional[str]]) -> List[IndexedContainer]:
+        """
+        Containers having every label; a None value matches any value.
+        """
+        with self._lock:
+            return [
+                entry
+                for entry in self._by_id.values()
+                if all(
+                    key in entry.labels and value in (None, entry.labels[key])
+                    for key, value in labels.items()
+                )
+            ]
+
+    def _find(self, ref: str) -> Optional[IndexedContainer]:
+        ref = ref.lstrip("/")
+        container_id = self._by_name.get(ref, ref)
+        entry = self._by_id.get(container_id)
+        if entry is not None or len(ref) < 12:
+            return entry
+
+        matches = [entry for key, entry in self._by_id.items() if key.startswith(ref)]
+        return matches[0] if len(matches) == 1 else None
+
+    def _add(self, entry: IndexedContainer) -> None:
+        self._by_id[entry.id] = entry
+        self._by_name[entry.name] = entry.id
+
+    def _drop(self, entry: IndexedContainer) -> None:
+        self._by_id.pop(entry.id, None)
+        if self._by_name.get(entry.name) == entry.id:
+            del self._by_name[entry.name]
+
+    def _rename(self, entry: IndexedContainer, name: str) -> None:
+        name = name.lstrip("/")
+        if self._by_name.get(entry.name) == entry.id:
+            del self._by_name[entry.name]
+        entry.name = name
+        self._by_name[name] = entry.id
+
+    def _forget(self, container_id: str) -> None:
+        self._destroyed[container_id] = None
+        if len(self._destroyed) > _DESTROYED_MAX:
+            self._destroyed.popitem(last=False)
@@ -2,56 +2,194 @@
 Module for working with Docker.
 """
 
-# Imports from third party libraries
-
-import docker
+# Imports from standard library
+import importlib.util
+import json
 import logging
-from typing import List, Optional
-
-import docker.errors
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 
 # Imports from local modules
+from app.services.docker_service.container_index import ContainerIndex
+from app.services.docker_service.image_index import ImageIndex, IndexedImage
 from app.services.docker_service.models import DockerServiceConfig
+from app.services.docker_service.single_flight import SingleFlight
+from app.services.docker_service.streams import LineDecoder
+
+# Imports from services modules
+from app.services.metrics_service import MetricsService
+
+
+def _lazy_module(name: str):
+    """
+    Import a module on first attribute access.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+# Imports from third party libraries, deferred since the docker SDK pulls
+# in requests and urllib3
+docker = _lazy_module("docker")
+
+
+def _config_changes(
+    config: Dict[str, Any], labels: Optional[Dict[str, str]] = None
+) -> List[str]:
+    """
+    Dockerfile instructions recreating a container's config on an import.
+    """
+    changes = []
+    for variable in config.get("Env") or []:
+        key, _, value = variable.partition("=")
+        changes.append(f"ENV {key}={json.dumps(value)}")
+    for instruction, key in (("CMD", "Cmd"), ("ENTRYPOINT", "Entrypoint")):
+        if config.get(key):
+            changes.append(f"{instruction} {json.dumps(config[key])}")
+    if config.get("WorkingDir"):
+        changes.append(f"WORKDIR {config['WorkingDir']}")
+    if config.get("User"):
+        changes.append(f"USER {config['User']}")
+    for key, value in {**(config.get("Labels") or {}), **(labels or {})}.items():
+        changes.append(f"LABEL {json.dumps(key)}={json.dumps(value)}")
+    return changes
 
 
 class DockerService:
     """
     Service for working with Docker.
+
+    The Docker client connects on first use. Container lookups are
+    answered from an index kept current by the daemon's event stream,
+    which is watched from the first lookup on.
     """
 
-    def __init__(self, logger: logging.Logger, configuration: DockerServiceConfig):
+    def __init__(
+        self,
+        logger: logging.Logger,
+        configuration: DockerServiceConfig,
+        metrics: Optional[MetricsService] = None,
+    ):
         self._logger = logger.getChild("DockerService")
         self._configuration = configuration
+        self._metrics = metrics or MetricsService(logger)
 
         self._logger.debug("DockerServiceConfig: %s", self._configuration)
 
-        self._logger.info("Initializing DockerService")
+        self._docker_client: Optional["docker.DockerClient"] = None
+        self._client_lock = threading.Lock()
+
+        self._image_index = ImageIndex(ttl=self._configuration.image_ttl)
+        self._pulls = SingleFlight()
+
+        # Ids of local images by tag, listed on first use and taken as fresh
+        # once each, so a restart does not pull every image again
+        self._local_images: Optional[Dict[str, str]] = None
+        self._local_images_lock = threading.Lock()
 
-        self._client = docker.DockerClient(
-            base_url=self._configuration.base_url,
-            version=self._configuration.version,
-            timeout=self._configuration.timeout,
+        self._containers = ContainerIndex()
+        self._watcher: Optional[threading.Thread] = None
+        self._watch_stopped = threading.Event()
+        self._event_stream = None
+
+        self._image_lookups = self._metrics.counter(
+            "image_lookups_total", "Image ensures by outcome", ["result"]
+        )
+        self._pulled_bytes = self._metrics.counter(
+            "image_pulled_bytes_total", "Size of pulled images"
+        )
+        self._exported_bytes = self._metrics.counter(
+            "container_exported_bytes_total", "Bytes streamed by container exports"
         )
 
-        self._logger.info("Docker client initialized")
+        self._logger.info("DockerService initialized")
+
+    @property
+    def _client(self) -> "docker.DockerClient":
+        """
+        Docker client, created on first use.
+        """
+        if self._docker_client is None:
+            with self._client_lock:
+                if self._docker_client is None:
+                    self._logger.info("Initializing Docker client")
+                    self._docker_client = docker.DockerClient(
+                        base_url=self._configuration.base_url,
+                        version=self._configuration.version,
+                        timeout=self._configuration.timeout,
+                        max_pool_size=self._configuration.max_connections,
+                    )
+        return self._docker_client
 
     def list_containers(
-        self, all: bool = True
-    ) -> List[docker.models.containers.Container]:
+        self,
+        all: bool = True,
+        filters: Optional[Dict[str, Any]] = None,
+        sparse: bool = False,
+    ) -> List["docker.models.containers.Container"]:
         """
         List all containers.
+
+        Sparse containers only carry the attributes of the list call, which
+        saves an inspect per container.
         """
         try:
-            self._logger.debug("Listing containers (all=%s)", all)
-            return self._client.containers.list(all=all)
+            self._logger.debug("Listing containers (all=%s, filters=%s)", all, filters)
+            return self._client.containers.list(all=all, filters=filters, sparse=sparse)
         except docker.errors.DockerException as e:
             self._logger.error("Error listing containers: %s", e)
             raise e
 
+    def find_containers(
+        self, labels: Dict[str, Optional[str]]
+    ) -> List["docker.models.containers.Container"]:
+        """
+        List containers having every label; a None value matches any value.
+
+        Like sparse listings, the containers only carry the attributes of
+        the list call. They come from the index while it is in sync.
+        """
+        index = self._container_index()
+        if index is None:
+            filters = [
+                key if value is None else f"{key}={value}"
+                for key, value in labels.items()
+            ]
+            return self.list_containers(
+                all=True, filters={"label": filters}, sparse=True
+            )
+
+        return [
+            self._client.containers.prepare_model(
+                {
+                    "Id": entry.id,
+                    "Names": [f"/{entry.name}"],
+                    "Image": entry.image,
+                    "State": entry.status,
+                    "Labels": dict(entry.labels),
+                    **({"Created": entry.created} if entry.created else {}),
+                }
+            )
+            for entry in index.with_labels(labels)
+        ]
+
     def run_container(
         self, image: str, command: str = None, **kwargs
-    ) -> docker.models.containers.Container:
+    ) -> "docker.models.containers.Container":
         """
         Run a container.
         """
@@ -59,12 +197,24 @@ class DockerService:
             self._logger.info(
                 "Running container (image=%s, command=%s)", image, command
             )
-            return self._client.containers.run(image, command, **kwargs)
+            with self._metrics.span("container_run"):
+                container = self._client.containers.run(image, command, **kwargs)
         except docker.errors.DockerException as e:
             self._logger.error("Error running container: %s", e)
             raise e
 
-    def stop_container(self, container_id: str) -> docker.models.containers.Container:
+        if kwargs.get("detach"):
+            self._containers.put(
+                container.id,
+                container.name,
+                "running",
+                image=image,
+                labels=container.labels,
+                created=time.time(),
+            )
+        return container
+
+    def stop_container(self, container_id: str) -> "docker.models.containers.Container":
         """
         Stop a container.
         """
@@ -72,28 +222,126 @@ class DockerService:
             self._logger.debug("Stopping container (container_id=%s)", container_id)
             container = self._client.containers.get(container_id)
             container.stop()
+            self._containers.set_status(container.id, "exited")
             return container
         except docker.errors.DockerException as e:
             self._logger.error("Error stopping container: %s", e)
             raise e
 
     def remove_container(
-        self, container_id: str, force: bool = False
-    ) -> docker.models.containers.Container:
+        self, container_id: str, force: bool = False, stop: bool = False
+    ) -> "docker.models.containers.Container":
         """
-        Remove a container.
+        Remove a container, stopping it first if asked to.
         """
         try:
             self._logger.debug(
-                "Removing container (container_id=%s, force=%s)", container_id, force
+                "Removing container (container_id=%s, force=%s, stop=%s)",
+                container_id,
+                force,
+                stop,
             )
             container = self._client.containers.get(container_id)
+            if stop:
+                container.stop()
             container.remove(force=force)
+            self._containers.discard(container.id)
             return container
         except docker.errors.DockerException as e:
             self._logger.error("Error removing container: %s", e)
             raise e
 
+    def stop_containers(
+        self, container_ids: Iterable[str], timeout: int = 10
+    ) -> List[str]:
+        """
+        Stop containers in parallel.
+
+        Returns:
+            Ids of the containers that were stopped or already gone
+        """
+        stopped = self._bulk(
+            "stop",
+            lambda container_id: self._client.api.stop(container_id, timeout=timeout),
+            container_ids,
+        )
+        for container_id in stopped:
+            self._containers.set_status(container_id, "exited")
+        return stopped
+
+    def remove_containers(
+        self, container_ids: Iterable[str], force: bool = False
+    ) -> List[str]:
+        """
+        Remove containers in parallel.
+
+        Returns:
+            Ids of the containers that were removed or already gone
+        """
+        removed = self._bulk(
+            "remove",
+            lambda container_id: self._client.api.remove_container(
+                container_id, force=force
+            ),
+            container_ids,
+        )
+        for container_id in removed:
+            self._containers.discard(container_id)
+        return removed
+
+    def _bulk(
+        self, action: str, fn: Callable[[str], Any], container_ids: Iterable[str]
+    ) -> List[str]:
+        """
+        Apply fn to each container over the pooled connections.
+
+        Failures are logged and skipped so one bad container does not stop
+        the rest.
+        """
+        container_ids = list(container_ids)
+        if not container_ids:
+            return []
+
+        self._logger.debug("Bulk %s of %s containers", action, len(container_ids))
+
+        def apply(container_id: str) -> Optional[str]:
+            try:
+                fn(container_id)
+            except docker.errors.NotFound:
+                pass
+            except docker.errors.DockerException as e:
+                self._logger.error(
+                    "Error in bulk %s (container_id=%s): %s", action, container_id, e
+                )
+                return None
+            return container_id
+
+        workers = min(self._configuration.max_connections, len(container_ids))
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="DockerBulk"
+        ) as executor:
+            done = list(executor.map(apply, container_ids))
+
+        return [container_id for container_id in done if container_id is not None]
+
+    def rename_container(
+        self, container_id: str, name: str
+    ) -> "docker.models.containers.Container":
+        """
+        Rename a container.
+        """
+        try:
+            self._logger.debug(
+                "Renaming container (container_id=%s, name=%s)", container_id, name
+            )
+            container = self._client.containers.get(container_id)
+            container.rename(name)
+            self._containers.rename(container.id, name)
+            return container
+        except docker.errors.DockerException as e:
+            self._logger.error("Error renaming container: %s", e)
+            raise e
+
     def get_logs(self, container_id: str, tail: int = 100) -> str:
         """
         Get logs from a container.
@@ -106,23 +354,28 @@ class DockerService:
             )
             container = self._client.containers.get(container_id)
             logs = container.logs(tail=tail)
-            return logs.decode()
+            return logs.decode(errors="replace")
         except docker.errors.DockerException as e:
             self._logger.error("Error getting logs from container: %s", e)
             raise e
 
-    def pull_image(self, image: str) -> docker.models.images.Image:
+    def pull_image(
+        self, image: str, platform: Optional[str] = None
+    ) -> "docker.models.images.Image":
         """
         Pull an image.
         """
         try:
-            self._logger.debug("Pulling image (image=%s)", image)
-            return self._client.images.pull(image)
+            self._logger.debug("Pulling image (image=%s, platform=%s)", image, platform)
+            with self._metrics.span("image_pull"):
+                pulled = self._client.images.pull(image, platform=platform)
+            self._pulled_bytes.inc(pulled.attrs.get("Size") or 0)
+            return pulled
         except docker.errors.DockerException as e:
             self._logger.error("Error pulling image: %s", e)
             raise e
 
-    def build_image(self, path: str, tag: str) -> docker.models.images.Image:
+    def build_image(self, path: str, tag: str) -> "docker.models.images.Image":
         """
         Build an image.
         """
@@ -133,10 +386,309 @@ class DockerService:
             self._logger.error("Error building image: %s", e)
             raise e
 
-    def get_container(self, name: str) -> Optional[docker.models.containers.Container]:
+    def ensure_image(self, image: str, platform: Optional[str] = None) -> IndexedImage:
+        """
+        Make sure an image is present locally.
+
+        Images pulled less than `image_ttl` seconds ago are served from the
+        local index without contacting the daemon. The index starts with
+        the images present when first used. Concurrent calls for the same
+        image share a single pull.
+        """
+        entry = self._image_index.get(image, platform)
+        if entry is not None:
+            self._logger.debug("Image is fresh in index (image=%s)", image)
+            self._image_lookups.inc(result="fresh")
+            return entry
+
+        entry = self._index_local_image(image, platform)
+        if entry is not None:
+            self._logger.debug("Image is present locally (image=%s)", image)
+            self._image_lookups.inc(result="local")
+            return entry
+
+        self._image_lookups.inc(result="pulled")
+        return self._pulls.do((image, platform), self._pull_and_index, image, platform)
+
+    def _index_local_image(
+        self, image: str, platform: Optional[str]
+    ) -> Optional[IndexedImage]:
+        """
+        Index an image that was present when local images were listed.
+        """
+        if self._local_images is None:
+            with self._local_images_lock:
+                if self._local_images is None:
+                    self._local_images = self._list_local_images()
+
+        tag = image
+        if ":" not in tag.rsplit("/", 1)[-1] and "@" not in tag:
+            tag = f"{tag}:latest"
+        image_id = self._local_images.pop(tag, None)
+        if image_id is None:
+            return None
+
+        local_image = self.get_image(image_id)
+        if local_image is None:
+            return None
+
+        # Listed images carry no platform
+        attrs = local_image.attrs
+        if platform is not None and platform.split("/")[:2] != [
+            attrs.get("Os"),
+            attrs.get("Architecture"),
+        ]:
+            return None
+
+        return self._image_index.put(
+            image, platform, local_image.id, attrs.get("RepoDigests", [])
+        )
+
+    def _list_local_images(self) -> Dict[str, str]:
+        try:
+            images = self._client.api.images()
+        except docker.errors.DockerException as e:
+            self._logger.warning("Error listing local images: %s", e)
+            return {}
+
+        return {
+            tag: image["Id"]
+            for image in images
+            for tag in image.get("RepoTags") or []
+            if tag != "<none>:<none>"
+        }
+
+    def _pull_and_index(self, image: str, platform: Optional[str]) -> IndexedImage:
+        # A pull that finished just before this call started already indexed it
+        entry = self._image_index.get(image, platform)
+        if entry is not None:
+            return entry
+
+        pulled = self.pull_image(image, platform=platform)
+        return self._image_index.put(
+            image, platform, pulled.id, pulled.attrs.get("RepoDigests", [])
+        )
+
+    def get_image(self, image: str) -> Optional["docker.models.images.Image"]:
+        """
+        Get a local image by name or id.
+        """
+        try:
+            return self._client.images.get(image)
+        except docker.errors.DockerException:
+            return None
+
+    def remove_image(self, image: str, force: bool = False) -> None:
+        """
+        Remove an image.
+        """
+        try:
+            self._logger.debug("Removing image (image=%s, force=%s)", image, force)
+            self._client.images.remove(image, force=force)
+            self._image_index.invalidate(image)
+        except docker.errors.DockerException as e:
+            self._logger.error("Error removing image: %s", e)
+            raise e
+
+    def tag_image(self, image: str, repository: str, tag: str) -> None:
+        """
+        Tag an image.
+        """
+        try:
+            self._logger.debug(
+                "Tagging image (image=%s, repository=%s, tag=%s)", image, repository, tag
+            )
+            self._client.images.get(image).tag(repository, tag=tag)
+        except docker.errors.DockerException as e:
+            self._logger.error("Error tagging image: %s", e)
+            raise e
+
+    def exec_in_container(
+        self,
+        container_id: str,
+        command: str,
+        environment: Optional[Dict[str, Any]] = None,
+        output: Optional[Callable[[str], None]] = None,
+    ) -> Tuple[int, str]:
+        """
+        Execute a command in a running container.
+
+        With `output`, it is called with each line of output as the
+        command produces it.
+
+        Returns:
+            Exit code and combined output of the command
+        """
+        try:
+            self._logger.debug(
+                "Executing in container (container_id=%s, command=%s)",
+                container_id,
+                command,
+            )
+            with self._metrics.span("exec"):
+                if output is not None:
+                    return self._exec_streaming(
+                        container_id, command, environment, output
+                    )
+
+                container = self._client.containers.get(container_id)
+                exit_code, result = container.exec_run(
+                    command, environment=environment
+                )
+            return exit_code, result.decode(errors="replace")
+        except docker.errors.DockerException as e:
+            self._logger.error("Error executing in container: %s", e)
+            raise e
+
+    def _exec_streaming(
+        self,
+        container_id: str,
+        command: str,
+        environment: Optional[Dict[str, Any]],
+        output: Callable[[str], None],
+    ) -> Tuple[int, str]:
+        """
+        Run an exec, passing complete lines to `output` as they arrive.
+        """
+        api = self._client.api
+        exec_id = api.exec_create(
+            container_id, command, environment=environment
+        )["Id"]
+
+        # Chunks may end inside a multi-byte character or a line
+        decoder = LineDecoder()
+        lines = []
+
+        for chunk in api.exec_start(exec_id, stream=True):
+            for line in decoder.feed(chunk):
+                output(line)
+                lines.append(line)
+
+        for line in decoder.flush():
+            output(line)
+            lines.append(line)
+
+        return api.exec_inspect(exec_id)["ExitCode"], "\n".join(lines)
+
+    def put_archive(self, container_id: str, path: str, data: bytes) -> None:
+        """
+        Extract a tar archive into a directory of a container.
+        """
+        try:
+            self._logger.debug(
+                "Copying archive to container (container_id=%s, path=%s)",
+                container_id,
+                path,
+            )
+            container = self._client.containers.get(container_id)
+            container.put_archive(path, data)
+        except docker.errors.DockerException as e:
+            self._logger.error("Error copying archive to container: %s", e)
+            raise e
+
+    def export_container(
+        self, container_id: str, chunk_size: int = 1024 * 1024
+    ) -> Iterator[bytes]:
+        """
+        Stream a container's filesystem as a tar archive.
+        """
+        try:
+            self._logger.debug("Exporting container (container_id=%s)", container_id)
+            container = self._client.containers.get(container_id)
+            return self._count_exported(container.export(chunk_size=chunk_size))
+        except docker.errors.DockerException as e:
+            self._logger.error("Error exporting container: %s", e)
+            raise e
+
+    def _count_exported(self, stream: Iterator[bytes]) -> Iterator[bytes]:
+        for chunk in stream:
+            self._exported_bytes.inc(len(chunk))
+            yield chunk
+
+    def commit_container(
+        self,
+        container_id: str,
+        repository: str,
+        tag: str,
+        labels: Optional[Dict[str, str]] = None,
+    ) -> "docker.models.images.Image":
+        """
+        Commit a container to an image.
+        """
+        try:
+            self._logger.debug(
+                "Committing container (container_id=%s, repository=%s, tag=%s)",
+                container_id,
+                repository,
+                tag,
+            )
+            container = self._client.containers.get(container_id)
+            with self._metrics.span("commit"):
+                return container.commit(
+                    repository=repository, tag=tag, conf={"Labels": labels or {}}
+                )
+        except docker.errors.DockerException as e:
+            self._logger.error("Error committing container: %s", e)
+            raise e
+
+    def squash_container(
+        self,
+        container_id: str,
+        repository: str,
+        tag: str,
+        labels: Optional[Dict[str, str]] = None,
+    ) -> str:
+        """
+        Store a container's filesystem as a single-layer image.
+
+        The container's config carries over as with a commit, but the
+        image shares no layers with the one the container started from.
+
+        Returns:
+            Image id
+        """
+        try:
+            self._logger.debug(
+                "Squashing container (container_id=%s, repository=%s, tag=%s)",
+                container_id,
+                repository,
+                tag,
+            )
+            container = self._client.containers.get(container_id)
+            changes = _config_changes(container.attrs["Config"], labels)
+
+            # The export streams into the import without touching disk
+            with self._metrics.span("squash"):
+                result = self._client.api.import_image_from_stream(
+                    self._count_exported(container.export()),
+                    repository=repository,
+                    tag=tag,
+                    changes=changes,
+                )
+            messages = [json.loads(line) for line in result.strip().splitlines()]
+            for message in messages:
+                if "error" in message or "errorDetail" in message:
+                    raise docker.errors.DockerException(
+                        (message.get("errorDetail") or {}).get("message")
+                        or message.get("error")
+                    )
+            return messages[-1]["status"]
+        except docker.errors.DockerException as e:
+            self._logger.error("Error squashing container: %s", e)
+            raise e
+
+    def get_container(
+        self, name: str
+    ) -> Optional["docker.models.containers.Container"]:
         """
         Get a container by name.
+
+        Containers missing from the index are reported without a round trip.
         """
+        index = self._container_index()
+        if index is not None and index.get(name) is None:
+            return None
+
         try:
             return self._client.containers.get(name)
         except docker.errors.DockerException:
@@ -146,8 +698,92 @@ class DockerService:
         """
         Check if a container with the given name exists.
         """
+        index = self._container_index()
+        if index is not None:
+            return index.get(name) is not None
+
         try:
             self._client.containers.get(name)
             return True
         except docker.errors.DockerException:
             return False
+
+    def container_status(self, name: str) -> Optional[str]:
+        """
+        Get the status of a container, None if it does not exist.
+        """
+        index = self._container_index()
+        if index is not None:
+            entry = index.get(name)
+            return entry.status if entry is not None else None
+
+        container = self.get_container(name)
+        return container.status if container is not None else None
+
+    def stop_watching(self) -> None:
+        """
+        Stop following container events; lookups go to the daemon again.
+        """
+        self._watch_stopped.set()
+        stream = self._event_stream
+        if stream is not None:
+            stream.close()
+        if self._watcher is not None:
+            self._watcher.join()
+
+    def _container_index(self) -> Optional[ContainerIndex]:
+        """
+        Container index, None while it is not in sync with the daemon.
+
+        The first call starts following the event stream.
+        """
+        if not self._configuration.watch_containers:
+            return None
+
+        if self._watcher is None:
+            with self._client_lock:
+                if self._watcher is None:
+                    self._watcher = threading.Thread(
+                        target=self._watch_containers,
+                        name="DockerEvents",
+                        daemon=True,
+                    )
+                    self._watcher.start()
+
+        return self._containers if self._containers.ready else None
+
+    def _watch_containers(self) -> None:
+        """
+        Keep the container index current, reseeding after every reconnect.
+        """
+        delay = 0.5
+
+        while not self._watch_stopped.is_set():
+            try:
+                # Subscribe before listing so no change in between is missed
+                self._event_stream = self._client.events(
+                    decode=True, filters={"type": "container"}
+                )
+                self._containers.seed(self._client.api.containers(all=True))
+                self._logger.debug(
+                    "Container index seeded (containers=%s)", len(self._containers)
+                )
+                delay = 0.5
+
+                for event in self._event_stream:
+                    self._containers.apply(event)
+
+                if not self._watch_stopped.is_set():
+                    self._logger.warning("Docker event stream ended")
+            except Exception as e:
+                if not self._watch_stopped.is_set():
+                    self._logger.warning("Docker event stream lost: %s", e)
+            finally:
+                self._containers.invalidate()
+                if self._event_stream is not None:
+                    self._event_stream.close()
+                    self._event_stream = None
+
+            if self._watch_stopped.wait(delay):
+                return
+            delay = min(delay * 2, 30.0)
@@ -0,0 +1,423 @@
+"""
+Module for talking to the Docker Engine API over asyncio.
+"""
+
+# Imports from standard library
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+# Imports from local modules
+from app.services.docker_service.exceptions import (
+    DockerEngineConnectionError,
+    DockerEngineError,
+    DockerEngineNotFoundError,
+)
+
+
+_MAX_LINE = 64 * 1024
+_READ_SIZE = 64 * 1024
+
+# Methods resent after a reused connection fails mid-request
+_IDEMPOTENT_METHODS = ("GET", "HEAD")
+
+
+class _Connection:
+    """
+    Keep-alive connection to the engine.
+
+    Dedicated connections serve a single long-lived stream and are neither
+    pooled nor counted against `max_connections`.
+    """
+
+    def __init__(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        dedicated: bool = False,
+    ):
+        self.reader = reader
+        self.writer = writer
+        self.reused = False
+        self.dedicated = dedicated
+
+    @property
+    def closed(self) -> bool:
+        return self.writer.is_closing() or self.reader.at_eof()
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class EngineResponse:
+    """
+    Response of the engine with a body that is read lazily.
+    """
+
+    def __init__(
+        self,
+        client: "EngineClient",
+        connection: _Connection,
+        status: int,
+        reason: str,
+        headers: Dict[str, str],
+        has_body: bool,
+    ):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+
+        self._client = client
+        self._connection = connection
+        self._released = False
+        self._reusable = headers.get("connection", "").lower() != "close"
+
+        # Only a fully read body leaves the connection ready for reuse
+        self._complete = not has_body
+
+        if not has_body:
+            self._remaining: Optional[int] = 0
+            self._chunked = False
+        elif "chunked" in headers.get("transfer-encoding", "").lower():
+            self._remaining = None
+            self._chunked = True
+        elif "content-length" in headers:
+            self._remaining = int(headers["content-length"])
+            self._chunked = False
+        else:
+            # Body runs until the engine closes the connection
+            self._remaining = None
+            self._chunked = False
+            self._reusable = False
+
+    @property
+    def content_type(self) -> str:
+        return self.headers.get("content-type", "")
+
+    async def iter_chunks(self) -> AsyncIterator[bytes]:
+        """
+        Yield the body as it arrives.
+        """
+        reader = self._connection.reader
+
+        try:
+            if self._chunked:
+                while True:
+                    size_line = await reader.readline()
+                    if not size_line:
+                        raise DockerEngineConnectionError("Connection closed mid-body")
+
+                    size = int(size_line.split(b";", 1)[0].strip(), 16)
+                    if size == 0:
+                        # Skip trailers up to the terminating empty line
+                        while (await reader.readline()).strip():
+                            pass
+                        break
+
+                    remaining = size
+                    while remaining:
+                        data = await reader.read(min(remaining, _READ_SIZE))
+                        if not data:
+                            raise DockerEngineConnectionError(
+                                "Connection closed mid-chunk"
+                            )
+                        remaining -= len(data)
+                        yield data
+                    await reader.readexactly(2)
+
+            elif self._remaining is not None:
+                while self._remaining:
+                    data = await reader.read(min(self._remaining, _READ_SIZE))
+                    if not data:
+                        raise DockerEngineConnectionError("Connection closed mid-body")
+                    self._remaining -= len(data)
+                    yield data
+
+            else:
+                while True:
+                    data = await reader.read(_READ_SIZE)
+                    if not data:
+                        break
+                    yield data
+
+            self._complete = True
+        finally:
+            self.release()
+
+    async def read(self) -> bytes:
+        """
+        Read the full body.
+        """
+        return b"".join([chunk async for chunk in self.iter_chunks()])
+
+    async def json(self) -> Any:
+        """
+        Read the full body as JSON.
+        """
+        body = await self.read()
+        return json.loads(body) if body else None
+
+    def release(self) -> None:
+        """
+        Return the connection to the pool, or close it if it cannot be reused.
+        """
+        if self._released:
+            return
+        self._released = True
+        self._client._release(self._connection, self._reusable and self._complete)
+
+    async def raise_for_status(self) -> None:
+        """
+        Raise DockerEngineError for error statuses, consuming the body.
+        """
+        if self.status < 400:
+            return
+
+        body = await self.read()
+        try:
+            message = json.loads(body).get("message", "")
+        except (ValueError, AttributeError):
+            message = body.decode(errors="replace")
+
+        if self.status == 404:
+            raise DockerEngineNotFoundError(self.status, message or self.reason)
+        raise DockerEngineError(self.status, message or self.reason)
+
+
+class EngineClient:
+    """
+    Minimal asyncio HTTP/1.1 client for the Docker Engine API.
+
+    Connections are kept alive and pooled; at most `max_connections`
+    requests are in flight at once. Requests that stream for as long as a
+    container runs, like followed logs, should be sent `dedicated` so they
+    do not starve the pool.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        version: str,
+        timeout: float,
+        max_connections: int = 32,
+    ):
+        self._base_url = base_url
+        self._prefix = f"/v{version}" if version and version != "auto" else ""
+        self._timeout = timeout
+        self._max_connections = max_connections
+
+        self._idle: List[_Connection] = []
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._closed = False
+
+    async def close(self) -> None:
+        """
+        Close every idle connection.
+        """
+        self._closed = True
+        idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+    @asynccontextmanager
+    async def stream(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        body: Any = None,
+        headers: Optional[Dict[str, str]] = None,
+        dedicated: bool = False,
+    ) -> AsyncIterator[EngineResponse]:
+        """
+        Send a request and yield the response with its body unread.
+
+        Raises:
+            DockerEngineError: If the engine answers with an error status
+        """
+        response = await self.request(method, path, params, body, headers, dedicated)
+        try:
+            await response.raise_for_status()
+            yield response
+        finally:
+            response.release()
+
+    async def call(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        body: Any = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Any:
+        """
+        Send a request and return the decoded body.
+
+        Returns:
+            Parsed JSON for JSON responses, raw bytes otherwise
+
+        Raises:
+            DockerEngineError: If the engine answers with an error status
+        """
+        async with self.stream(method, path, params, body, headers) as response:
+            if response.content_type.startswith("application/json"):
+                return await response.json()
+            return await response.read()
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        body: Any = None,
+        headers: Optional[Dict[str, str]] = None,
+        dedicated: bool = False,
+    ) -> EngineResponse:
+        """
+        Send a request and return the response once its headers arrive.
+
+        The caller must consume the body or release the response.
+        """
+        payload, request_headers = self._encode_body(body, headers)
+        target = self._prefix + path
+        if params:
+            query = {
+                key: self._encode_param(value)
+                for key, value in params.items()
+                if value is not None
+            }
+            target = f"{target}?{urlencode(query)}"
+
+        head = [f"{method} {target} HTTP/1.1", "Host: docker"]
+        head += [f"{key}: {value}" for key, value in request_headers.items()]
+        if payload is not None or method in ("POST", "PUT"):
+            head.append(f"Content-Length: {len(payload or b'')}")
+        message = ("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + (payload or b"")
+
+        # A pooled connection may have been closed by the engine while idle.
+        # Requests the engine may already have acted on are only resent if
+        # they are safe to repeat.
+        for attempt in range(2):
+            connection = await self._acquire(dedicated)
+            sent = False
+            try:
+                connection.writer.write(message)
+                await connection.writer.drain()
+                sent = True
+                status, reason, response_headers = await asyncio.wait_for(
+                    self._read_head(connection.reader), self._timeout
+                )
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                self._release(connection, reusable=False)
+                retry = not sent or method in _IDEMPOTENT_METHODS
+                if connection.reused and attempt == 0 and retry:
+                    continue
+                raise DockerEngineConnectionError(str(e)) from e
+            except BaseException:
+                self._release(connection, reusable=False)
+                raise
+
+            has_body = method != "HEAD" and status not in (204, 304) and status >= 200
+            return EngineResponse(
+                self, connection, status, reason, response_headers, has_body
+            )
+
+        raise DockerEngineConnectionError("Unreachable")
+
+    async def _acquire(self, dedicated: bool = False) -> _Connection:
+        if dedicated:
+            try:
+                reader, writer = await asyncio.wait_for(self._open(), self._timeout)
+            except (OSError, asyncio.TimeoutError) as e:
+                raise DockerEngineConnectionError(
+                    f"Cannot connect to {self._base_url}: {e}"
+                ) from e
+            return _Connection(reader, writer, dedicated=True)
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_connections)
+        await self._semaphore.acquire()
+
+        while self._idle:
+            connection = self._idle.pop()
+            if not connection.closed:
+                connection.reused = True
+                return connection
+            connection.close()
+
+        try:
+            reader, writer = await asyncio.wait_for(self._open(), self._timeout)
+        except BaseException as e:
+            self._semaphore.release()
+            if isinstance(e, (OSError, asyncio.TimeoutError)):
+                raise DockerEngineConnectionError(
+                    f"Cannot connect to {self._base_url}: {e}"
+                ) from e
+            raise
+
+        return _Connection(reader, writer)
+
+    def _release(self, connection: _Connection, reusable: bool) -> None:
+        if connection.dedicated:
+            connection.close()
+            return
+
+        if reusable and not self._closed and not connection.closed:
+            self._idle.append(connection)
+        else:
+            connection.close()
+        self._semaphore.release()
+
+    async def _open(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        url = urlsplit(self._base_url)
+
+        if url.scheme in ("unix", "http+unix"):
+            path = "/" + self._base_url.split("://", 1)[1].lstrip("/")
+            return await asyncio.open_unix_connection(path, limit=_MAX_LINE)
+
+        if url.scheme in ("tcp", "http"):
+            return await asyncio.open_connection(
+                url.hostname, url.port or 2375, limit=_MAX_LINE
+            )
+
+        raise DockerEngineConnectionError(f"Unsupported base_url {self._base_url}")
+
+    @staticmethod
+    async def _read_head(
+        reader: asyncio.StreamReader,
+    ) -> Tuple[int, str, Dict[str, str]]:
+        status_line = await reader.readline()
+        if not status_line:
+            raise asyncio.IncompleteReadError(b"", None)
+
+        _, status, *reason = status_line.decode("latin-1").strip().split(" ", 2)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if not line.strip():
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+
+        return int(status), (reason[0] if reason else ""), headers
+
+    @staticmethod
+    def _encode_body(
+        body: Any, headers: Optional[Dict[str, str]]
+    ) -> Tuple[Optional[bytes], Dict[str, str]]:
+        request_headers = dict(headers or {})
+        if body is None or isinstance(body, bytes):
+            return body, request_headers
+
+        request_headers.setdefault("Content-Type", "application/json")
+        return json.dumps(body).encode("utf-8"), request_headers
+
+    @staticmethod
+    def _encode_param(value: Any) -> str:
+        if isinstance(value, bool):
+            return "1" if value else "0"
+        if isinstance(value, (dict, list)):
+            return json.dumps(value)
+        return str(value)
@@ -0,0 +1,29 @@
+"""
+Module for Docker service exceptions.
+"""
+
+
+class DockerEngineError(Exception):
+    """
+    Exception for Docker Engine API error.
+    """
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+        self.message = message
+
+
+class DockerEngineNotFoundError(DockerEngineError):
+    """
+    Exception for Docker Engine API object not found.
+    """
+
+
+class DockerEngineConnectionError(DockerEngineError):
+    """
+    Exception for Docker Engine API connection failure.
+    """
+
+    def __init__(self, message: str):
+        super().__init__(0, message)
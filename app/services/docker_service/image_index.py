@@ -0,0 +1,76 @@
+"""
+Module for indexing local images.
+"""
+
+# Imports from standard library
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+
+@dataclass
+class IndexedImage:
+    """
+    Local image known to be present.
+    """
+
+    image: str
+    platform: Optional[str]
+    image_id: str
+    digests: List[str] = field(default_factory=list)
+    refreshed_at: float = field(default_factory=time.monotonic)
+
+
+class ImageIndex:
+    """
+    In-memory index of local images by reference and platform.
+
+    Entries younger than `ttl` seconds are fresh: the image is assumed
+    present and up to date without asking the daemon or the registry.
+    """
+
+    def __init__(self, ttl: float):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, Optional[str]], IndexedImage] = {}
+
+    def get(self, image: str, platform: Optional[str] = None) -> Optional[IndexedImage]:
+        """
+        Get a fresh entry for an image.
+        """
+        with self._lock:
+            entry = self._entries.get((image, platform))
+            if entry is None:
+                return None
+            if time.monotonic() - entry.refreshed_at > self._ttl:
+                return None
+            return entry
+
+    def put(
+        self,
+        image: str,
+        platform: Optional[str],
+        image_id: str,
+        digests: Optional[List[str]] = None,
+    ) -> IndexedImage:
+        """
+        Record an image as present now.
+        """
+        entry = IndexedImage(
+            image=image, platform=platform, image_id=image_id, digests=digests or []
+        )
+        with self._lock:
+            self._entries[(image, platform)] = entry
+        return entry
+
+    def invalidate(self, image: str) -> None:
+        """
+        Drop entries matching an image reference or id.
+        """
+        with self._lock:
+            self._entries = {
+                key: entry
+                for key, entry in self._entries.items()
+                if image not in (entry.image, entry.image_id)
+            }
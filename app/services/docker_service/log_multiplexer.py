@@ -0,0 +1,154 @@
+"""
+Module for following the logs of many containers at once.
+"""
+
+# Imports from standard library
+import asyncio
+from typing import TYPE_CHECKING, Dict, List, Optional, Union
+
+# Imports from local modules
+from app.services.docker_service.models import LogLine
+
+
+if TYPE_CHECKING:
+
+    # Imports from standard library
+    import logging
+
+    # Imports from local modules
+    from app.services.docker_service.async_docker_service import AsyncDockerService
+
+
+_CLOSED = object()
+
+
+class LogMultiplexer:
+    """
+    Follows the logs of many containers into one consumer.
+
+    Every container is read by a task of its own into one queue holding
+    at most `max_buffered` lines. While the consumer lags, readers wait on
+    the full queue and stop reading their streams, so TCP flow control
+    throttles the daemon instead of memory growing. A reader ends when its
+    container stops or its stream fails, which is logged. Iteration ends
+    once no container is followed and the buffered lines are consumed.
+
+    Usage:
+        async with LogMultiplexer(logger, docker) as logs:
+            logs.add("builder_1")
+            logs.add("builder_2")
+            async for line in logs:
+                ...
+    """
+
+    def __init__(
+        self,
+        logger: "logging.Logger",
+        docker_service: "AsyncDockerService",
+        max_buffered: int = 1000,
+    ):
+        self._logger = logger.getChild("LogMultiplexer")
+        self._docker_service = docker_service
+        self._queue: "asyncio.Queue" = asyncio.Queue(max_buffered)
+        self._readers: Dict[str, asyncio.Task] = {}
+        self._closed = False
+
+    @property
+    def containers(self) -> List[str]:
+        """
+        Containers being followed.
+        """
+        return list(self._readers)
+
+    @property
+    def buffered(self) -> int:
+        return self._queue.qsize()
+
+    def add(
+        self,
+        container_id: str,
+        tail: Union[int, str] = 0,
+        since: Optional[float] = None,
+    ) -> None:
+        """
+        Start following a container; one already followed is left as is.
+        """
+        if self._closed:
+            raise RuntimeError("LogMultiplexer is closed")
+        if container_id in self._readers:
+            return
+
+        self._readers[container_id] = asyncio.get_running_loop().create_task(
+            self._read(container_id, tail, since), name=f"Logs-{container_id}"
+        )
+
+    def remove(self, container_id: str) -> None:
+        """
+        Stop following a container.
+        """
+        reader = self._readers.pop(container_id, None)
+        if reader is not None:
+            reader.cancel()
+
+    async def close(self) -> None:
+        """
+        Stop every reader; iteration ends once buffered lines are consumed.
+        """
+        self._closed = True
+        readers = list(self._readers.values())
+        self._readers.clear()
+
+        for reader in readers:
+            reader.cancel()
+        await asyncio.gather(*readers, return_exceptions=True)
+
+        # With a full queue the consumer is busy and sees `_closed` later
+        try:
+            self._queue.put_nowait(_CLOSED)
+        except asyncio.QueueFull:
+            pass
+
+    async def __aenter__(self) -> "LogMultiplexer":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    def __aiter__(self) -> "LogMultiplexer":
+        return self
+
+    async def __anext__(self) -> LogLine:
+        while True:
+            if self._queue.empty() and (self._closed or not self._readers):
+                raise StopAsyncIteration
+
+            line = await self._queue.get()
+            # Otherwise the wakeup is stale, containers were added since
+            if line is not _CLOSED:
+                return line
+
+    async def _read(
+        self, container_id: str, tail: Union[int, str], since: Optional[float]
+    ) -> None:
+        stream = self._docker_service.follow_logs(container_id, tail=tail, since=since)
+        try:
+            async for line in stream:
+                await self._queue.put(line)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._logger.warning(
+                "Stopped following logs (container_id=%s): %s", container_id, e
+            )
+        finally:
+            # Closes the connection now rather than when garbage collected
+            await stream.aclose()
+            if self._readers.get(container_id) is asyncio.current_task():
+                del self._readers[container_id]
+
+            # Wakes the consumer up to end the iteration
+            if not self._readers:
+                try:
+                    self._queue.put_nowait(_CLOSED)
+                except asyncio.QueueFull:
+                    pass
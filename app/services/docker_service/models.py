@@ -15,3 +15,17 @@ class DockerServiceConfig:
     base_url: str
     version: str
     timeout: int
+    max_connections: int = 32
+    image_ttl: int = 300
+    watch_containers: bool = True
+
+
+@dataclass(frozen=True)
+class LogLine:
+    """
+    Line of container output; `stream` is "stdout" or "stderr".
+    """
+
+    container_id: str
+    stream: str
+    text: str
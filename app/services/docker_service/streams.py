@@ -0,0 +1,141 @@
+"""
+Module for decoding Docker stream formats.
+"""
+
+# Imports from standard library
+import codecs
+import json
+import struct
+from typing import Any, Dict, List, Tuple
+
+
+STREAM_STDIN = 0
+STREAM_STDOUT = 1
+STREAM_STDERR = 2
+
+STREAM_NAMES = {STREAM_STDIN: "stdin", STREAM_STDOUT: "stdout", STREAM_STDERR: "stderr"}
+
+MULTIPLEXED_CONTENT_TYPE = "application/vnd.docker.multiplexed-stream"
+
+_HEADER = struct.Struct(">BxxxL")
+
+
+class FrameDecoder:
+    """
+    Incremental decoder for multiplexed stdout/stderr streams.
+
+    Each frame is an 8 byte header with the stream id and payload length
+    followed by the payload. Data may be fed in arbitrary pieces.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> List[Tuple[int, bytes]]:
+        """
+        Add data and return every frame it completes as (stream, payload).
+        """
+        self._buffer += data
+        frames = []
+
+        while len(self._buffer) >= _HEADER.size:
+            stream, length = _HEADER.unpack_from(self._buffer)
+            end = _HEADER.size + length
+            if len(self._buffer) < end:
+                break
+
+            frames.append((stream, bytes(self._buffer[_HEADER.size : end])))
+            del self._buffer[:end]
+
+        return frames
+
+    @property
+    def pending(self) -> int:
+        """
+        Number of buffered bytes not yet forming a full frame.
+        """
+        return len(self._buffer)
+
+
+class LineDecoder:
+    """
+    Incremental UTF-8 decoder splitting a byte stream into lines.
+
+    Characters and lines cut across pieces are held back until they are
+    complete. Invalid bytes become U+FFFD, and the newline and a carriage
+    return before it are dropped. A line growing past `max_line`
+    characters without a newline, e.g. a progress bar redrawn with bare
+    carriage returns, is returned in pieces of `max_line`.
+    """
+
+    def __init__(self, max_line: int = 65536):
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._max_line = max_line
+        self._parts: List[str] = []
+        self._size = 0
+
+    def feed(self, data: bytes) -> List[str]:
+        """
+        Add data and return every line it completes.
+        """
+        text = self._decoder.decode(data)
+        if "\n" not in text:
+            # Parts are joined once, so long unterminated lines stay linear
+            if text:
+                self._parts.append(text)
+                self._size += len(text)
+            return self._split_long()
+
+        first, *rest = text.split("\n")
+        self._parts.append(first)
+        lines = ["".join(self._parts), *rest[:-1]]
+        self._parts = [rest[-1]] if rest[-1] else []
+        self._size = len(rest[-1])
+        lines = [line[:-1] if line.endswith("\r") else line for line in lines]
+        return lines + self._split_long()
+
+    def flush(self) -> List[str]:
+        """
+        Return the trailing line if the stream did not end with a newline.
+        """
+        self._parts.append(self._decoder.decode(b"", final=True))
+        line, self._parts, self._size = "".join(self._parts), [], 0
+        return [line] if line else []
+
+    def _split_long(self) -> List[str]:
+        """
+        Return the held back line in pieces of `max_line` once it is that long.
+        """
+        if self._size < self._max_line:
+            return []
+
+        text = "".join(self._parts)
+        cut = len(text) - len(text) % self._max_line
+        rest = text[cut:]
+        self._parts = [rest] if rest else []
+        self._size = len(rest)
+        return [text[i : i + self._max_line] for i in range(0, cut, self._max_line)]
+
+
+class JSONLinesDecoder:
+    """
+    Incremental decoder for newline separated JSON progress streams.
+    """
+
+    def __init__(self):
+        self._buffer = b""
+
+    def feed(self, data: bytes) -> List[Dict[str, Any]]:
+        """
+        Add data and return every JSON object it completes.
+        """
+        self._buffer += data
+        *lines, self._buffer = self._buffer.split(b"\n")
+        return [json.loads(line) for line in lines if line.strip()]
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """
+        Return the trailing object if the stream did not end with a newline.
+        """
+        data, self._buffer = self._buffer, b""
+        return [json.loads(data)] if data.strip() else []
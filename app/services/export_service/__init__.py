@@ -0,0 +1,11 @@
+from .export_service import ExportService
+from .models import ExportConfig, ExportResult
+from .exceptions import ExportError, ExportFormatNotSupportedError
+
+__all__ = [
+    "ExportService",
+    "ExportConfig",
+    "ExportResult",
+    "ExportError",
+    "ExportFormatNotSupportedError",
+]
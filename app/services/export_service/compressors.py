@@ -0,0 +1,144 @@
+"""
+Module for multi-threaded streaming compressors.
+"""
+
+# Imports from standard library
+import gzip
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO
+
+# Imports from local modules
+from app.services.export_service.exceptions import ExportFormatNotSupportedError
+
+
+# Try enable zstd compression
+try:
+    import zstandard
+
+    ZSTD_INSTALLED = True
+except ImportError:
+    ZSTD_INSTALLED = False
+
+
+EXTENSIONS = {"zstd": ".tar.zst", "gzip": ".tar.gz", "none": ".tar"}
+
+
+class _PlainWriter:
+    """
+    Writer passing data through uncompressed.
+    """
+
+    def __init__(self, fileobj: BinaryIO):
+        self._fileobj = fileobj
+
+    def write(self, data: bytes) -> None:
+        self._fileobj.write(data)
+
+    def close(self) -> None:
+        self._fileobj.flush()
+
+
+class ParallelGzipWriter:
+    """
+    Gzip writer compressing blocks on several cores.
+
+    Each block becomes its own gzip member; concatenated members are a
+    valid gzip file. At most two blocks per thread are held in memory.
+    """
+
+    def __init__(
+        self, fileobj: BinaryIO, level: int, threads: int, block_size: int
+    ):
+        self._fileobj = fileobj
+        self._level = level
+        self._block_size = block_size
+        self._max_pending = threads * 2
+        self._executor = ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix="ParallelGzip"
+        )
+        self._pending = deque()
+        self._buffer = bytearray()
+        self._blocks = 0
+
+    def write(self, data: bytes) -> None:
+        self._buffer += data
+        while len(self._buffer) >= self._block_size:
+            self._submit(bytes(self._buffer[: self._block_size]))
+            del self._buffer[: self._block_size]
+
+    def close(self) -> None:
+        try:
+            if self._buffer or not self._blocks:
+                self._submit(bytes(self._buffer))
+                self._buffer.clear()
+
+            while self._pending:
+                self._fileobj.write(self._pending.popleft().result())
+            self._fileobj.flush()
+        finally:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _submit(self, block: bytes) -> None:
+        self._pending.append(
+            self._executor.submit(gzip.compress, block, self._level, mtime=0)
+        )
+        self._blocks += 1
+
+        # Write finished blocks in order to keep memory bounded
+        while len(self._pending) > self._max_pending:
+            self._fileobj.write(self._pending.popleft().result())
+
+
+class ZstdWriter:
+    """
+    Zstandard writer using the library's worker threads.
+    """
+
+    def __init__(self, fileobj: BinaryIO, level: int, threads: int):
+        compressor = zstandard.ZstdCompressor(level=level, threads=threads)
+        self._writer = compressor.stream_writer(fileobj, closefd=False)
+
+    def write(self, data: bytes) -> None:
+        self._writer.write(data)
+
+    def close(self) -> None:
+        # Ends the frame, the underlying file stays open
+        self._writer.close()
+
+
+def open_compressor(
+    format: str,
+    fileobj: BinaryIO,
+    level: int,
+    threads: int = 0,
+    block_size: int = 4 * 1024 * 1024,
+):
+    """
+    Get a streaming compressor writing to a file.
+
+    Args:
+        format: "zstd", "gzip" or "none"
+        threads: Compression threads, 0 for every CPU core
+
+    Raises:
+        ExportFormatNotSupportedError: If the format is unknown or its
+            library is not installed
+    """
+    threads = threads or os.cpu_count() or 1
+
+    if format == "zstd":
+        if not ZSTD_INSTALLED:
+            raise ExportFormatNotSupportedError(
+                "zstd export requires the zstandard package"
+            )
+        return ZstdWriter(fileobj, level, threads)
+
+    if format == "gzip":
+        return ParallelGzipWriter(fileobj, level, threads, block_size)
+
+    if format == "none":
+        return _PlainWriter(fileobj)
+
+    raise ExportFormatNotSupportedError(f"Export format {format} not supported")
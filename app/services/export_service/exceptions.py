@@ -0,0 +1,15 @@
+"""
+Module for export service exceptions.
+"""
+
+
+class ExportError(Exception):
+    """
+    Exception for export error.
+    """
+
+
+class ExportFormatNotSupportedError(ExportError):
+    """
+    Exception for export format not supported.
+    """
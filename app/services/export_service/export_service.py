@@ -0,0 +1,136 @@
+"""
+Module for exporting built OS root filesystems.
+"""
+
+# Imports from standard library
+import os
+import tempfile
+import time
+from typing import TYPE_CHECKING, Iterable, Optional
+
+# Imports from local modules
+from app.services.export_service.compressors import EXTENSIONS, open_compressor
+from app.services.export_service.models import ExportConfig, ExportResult
+
+
+if TYPE_CHECKING:
+
+    # Imports from standard library
+    import logging
+
+    # Imports from local modules
+    from app.services.docker_service.docker_service import DockerService
+
+
+class ExportService:
+    """
+    Service for exporting container filesystems to compressed tarballs.
+
+    The export is streamed in `chunk_size` pieces straight into the
+    compressor and written to a temp file that is renamed into place once
+    complete, so memory use does not grow with the image size.
+    """
+
+    def __init__(
+        self,
+        logger: "logging.Logger",
+        docker_service: "DockerService",
+        configuration: ExportConfig,
+    ):
+        self._logger = logger.getChild("ExportService")
+        self._docker_service = docker_service
+        self._configuration = configuration
+
+        self._logger.debug("ExportConfig: %s", self._configuration)
+
+        self._logger.info("ExportService initialized")
+
+    def export_container(
+        self, container_id: str, name: str, format: Optional[str] = None
+    ) -> ExportResult:
+        """
+        Export a container's filesystem.
+
+        Args:
+            container_id: Container to export
+            name: Artifact name, the extension is added from the format
+            format: "zstd", "gzip" or "none", defaults to the configured one
+
+        Returns:
+            Exported artifact
+        """
+        self._logger.info(
+            "Exporting container (container_id=%s, name=%s)", container_id, name
+        )
+        chunks = self._docker_service.export_container(
+            container_id, chunk_size=self._configuration.chunk_size
+        )
+        return self.write_artifact(chunks, name, format)
+
+    def write_artifact(
+        self, chunks: Iterable[bytes], name: str, format: Optional[str] = None
+    ) -> ExportResult:
+        """
+        Compress a stream of tar data into an artifact file atomically.
+        """
+        format = format or self._configuration.format
+        output_path = self._configuration.output_path
+        path = os.path.join(output_path, f"{name}{EXTENSIONS.get(format, '')}")
+
+        os.makedirs(output_path, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(
+            dir=output_path, prefix=f".{name}.", suffix=".tmp"
+        )
+
+        started = time.monotonic()
+        bytes_in = 0
+
+        try:
+            with os.fdopen(fd, "wb") as f:
+                writer = open_compressor(
+                    format,
+                    f,
+                    level=self._configuration.level,
+                    threads=self._configuration.threads,
+                    block_size=self._configuration.block_size,
+                )
+                try:
+                    for chunk in chunks:
+                        bytes_in += len(chunk)
+                        writer.write(chunk)
+                finally:
+                    writer.close()
+
+                f.flush()
+                os.fsync(f.fileno())
+
+            os.replace(tmp_path, path)
+            self._fsync_directory(output_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        result = ExportResult(
+            path=path,
+            format=format,
+            bytes_in=bytes_in,
+            bytes_out=os.path.getsize(path),
+            duration=time.monotonic() - started,
+        )
+        self._logger.info(
+            "Exported %s (in=%s, out=%s, %.1fs)",
+            result.path,
+            result.bytes_in,
+            result.bytes_out,
+            result.duration,
+        )
+        return result
+
+    @staticmethod
+    def _fsync_directory(path: str) -> None:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
@@ -0,0 +1,35 @@
+"""
+Module for export service models.
+"""
+
+# Imports from standard library
+from dataclasses import dataclass
+
+
+@dataclass
+class ExportConfig:
+    """
+    Configuration for export.
+
+    `threads` of 0 uses every CPU core.
+    """
+
+    output_path: str = "artifacts"
+    format: str = "zstd"
+    level: int = 3
+    threads: int = 0
+    chunk_size: int = 1024 * 1024
+    block_size: int = 4 * 1024 * 1024
+
+
+@dataclass
+class ExportResult:
+    """
+    Exported artifact.
+    """
+
+    path: str
+    format: str
+    bytes_in: int
+    bytes_out: int
+    duration: float
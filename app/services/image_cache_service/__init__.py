@@ -0,0 +1,4 @@
+from .image_cache_service import ImageCacheService
+from .models import ImageCacheConfig, ImageCacheEntry
+
+__all__ = ["ImageCacheService", "ImageCacheConfig", "ImageCacheEntry"]
@@ -0,0 +1,190 @@
+"""
+Module for caching built OS images.
+"""
+
+# Imports from standard library
+import json
+import os
+import threading
+import time
+from dataclasses import asdict
+from typing import TYPE_CHECKING, Dict, Optional
+
+# Imports from local modules
+from app.services.image_cache_service.models import ImageCacheConfig, ImageCacheEntry
+
+# Imports from services modules
+from app.services.container_manager import UNMANAGED_LABELS
+
+
+if TYPE_CHECKING:
+
+    # Imports from standard library
+    import logging
+
+    # Imports from local modules
+    from app.services.docker_service.docker_service import DockerService
+
+
+CACHE_KEY_LABEL = "linux_builder.cache_key"
+
+
+class ImageCacheService:
+    """
+    Service for caching committed build images by content key.
+
+    Entries are evicted least recently used first once the summed size of
+    the cached layers exceeds `max_size`. The index is persisted to
+    `index_path` so it survives restarts.
+    """
+
+    def __init__(
+        self,
+        logger: "logging.Logger",
+        docker_service: "DockerService",
+        configuration: ImageCacheConfig,
+    ):
+        self._logger = logger.getChild("ImageCacheService")
+        self._docker_service = docker_service
+        self._configuration = configuration
+        self._lock = threading.Lock()
+
+        self._logger.debug("ImageCacheConfig: %s", self._configuration)
+
+        self._entries: Dict[str, ImageCacheEntry] = self._load_index()
+
+        self._logger.info(
+            "ImageCacheService initialized (entries=%s, size=%s)",
+            len(self._entries),
+            self.size,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._configuration.enabled)
+
+    @property
+    def size(self) -> int:
+        """
+        Total size in bytes of the cached layers.
+        """
+        return sum(entry.size for entry in self._entries.values())
+
+    def image_ref(self, key: str) -> str:
+        """
+        Get the image reference for a cache key.
+        """
+        return f"{self._configuration.repository}:{key}"
+
+    def lookup(self, key: str) -> Optional[str]:
+        """
+        Get the cached image for a key and mark it as recently used.
+
+        Returns:
+            Image reference or None if the key is not cached
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._logger.debug("Cache miss (key=%s)", key)
+                return None
+
+            # The image may have been removed behind our back
+            if self._docker_service.get_image(self.image_ref(key)) is None:
+                self._logger.warning("Cached image is gone (key=%s)", key)
+                del self._entries[key]
+                self._save_index()
+                return None
+
+            entry.last_used = time.time()
+            self._save_index()
+
+        self._logger.info("Cache hit (key=%s)", key)
+        return self.image_ref(key)
+
+    def store(self, container_id: str, key: str, base_image: str) -> str:
+        """
+        Commit a build container to the cache under a key.
+
+        Args:
+            container_id: Finished build container
+            key: Cache key of the build
+            base_image: Image the container was started from, used to
+                account only for the layers the build added
+
+        Returns:
+            Image reference of the committed image
+        """
+        image = self._docker_service.commit_container(
+            container_id,
+            repository=self._configuration.repository,
+            tag=key,
+            labels={CACHE_KEY_LABEL: key, **UNMANAGED_LABELS},
+        )
+
+        base = self._docker_service.get_image(base_image)
+        base_size = base.attrs.get("Size", 0) if base is not None else 0
+        size = max(image.attrs.get("Size", 0) - base_size, 0)
+
+        with self._lock:
+            self._entries[key] = ImageCacheEntry(
+                key=key, image_id=image.id, size=size, last_used=time.time()
+            )
+            self._evict(keep=key)
+            self._save_index()
+
+        self._logger.info("Cached image (key=%s, size=%s)", key, size)
+        return self.image_ref(key)
+
+    def evict(self) -> None:
+        """
+        Evict least recently used images until the cache fits its budget.
+        """
+        with self._lock:
+            self._evict()
+            self._save_index()
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        total = self.size
+        by_age = sorted(self._entries.values(), key=lambda entry: entry.last_used)
+
+        for entry in by_age:
+            if total <= self._configuration.max_size:
+                break
+            if entry.key == keep:
+                continue
+
+            self._logger.info("Evicting cached image (key=%s)", entry.key)
+            try:
+                # Force only untags images still used by containers
+                self._docker_service.remove_image(
+                    self.image_ref(entry.key), force=True
+                )
+            except Exception as e:
+                self._logger.warning("Error evicting image (key=%s): %s", entry.key, e)
+                continue
+
+            total -= entry.size
+            del self._entries[entry.key]
+
+    def _load_index(self) -> Dict[str, ImageCacheEntry]:
+        path = self._configuration.index_path
+        if not os.path.exists(path):
+            return {}
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return {item["key"]: ImageCacheEntry(**item) for item in data}
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            self._logger.warning("Ignoring unreadable cache index %s: %s", path, e)
+            return {}
+
+    def _save_index(self) -> None:
+        path = self._configuration.index_path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump([asdict(entry) for entry in self._entries.values()], f)
+        os.replace(tmp_path, path)
@@ -0,0 +1,30 @@
+"""
+Module for image cache service models.
+"""
+
+# Imports from standard library
+from dataclasses import dataclass
+
+
+@dataclass
+class ImageCacheConfig:
+    """
+    Configuration for image cache.
+    """
+
+    enabled: bool = True
+    repository: str = "linux_builder/cache"
+    max_size: int = 20 * 1024 * 1024 * 1024
+    index_path: str = "cache/image_cache.json"
+
+
+@dataclass
+class ImageCacheEntry:
+    """
+    Cached image record.
+    """
+
+    key: str
+    image_id: str
+    size: int
+    last_used: float
@@ -0,0 +1,18 @@
+from .job_queue_service import JobQueueService
+from .models import Job, JobQueueConfig
+from .enums import JobStatus
+from .exceptions import (
+    JobQueueError,
+    JobNotFoundError,
+    InvalidJobTransitionError,
+)
+
+__all__ = [
+    "JobQueueService",
+    "Job",
+    "JobQueueConfig",
+    "JobStatus",
+    "JobQueueError",
+    "JobNotFoundError",
+    "InvalidJobTransitionError",
+]
@@ -0,0 +1,21 @@
+"""
+Module for job queue service exceptions.
+"""
+
+
+class JobQueueError(Exception):
+    """
+    Exception for job queue error.
+    """
+
+
+class JobNotFoundError(JobQueueError):
+    """
+    Exception for job not found.
+    """
+
+
+class InvalidJobTransitionError(JobQueueError):
+    """
+    Exception for a status change the job's current status does not allow.
+    """
@@ -0,0 +1,360 @@
+"""
+Module for queueing builds.
+"""
+
+# Imports from standard library
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Set
+
+# Imports from local modules
+from app.services.job_queue_service.enums import JobStatus
+from app.services.job_queue_service.exceptions import InvalidJobTransitionError
+from app.services.job_queue_service.job_store import JobStore, worker_id
+from app.services.job_queue_service.models import Job, JobQueueConfig
+
+# Imports from services modules
+from app.services.metrics_service import MetricsService
+from app.services.os_builder_service import OSBuildConfig
+from app.services.os_builder_service.exceptions import (
+    OSBuildCancelledError,
+    OSBuildTimeoutError,
+)
+
+
+if TYPE_CHECKING:
+
+    # Imports from standard library
+    import logging
+
+    # Imports from services modules
+    from app.services.os_builder_service import OSBuilderService
+    from app.services.os_builder_service.package_index import PackageIndexStore
+
+
+class JobQueueService:
+    """
+    Service running queued builds on a pool of workers.
+
+    Jobs are persisted in SQLite, so queued jobs survive restarts and
+    jobs interrupted by a crash are requeued when the workers start.
+    Higher priorities run first, and jobs of equal priority run in
+    submission order.
+
+    Builds can only be stopped between phases. Cancelling a running job,
+    from any process, or reaching `job_timeout` stops it at the next phase
+    boundary. Retries of interrupted jobs first remove what the earlier
+    attempt left behind. Errors
+    map to statuses as follows:
+    - OSBuildCancelledError: CANCELLED
+    - OSBuildTimeoutError: TIMED_OUT
+    - any other error, OSBuildFailedError included: FAILED
+
+    `os_builder` and `package_index` are called for their services only
+    when first needed, the OS builder when the workers start and the
+    package index on submit, so processes that only submit or inspect
+    jobs never set up the build stack.
+    """
+
+    def __init__(
+        self,
+        logger: "logging.Logger",
+        os_builder: Callable[[], "OSBuilderService"],
+        configuration: JobQueueConfig = None,
+        metrics: Optional[MetricsService] = None,
+        package_index: Optional[Callable[[], Optional["PackageIndexStore"]]] = None,
+    ):
+        self._logger = logger.getChild("JobQueueService")
+        self._os_builder_factory = os_builder
+        self._os_builder: Optional["OSBuilderService"] = None
+        self._package_index_factory = package_index
+        self._configuration = configuration or JobQueueConfig()
+        self._metrics = metrics or MetricsService(logger)
+
+        self._logger.debug("JobQueueConfig: %s", self._configuration)
+
+        self._store = JobStore(self._configuration.path)
+        self._worker_id = worker_id()
+
+        self._available = threading.Condition()
+        self._stopping = False
+        self._workers: List[threading.Thread] = []
+
+        # Running jobs of this process asked to stop
+        self._cancelled: Set[int] = set()
+        self._listeners: List[Callable[[Job], None]] = []
+        self._output_listeners: List[Callable[[int, str], None]] = []
+
+        self._jobs = self._metrics.counter(
+            "jobs_total", "Finished jobs by status", ["status"]
+        )
+        self._job_wait = self._metrics.histogram(
+            "job_wait_seconds", "Time jobs spent queued"
+        )
+        self._jobs_running = self._metrics.gauge("jobs_running", "Jobs being built")
+
+        self._logger.info("JobQueueService initialized")
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    def submit(self, config: OSBuildConfig, priority: int = 0) -> int:
+        """
+        Queue a build.
+
+        Returns:
+            Job id
+        """
+        return self.submit_many([config], priority)[0]
+
+    def submit_many(
+        self, configs: Iterable[OSBuildConfig], priority: int = 0
+    ) -> List[int]:
+        """
+        Queue builds in one transaction.
+
+        Returns:
+            Job ids, in order
+
+        Raises:
+            InvalidOSBuildConfigError: If a build names an unknown package,
+                in which case nothing is queued
+        """
+        configs = list(configs)
+        package_index = None
+        if self._package_index_factory is not None:
+            package_index = self._package_index_factory()
+        if package_index is not None:
+            for config in configs:
+                package_index.resolve(
+                    config.distro, config.release, config.architecture, config.packages
+                )
+
+        job_ids = self._store.add(configs, priority)
+        self._logger.info("Queued jobs (ids=%s, priority=%s)", job_ids, priority)
+
+        with self._available:
+            self._available.notify(len(job_ids))
+
+        if self._listeners and job_ids:
+            for job in self._store.list(after=job_ids[0] - 1, limit=len(job_ids)):
+                self._notify(job)
+        return job_ids
+
+    def get(self, job_id: int) -> Job:
+        """
+        Get a job.
+
+        Raises:
+            JobNotFoundError: If there is no such job
+        """
+        return self._store.get(job_id)
+
+    def list(
+        self, status: Optional[JobStatus] = None, limit: int = 100, after: int = 0
+    ) -> List[Job]:
+        """
+        List jobs in submission order.
+        """
+        return self._store.list(status, limit, after)
+
+    def counts(self) -> Dict[JobStatus, int]:
+        """
+        Number of jobs per status.
+        """
+        return self._store.counts()
+
+    def cancel(self, job_id: int) -> Job:
+        """
+        Cancel a job.
+
+        Queued jobs are cancelled right away; running ones at their next
+        phase boundary. Jobs another process runs are marked cancelled in
+        the store, which that process checks at each boundary.
+
+        Raises:
+            JobNotFoundError: If there is no such job
+            InvalidJobTransitionError: If the job already finished
+        """
+        job = self._store.get(job_id)
+
+        if job.status == JobStatus.RUNNING and job.worker == self._worker_id:
+            self._logger.info("Cancelling running job (id=%s)", job_id)
+            self._cancelled.add(job_id)
+            return job
+
+        self._logger.info("Cancelling job (id=%s)", job_id)
+        job = self._store.transition(job_id, JobStatus.CANCELLED)
+        self._jobs.inc(status=JobStatus.CANCELLED.value)
+        self._notify(job)
+        return job
+
+    def add_listener(self, listener: Callable[[Job], None]) -> None:
+        """
+        Call `listener` with the job after every status change.
+
+        Listeners run on the thread making the change and must not block.
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[Job], None]) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def add_output_listener(self, listener: Callable[[int, str], None]) -> None:
+        """
+        Call `listener` with the job id and each line of build output.
+
+        Listeners run on the worker thread and must not block.
+        """
+        self._output_listeners.append(listener)
+
+    def remove_output_listener(self, listener: Callable[[int, str], None]) -> None:
+        if listener in self._output_listeners:
+            self._output_listeners.remove(listener)
+
+    def start(self) -> None:
+        """
+        Requeue jobs of dead processes, start the OS builder's backends
+        and start the workers.
+        """
+        if self._workers:
+            return
+
+        if self._os_builder is None:
+            self._os_builder = self._os_builder_factory()
+        self._os_builder.start()
+
+        requeued, failed = self._store.recover(self._configuration.max_attempts)
+        if requeued or failed:
+            self._logger.warning(
+                "Recovered interrupted jobs (requeued=%s, failed=%s)", requeued, failed
+            )
+
+        self._stopping = False
+        for index in range(max(1, self._configuration.workers)):
+            worker = threading.Thread(
+                target=self._work, name=f"JobWorker-{index}", daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+
+        self._logger.info("Started %s job workers", len(self._workers))
+
+    def stop(self) -> None:
+        """
+        Stop the workers after their current jobs.
+        """
+        with self._available:
+            self._stopping = True
+            self._available.notify_all()
+
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+
+    def join(self, poll_interval: float = 0.1) -> None:
+        """
+        Wait until no job is queued or running.
+        """
+        while True:
+            counts = self._store.counts()
+            if not counts[JobStatus.QUEUED] and not counts[JobStatus.RUNNING]:
+                return
+            time.sleep(poll_interval)
+
+    def _work(self) -> None:
+        while True:
+            with self._available:
+                if self._stopping:
+                    return
+
+            job = self._store.claim(self._worker_id)
+            if job is None:
+                # Other processes may submit too, so poll as well
+                with self._available:
+                    if not self._stopping:
+                        self._available.wait(self._configuration.poll_interval)
+                continue
+
+            self._run(job)
+
+    def _run(self, job: Job) -> None:
+        self._logger.info(
+            "Running job (id=%s, name=%s, attempt=%s)",
+            job.id,
+            job.config.name,
+            job.attempts,
+        )
+        self._job_wait.observe(max(0.0, job.started_at - job.created_at))
+        self._jobs_running.inc()
+        self._notify(job)
+
+        deadline = None
+        if self._configuration.job_timeout:
+            deadline = time.monotonic() + self._configuration.job_timeout
+
+        def checkpoint() -> None:
+            if (
+                job.id in self._cancelled
+                or self._store.get(job.id).status == JobStatus.CANCELLED
+            ):
+                raise OSBuildCancelledError(f"Job {job.id} was cancelled")
+            if deadline is not None and time.monotonic() > deadline:
+                raise OSBuildTimeoutError(
+                    f"Job {job.id} ran longer than {self._configuration.job_timeout}s"
+                )
+
+        result, error = None, None
+        try:
+            if job.attempts > 1:
+                self._os_builder.remove_leftovers(job.config)
+
+            result = self._os_builder.build_os(
+                job.config,
+                checkpoint=checkpoint,
+                output=lambda line: self._notify_output(job.id, line),
+            )
+            status = JobStatus.SUCCEEDED
+        except OSBuildCancelledError as e:
+            status, error = JobStatus.CANCELLED, e
+        except OSBuildTimeoutError as e:
+            status, error = JobStatus.TIMED_OUT, e
+        except Exception as e:
+            status, error = JobStatus.FAILED, e
+        finally:
+            self._jobs_running.dec()
+            self._cancelled.discard(job.id)
+
+        if error is not None:
+            self._logger.error("Job %s ended %s: %s", job.id, status.value, error)
+
+        try:
+            job = self._store.transition(
+                job.id,
+                status,
+                result=result,
+                error=f"{type(error).__name__}: {error}" if error is not None else None,
+            )
+        except InvalidJobTransitionError as e:
+            # Another process finished it meanwhile, e.g. by cancelling it
+            self._logger.warning("Keeping stored status of job %s: %s", job.id, e)
+            return
+
+        self._jobs.inc(status=status.value)
+        self._notify(job)
+
+    def _notify(self, job: Job) -> None:
+        for listener in list(self._listeners):
+            try:
+                listener(job)
+            except Exception as e:
+                self._logger.warning("Job listener failed: %s", e)
+
+    def _notify_output(self, job_id: int, line: str) -> None:
+        for listener in list(self._output_listeners):
+            try:
+                listener(job_id, line)
+            except Exception as e:
+                self._logger.warning("Job output listener failed: %s", e)
@@ -0,0 +1,329 @@
+"""
+Module for persisting jobs in SQLite.
+"""
+
+# Imports from standard library
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Imports from local modules
+from app.services.job_queue_service.enums import TRANSITIONS, JobStatus
+from app.services.job_queue_service.exceptions import (
+    InvalidJobTransitionError,
+    JobNotFoundError,
+)
+from app.services.job_queue_service.models import Job
+
+# Imports from services modules
+from app.services.os_builder_service import OSBuildConfig
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    status TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    config TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    result TEXT,
+    error TEXT,
+    worker TEXT
+);
+
+-- Only queued jobs are indexed for claiming, so the index stays as
+-- small as the backlog however many finished jobs pile up
+CREATE INDEX IF NOT EXISTS jobs_claim
+    ON jobs (priority DESC, id) WHERE status = 'QUEUED';
+
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+"""
+
+COLUMNS = (
+    "id, config, status, priority, attempts, created_at, "
+    "started_at, finished_at, result, error, worker"
+)
+
+
+def worker_id() -> str:
+    """
+    Identity of this process, `host:pid`.
+    """
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobStore:
+    """
+    Jobs in a SQLite database in WAL mode.
+
+    Each thread gets its own connection. Writes run in `BEGIN IMMEDIATE`
+    transactions, so claiming is atomic across threads and processes.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self._path, timeout=30, isolation_level=None, check_same_thread=False
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def close(self) -> None:
+        """
+        Close every thread's connection.
+        """
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def add(self, configs: Iterable[OSBuildConfig], priority: int = 0) -> List[int]:
+        """
+        Queue builds in one transaction.
+
+        Returns:
+            Ids of the new jobs, in order
+        """
+        now = time.time()
+        rows = [
+            (JobStatus.QUEUED.value, priority, json.dumps(asdict(config)), now)
+            for config in configs
+        ]
+
+        with self._write() as connection:
+            ids = []
+            for row in rows:
+                cursor = connection.execute(
+                    "INSERT INTO jobs (status, priority, config, created_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    row,
+                )
+                ids.append(cursor.lastrowid)
+        return ids
+
+    def claim(self, worker: str) -> Optional[Job]:
+        """
+        Mark the highest priority, oldest queued job as running.
+
+        Returns:
+            The job, or None if the queue is empty
+        """
+        with self._write() as connection:
+            # Without the hint the planner may scan jobs_status and sort
+            row = connection.execute(
+                "SELECT id FROM jobs INDEXED BY jobs_claim WHERE status = 'QUEUED' "
+                "ORDER BY priority DESC, id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+
+            connection.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, worker = ?, "
+                "attempts = attempts + 1 WHERE id = ?",
+                (JobStatus.RUNNING.value, time.time(), worker, row[0]),
+            )
+            return self._get(connection, row[0])
+
+    def transition(
+        self,
+        job_id: int,
+        status: JobStatus,
+        result: Optional[str] = None,
+        error: Optional[str] = None,
+    ) -> Job:
+        """
+        Move a job to a new status.
+
+        Raises:
+            JobNotFoundError: If there is no such job
+            InvalidJobTransitionError: If the current status does not allow it
+        """
+        sources = [
+            source.value for source, targets in TRANSITIONS.items() if status in targets
+        ]
+        finished_at = time.time() if status.finished else None
+
+        with self._write() as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ? "
+                f"WHERE id = ? AND status IN ({', '.join('?' * len(sources))})",
+                (status.value, finished_at, result, error, job_id, *sources),
+            )
+            job = self._get(connection, job_id)
+
+        if cursor.rowcount == 0:
+            raise InvalidJobTransitionError(
+                f"Job {job_id} cannot go from {job.status.value} to {status.value}"
+            )
+        return job
+
+    def get(self, job_id: int) -> Job:
+        """
+        Get a job.
+
+        Raises:
+            JobNotFoundError: If there is no such job
+        """
+        return self._get(self._connection(), job_id)
+
+    def list(
+        self,
+        status: Optional[JobStatus] = None,
+        limit: int = 100,
+        after: int = 0,
+    ) -> List[Job]:
+        """
+        Jobs in id order, optionally of one status, starting after an id.
+        """
+        query = f"SELECT {COLUMNS} FROM jobs WHERE id > ?"
+        params: Tuple = (after,)
+        if status is not None:
+            query += " AND status = ?"
+            params += (status.value,)
+        query += " ORDER BY id LIMIT ?"
+
+        rows = self._connection().execute(query, params + (limit,)).fetchall()
+        return [self._job(row) for row in rows]
+
+    def counts(self) -> Dict[JobStatus, int]:
+        """
+        Number of jobs per status.
+        """
+        rows = self._connection().execute(
+            "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+        )
+        counts = {status: 0 for status in JobStatus}
+        for status, count in rows:
+            counts[JobStatus(status)] = count
+        return counts
+
+    def recover(self, max_attempts: int) -> Tuple[List[int], List[int]]:
+        """
+        Requeue jobs left running by dead processes on this host.
+
+        Jobs already started `max_attempts` times fail instead.
+
+        Returns:
+            Ids of the requeued and of the failed jobs
+        """
+        host, pid = worker_id().rsplit(":", 1)
+        requeued, failed = [], []
+
+        with self._write() as connection:
+            rows = connection.execute(
+                "SELECT id, worker, attempts FROM jobs WHERE status = 'RUNNING'"
+            ).fetchall()
+
+            for job_id, worker, attempts in rows:
+                worker_host, _, worker_pid = (worker or ":").rpartition(":")
+                if worker_host != host:
+                    continue
+                if worker_pid != pid and worker_pid.isdigit():
+                    if _process_alive(int(worker_pid)):
+                        continue
+
+                if attempts >= max_attempts:
+                    connection.execute(
+                        "UPDATE jobs SET status = ?, finished_at = ?, error = ? "
+                        "WHERE id = ?",
+                        (
+                            JobStatus.FAILED.value,
+                            time.time(),
+                            f"Interrupted {attempts} times",
+                            job_id,
+                        ),
+                    )
+                    failed.append(job_id)
+                else:
+                    connection.execute(
+                        "UPDATE jobs SET status = ?, worker = NULL WHERE id = ?",
+                        (JobStatus.QUEUED.value, job_id),
+                    )
+                    requeued.append(job_id)
+
+        return requeued, failed
+
+    def _get(self, connection: sqlite3.Connection, job_id: int) -> Job:
+        row = connection.execute(
+            f"SELECT {COLUMNS} FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            raise JobNotFoundError(f"Job {job_id} not found")
+        return self._job(row)
+
+    @staticmethod
+    def _job(row: tuple) -> Job:
+        (
+            job_id,
+            config,
+            status,
+            priority,
+            attempts,
+            created_at,
+            started_at,
+            finished_at,
+            result,
+            error,
+            worker,
+        ) = row
+        return Job(
+            id=job_id,
+            config=OSBuildConfig(**json.loads(config)),
+            status=JobStatus(status),
+            priority=priority,
+            attempts=attempts,
+            created_at=created_at,
+            started_at=started_at,
+            finished_at=finished_at,
+            result=result,
+            error=error,
+            worker=worker,
+        )
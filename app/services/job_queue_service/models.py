@@ -0,0 +1,49 @@
+"""
+Module for job queue service models.
+"""
+
+# Imports from standard library
+from dataclasses import dataclass
+from typing import Optional
+
+# Imports from local modules
+from app.services.job_queue_service.enums import JobStatus
+
+# Imports from services modules
+from app.services.os_builder_service import OSBuildConfig
+
+
+@dataclass
+class JobQueueConfig:
+    """
+    Configuration for job queue.
+
+    `job_timeout` is in seconds, None lets builds run as long as they
+    need. Jobs interrupted by a crash are retried until they were started
+    `max_attempts` times.
+    """
+
+    path: str = "cache/jobs.sqlite3"
+    workers: int = 2
+    poll_interval: float = 1.0
+    job_timeout: Optional[float] = None
+    max_attempts: int = 3
+
+
+@dataclass
+class Job:
+    """
+    Build submitted to the queue.
+    """
+
+    id: int
+    config: OSBuildConfig
+    status: JobStatus
+    priority: int
+    attempts: int
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[str] = None
+    error: Optional[str] = None
+    worker: Optional[str] = None
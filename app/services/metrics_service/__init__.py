@@ -0,0 +1,12 @@
+from .metrics_service import MetricsService
+from .metrics import Counter, Gauge, Histogram, DEFAULT_BUCKETS
+from .models import MetricsConfig
+
+__all__ = [
+    "MetricsService",
+    "MetricsConfig",
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "DEFAULT_BUCKETS",
+]
@@ -0,0 +1,249 @@
+"""
+Module for build metrics.
+"""
+
+# Imports from standard library
+import atexit
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Iterable,
+    Iterator,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+# Imports from local modules
+from app.services.metrics_service.metrics import (
+    DEFAULT_BUCKETS,
+    Counter,
+    Gauge,
+    Histogram,
+    Metric,
+)
+from app.services.metrics_service.models import MetricsConfig
+
+
+if TYPE_CHECKING:
+
+    # Imports from standard library
+    import logging
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """
+    Request handler serving the metrics page.
+    """
+
+    server: "_MetricsServer"
+
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+
+        body = self.server.metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        self.server.metrics._logger.debug(format, *args)
+
+
+class _MetricsServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], metrics: "MetricsService"):
+        super().__init__(address, _MetricsHandler)
+        self.metrics = metrics
+
+
+class MetricsService:
+    """
+    Service collecting counters, gauges and histograms of build phases.
+
+    Metrics are exported in the Prometheus text format to a file, over
+    HTTP, or both, once `start` is called; only long-running processes
+    do, so short-lived ones never overwrite their file. Every phase timed
+    with `span` lands in the `phase_duration_seconds` histogram under its
+    name.
+    """
+
+    def __init__(
+        self, logger: "logging.Logger", configuration: Optional[MetricsConfig] = None
+    ):
+        self._logger = logger.getChild("MetricsService")
+        self._configuration = configuration or MetricsConfig()
+
+        self._logger.debug("MetricsConfig: %s", self._configuration)
+
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+        self._server: Optional[_MetricsServer] = None
+
+        self._phase_seconds = self.histogram(
+            "phase_duration_seconds", "Duration of build phases", ["phase"]
+        )
+        self._phase_errors = self.counter(
+            "phase_errors_total", "Build phases that raised", ["phase"]
+        )
+
+        self._logger.info("MetricsService initialized")
+
+    @property
+    def http_address(self) -> Optional[Tuple[str, int]]:
+        """
+        Address the metrics endpoint listens on.
+        """
+        return self._server.server_address[:2] if self._server else None
+
+    def start(self) -> None:
+        """
+        Start exporting to the configured file and HTTP port.
+        """
+        if self._writer is not None or self._server is not None:
+            return
+
+        if self._configuration.file_path:
+            self._writer = threading.Thread(
+                target=self._write_periodically, name="MetricsWriter", daemon=True
+            )
+            self._writer.start()
+
+        if self._configuration.http_port is not None:
+            self._server = _MetricsServer(
+                (self._configuration.http_host, self._configuration.http_port), self
+            )
+            threading.Thread(
+                target=self._server.serve_forever, name="MetricsServer", daemon=True
+            ).start()
+            self._logger.info("Serving metrics on %s:%s", *self.http_address)
+
+        if self._writer is not None or self._server is not None:
+            atexit.register(self.stop)
+
+    def counter(
+        self, name: str, documentation: str, labels: Iterable[str] = ()
+    ) -> Counter:
+        """
+        Get or create a counter.
+        """
+        return self._register(Counter, name, documentation, labels)
+
+    def gauge(self, name: str, documentation: str, labels: Iterable[str] = ()) -> Gauge:
+        """
+        Get or create a gauge.
+        """
+        return self._register(Gauge, name, documentation, labels)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: Iterable[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """
+        Get or create a histogram.
+        """
+        return self._register(Histogram, name, documentation, labels, buckets=buckets)
+
+    @contextmanager
+    def span(self, phase: str) -> Iterator[None]:
+        """
+        Time a phase; phases that raise are also counted as errors.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self._phase_errors.inc(phase=phase)
+            raise
+        finally:
+            self._phase_seconds.observe(time.perf_counter() - started, phase=phase)
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text format.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: Optional[str] = None) -> None:
+        """
+        Write the metrics to a file atomically.
+        """
+        path = path or self._configuration.file_path
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.render())
+            # mkstemp creates the file private to its owner
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def stop(self) -> None:
+        """
+        Stop exporting, writing the file one last time.
+        """
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+
+        if self._writer is not None:
+            self._writer.join()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def _register(self, cls, name: str, documentation: str, labels, **kwargs):
+        name = f"{self._configuration.namespace}_{name}"
+
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(
+                    name, documentation, labels, **kwargs
+                )
+
+        if type(metric) is not cls or metric.labels != tuple(labels):
+            raise ValueError(f"Metric {name} is already registered differently")
+        return metric
+
+    def _write_periodically(self) -> None:
+        while not self._stopped.wait(self._configuration.file_interval):
+            self._safe_write()
+        self._safe_write()
+
+    def _safe_write(self) -> None:
+        try:
+            self.write()
+        except OSError as e:
+            self._logger.warning("Error writing metrics: %s", e)
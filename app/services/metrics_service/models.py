@@ -0,0 +1,25 @@
+"""
+Module for metrics service models.
+"""
+
+# Imports from standard library
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class MetricsConfig:
+    """
+    Configuration for metrics service.
+
+    Metrics are always collected. Once the service is started, they are
+    exported to `file_path` every `file_interval` seconds and at exit
+    when a path is set, and served on `http_host:http_port/metrics` when
+    a port is set.
+    """
+
+    namespace: str = "linux_builder"
+    file_path: Optional[str] = None
+    file_interval: float = 15.0
+    http_host: str = "127.0.0.1"
+    http_port: Optional[int] = None
@@ -1,4 +1,23 @@
 from .os_builder_service import OSBuilderService
-from .models import OSBuildConfig
+from .protocols import BuildBackend
+from .models import (
+    BuildManifest,
+    ChrootBackendConfig,
+    OSBuildConfig,
+    OSBuilderServiceConfig,
+    OSBuildResult,
+    PackageResolution,
+)
+from .enums import OSBuildStatus
 
-__all__ = ["OSBuilderService", "OSBuildConfig"]
+__all__ = [
+    "OSBuilderService",
+    "OSBuildConfig",
+    "OSBuilderServiceConfig",
+    "OSBuildResult",
+    "OSBuildStatus",
+    "BuildManifest",
+    "BuildBackend",
+    "ChrootBackendConfig",
+    "PackageResolution",
+]
@@ -0,0 +1,317 @@
+"""
+Module for building OS root filesystems with debootstrap and chroot.
+"""
+
+# Imports from standard library
+import os
+import platform
+import re
+import subprocess
+import tempfile
+import uuid
+from typing import TYPE_CHECKING, Callable, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+# Imports from local modules
+from .models import ChrootBackendConfig, OSBuildConfig
+from .exceptions import (
+    OSBuildArchitectureNotSupportedError,
+    OSBuildFailedError,
+    OSBuildReleaseNotSupportedError,
+)
+
+# Imports from services modules
+from app.services.metrics_service import MetricsService
+
+if TYPE_CHECKING:
+
+    # Imports from standard library
+    import logging
+
+    # Imports from core modules
+    from app.core.base.commander import CommandExecutor
+
+    # Imports from services modules
+    from app.services.export_service import ExportService
+
+
+# Suite debootstrap installs per (distro, release)
+CODENAMES = {
+    ("ubuntu", "20.04"): "focal",
+    ("ubuntu", "22.04"): "jammy",
+    ("ubuntu", "24.04"): "noble",
+    ("ubuntu", "latest"): "noble",
+    ("debian", "latest"): "bookworm",
+}
+
+# Default archives per (distro, architecture)
+MIRRORS = {
+    ("ubuntu", "amd64"): "http://archive.ubuntu.com/ubuntu",
+    ("ubuntu", "arm64"): "http://ports.ubuntu.com/ubuntu-ports",
+    ("debian", "amd64"): "http://deb.debian.org/debian",
+    ("debian", "arm64"): "http://deb.debian.org/debian",
+}
+
+_HOST_ARCHITECTURES = {"x86_64": "amd64", "amd64": "amd64", "aarch64": "arm64"}
+
+_UNSAFE_CHARACTERS = re.compile(r"[^A-Za-z0-9_.-]")
+
+# Keeps maintainer scripts from starting services in the chroot
+POLICY_RC_D = "/usr/sbin/policy-rc.d"
+_POLICY_RC_D_SCRIPT = "#!/bin/sh\nexit 101\n"
+
+
+def release_codename(distro: str, release: str) -> str:
+    """
+    Suite name of a release, e.g. "jammy" for ubuntu 22.04.
+
+    Raises:
+        OSBuildReleaseNotSupportedError: If the release has no known suite
+    """
+    try:
+        return CODENAMES[(distro, release)]
+    except KeyError:
+        raise OSBuildReleaseNotSupportedError(
+            f"No debootstrap suite for {distro} {release}"
+        ) from None
+
+
+class ChrootBackend:
+    """
+    Build backend producing root filesystems without Docker.
+
+    Each build bootstraps a root with debootstrap in a directory of its
+    own, on its own tmpfs by default, installs packages with apt-get in a
+    chroot and writes the root as a tarball through the exporter. Roots
+    share nothing, so builds run in parallel. A `file://` mirror is bind
+    mounted into the root so apt-get finds it at the same path.
+
+    Commands run through CommandExecutor, which splits them on whitespace,
+    so roots are named from the build name with unsafe characters
+    replaced. Only builds for the host architecture are supported.
+    """
+
+    def __init__(
+        self,
+        logger: "logging.Logger",
+        commander: "CommandExecutor",
+        exporter: "ExportService",
+        configuration: ChrootBackendConfig = None,
+        metrics: Optional[MetricsService] = None,
+    ):
+        self._logger = logger.getChild("ChrootBackend")
+        self._commander = commander
+        self._exporter = exporter
+        self._configuration = configuration or ChrootBackendConfig()
+        self._metrics = metrics or MetricsService(logger)
+
+        self._logger.debug("ChrootBackendConfig: %s", self._configuration)
+
+        self._root_path = os.path.abspath(self._configuration.root_path)
+        os.makedirs(self._root_path, exist_ok=True)
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def remove_leftovers(self, name: str) -> None:
+        # Every build bootstraps a root of its own, so retries never clash
+        pass
+
+    def build(
+        self,
+        parameters: OSBuildConfig,
+        checkpoint: Callable[[], None],
+        output: Optional[Callable[[str], None]] = None,
+    ) -> str:
+        """
+        Build a root filesystem and export it as an artifact named after
+        the build.
+
+        Returns:
+            Path of the artifact
+        """
+        checkpoint()
+        suite = release_codename(parameters.distro, parameters.release)
+        self._check_architecture(parameters.architecture)
+        mirror = self._configuration.mirror or MIRRORS[
+            (parameters.distro, parameters.architecture)
+        ]
+
+        root = os.path.join(
+            self._root_path,
+            f"{_UNSAFE_CHARACTERS.sub('_', parameters.name)}-{uuid.uuid4().hex[:8]}",
+        )
+        os.makedirs(root)
+        mounts: List[str] = []
+
+        try:
+            if self._configuration.tmpfs:
+                self._mount(
+                    mounts,
+                    root,
+                    f"-t tmpfs -o size={self._configuration.tmpfs_size},mode=0755 "
+                    f"tmpfs {root}",
+                )
+
+            with self._metrics.span("bootstrap"):
+                self._run(
+                    f"debootstrap --variant={self._configuration.variant} "
+                    f"--arch={parameters.architecture} {suite} {root} {mirror}",
+                    output,
+                )
+
+            checkpoint()
+
+            if parameters.packages:
+                with self._metrics.span("package_install"):
+                    self._install_packages(root, mirror, parameters.packages, output)
+
+            checkpoint()
+
+            with self._metrics.span("export"):
+                result = self._exporter.write_artifact(
+                    self._archive(root), parameters.name
+                )
+        finally:
+            self._remove_root(root, mounts)
+
+        return result.path
+
+    def _install_packages(
+        self,
+        root: str,
+        mirror: str,
+        packages: List[str],
+        output: Optional[Callable[[str], None]],
+    ) -> None:
+        """
+        Install packages with apt-get in a chroot, with services kept from
+        starting by a policy-rc.d removed again afterwards.
+        """
+        self._logger.info("Installing packages (packages=%s)", packages)
+
+        mounts: List[str] = []
+        try:
+            self._install_policy(root)
+
+            self._mount(mounts, f"{root}/proc", f"-t proc proc {root}/proc")
+
+            url = urlsplit(mirror)
+            if url.scheme == "file":
+                target = f"{root}{url.path}"
+                self._run(f"mkdir -p {target}")
+                self._mount(mounts, target, f"--bind -o ro {url.path} {target}")
+
+            apt = f"chroot {root} env DEBIAN_FRONTEND=noninteractive apt-get"
+            self._run(f"{apt} update", output)
+            self._run(
+                f"{apt} install -y --no-install-recommends " + " ".join(packages),
+                output,
+            )
+            self._run(f"{apt} clean")
+        finally:
+            self._unmount(mounts)
+            self._run(f"rm -f {root}{POLICY_RC_D}")
+
+    def _install_policy(self, root: str) -> None:
+        """
+        Install a policy-rc.d denying every service start.
+        """
+        # Commands cannot redirect output, so the script is copied in
+        fd, path = tempfile.mkstemp(prefix="policy-rc.d.")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(_POLICY_RC_D_SCRIPT)
+            self._run(f"install -m 0755 {path} {root}{POLICY_RC_D}")
+        finally:
+            os.unlink(path)
+
+    def _archive(self, root: str) -> Iterator[bytes]:
+        """
+        Stream the root as a tar archive.
+        """
+        # CommandExecutor reads text lines, the archive is binary
+        command = ["tar", "--numeric-owner", "--xattrs", "-C", root, "-cf", "-", "."]
+        if self._configuration.use_sudo:
+            command.insert(0, "sudo")
+
+        process = subprocess.Popen(
+            command, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        try:
+            for chunk in iter(lambda: process.stdout.read(1024 * 1024), b""):
+                yield chunk
+        finally:
+            process.stdout.close()
+            stderr = process.stderr.read().decode(errors="replace")
+            process.stderr.close()
+            if process.wait() != 0:
+                raise OSBuildFailedError(f"Archiving {root} failed: {stderr[-2000:]}")
+
+    def _remove_root(self, root: str, mounts: List[str]) -> None:
+        """
+        Unmount and delete a build root.
+        """
+        if not self._unmount(mounts):
+            # Deleting with something still mounted would reach into it
+            self._logger.error("Keeping build root with mounts left (root=%s)", root)
+            return
+
+        if self._configuration.tmpfs:
+            os.rmdir(root)
+        else:
+            self._run(f"rm -rf --one-file-system {root}")
+
+    def _mount(self, mounts: List[str], target: str, arguments: str) -> None:
+        self._run(f"mount {arguments}")
+        mounts.append(target)
+
+    def _unmount(self, mounts: List[str]) -> bool:
+        """
+        Unmount in reverse order.
+
+        Returns:
+            Whether everything was unmounted
+        """
+        unmounted = True
+        while mounts:
+            target = mounts.pop()
+            try:
+                self._run(f"umount {target}")
+            except OSBuildFailedError as e:
+                self._logger.error("Error unmounting %s: %s", target, e)
+                unmounted = False
+        return unmounted
+
+    def _run(
+        self, command: str, output: Optional[Callable[[str], None]] = None
+    ) -> None:
+        """
+        Run a command, raising OSBuildFailedError if it fails.
+        """
+        self._logger.debug("Running %s", command)
+        result = self._commander.execute_streaming(
+            command,
+            use_sudo=self._configuration.use_sudo,
+            on_output=(lambda line: output(line.line)) if output else None,
+        )
+        # Only the in-memory tail is used, so spilled output is dropped
+        result.close()
+
+        # Timeouts report -1
+        if result.return_code != 0:
+            raise OSBuildFailedError(
+                f"{command.split()[0]} failed ({result.status.value}, "
+                f"code {result.return_code}): {result.stderr[-2000:]}"
+            )
+
+    @staticmethod
+    def _check_architecture(architecture: str) -> None:
+        host = _HOST_ARCHITECTURES.get(platform.machine().lower())
+        if architecture != host:
+            raise OSBuildArchitectureNotSupportedError(
+                f"Chroot builds need a {architecture} host, this one is {host}"
+            )
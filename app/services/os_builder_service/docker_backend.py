@@ -0,0 +1,405 @@
+"""
+Module for building OSes in Docker containers.
+"""
+
+# Imports from standard library
+import time
+from typing import TYPE_CHECKING, Callable, List, Optional
+
+# Imports from local modules
+from .manifest_store import ManifestStore
+from .minimize import minimize_script
+from .models import (
+    BuildManifest,
+    OSBuildConfig,
+    OSBuilderServiceConfig,
+    TARGET_LABEL,
+    format_target,
+    parse_target,
+)
+from .warm_pool import WarmPool
+from .exceptions import (
+    OSBuildAlreadyExistsError,
+    OSBuildFailedError,
+)
+
+# Imports from services modules
+from app.services.container_manager import (
+    ContainerManagerService,
+    ContainerConfig,
+    ROLE_LABEL,
+    build_container_name,
+)
+from app.services.metrics_service import MetricsService
+
+if TYPE_CHECKING:
+
+    # Imports from standard library
+    import logging
+
+    # Imports from services modules
+    from app.services.image_cache_service import ImageCacheService
+
+
+class DockerBackend:
+    """
+    Build backend running builds in containers committed as images.
+
+    Builds run under a temporary container name and the container takes
+    the build's name, replacing the previous build's container, only once
+    the result is committed. Containers of failed,
+    cancelled or timed out builds are removed, and those of builds cut
+    short by a crash are left to the garbage collector or to
+    `remove_leftovers`.
+
+    A rebuild of a name with a manifest for the same target starts from
+    the previous result and only installs or purges the packages that
+    changed. Each such rebuild adds a layer, so a result that would have
+    more than `max_layers` is squashed. Builds from a bare base image
+    start in a warm pool container when one is ready.
+
+    After installing, builds are stripped per the `minimize` policy, so
+    cached images are stripped too, and with `squash` on the result is
+    committed as a single layer.
+    """
+
+    def __init__(
+        self,
+        logger: "logging.Logger",
+        container_manager: "ContainerManagerService",
+        configuration: OSBuilderServiceConfig,
+        image_cache: "ImageCacheService" = None,
+        metrics: Optional[MetricsService] = None,
+    ):
+        self._logger = logger.getChild("DockerBackend")
+        self._container_manager = container_manager
+        self._configuration = configuration
+        self._image_cache = image_cache
+
+        self._manifests = ManifestStore(self._configuration.manifest_path)
+
+        self._minimize_script = None
+        if self._configuration.minimize:
+            self._minimize_script = minimize_script(
+                self._configuration.minimize,
+                self._configuration.minimize_keep_locales,
+            )
+
+        self._metrics = metrics or MetricsService(logger)
+        self._cache_lookups = self._metrics.counter(
+            "image_cache_lookups_total", "Image cache lookups by result", ["result"]
+        )
+
+        self._warm_pool = None
+        if self._configuration.warm_pool_size > 0:
+            self._warm_pool = WarmPool(
+                logger,
+                container_manager,
+                [parse_target(t) for t in self._configuration.warm_pool_targets],
+                size=self._configuration.warm_pool_size,
+                max_idle=self._configuration.warm_pool_max_idle,
+                metrics=self._metrics,
+            )
+
+    def start(self) -> None:
+        """
+        Start filling the warm pool.
+        """
+        if self._warm_pool is not None:
+            self._warm_pool.start()
+
+    def stop(self) -> None:
+        """
+        Stop the warm pool and remove its idle containers.
+        """
+        if self._warm_pool is not None:
+            self._warm_pool.stop()
+
+    def remove_leftovers(self, name: str) -> None:
+        """
+        Remove containers earlier, interrupted builds of `name` left behind.
+        """
+        self._container_manager.remove_build_containers(name)
+
+    def build(
+        self,
+        parameters: OSBuildConfig,
+        checkpoint: Callable[[], None],
+        output: Optional[Callable[[str], None]] = None,
+    ) -> str:
+        """
+        Build an OS and commit it as `image_repository:name`.
+        """
+        checkpoint()
+        manifest = self._manifests.get(parameters.name)
+
+        # Check if the OS already exists, other than as the build to replace
+        if manifest is None and self._container_manager.application_exists(
+            parameters.name
+        ):
+            raise OSBuildAlreadyExistsError(
+                f"OS with name={parameters.name} already exists"
+            )
+
+        base_image = f"{parameters.distro}:{parameters.release}"
+        platform = f"linux/{parameters.architecture}"
+        previous = self._previous_build(parameters, manifest, base_image)
+
+        # Reuse an image that already has the same package set installed
+        use_cache = (
+            self._image_cache is not None
+            and self._image_cache.enabled
+            and bool(parameters.packages)
+        )
+        cache_key = parameters.cache_key(
+            self._configuration.minimize, self._configuration.minimize_keep_locales
+        )
+        cached_image = None
+        if use_cache:
+            with self._metrics.span("cache_lookup"):
+                cached_image = self._image_cache.lookup(cache_key)
+            self._cache_lookups.inc(result="miss" if cached_image is None else "hit")
+
+        if cached_image is not None:
+            source_image = cached_image
+        elif previous is not None:
+            source_image = previous.image
+        else:
+            source_image = base_image
+
+        # Build the OS, in an already running base container if one is ready
+        build_name = build_container_name(parameters.name)
+        container = None
+        if source_image == base_image and self._warm_pool is not None:
+            container = self._warm_pool.claim(parameters.target, build_name)
+
+        if container is None:
+            container = self._container_manager.deploy_application(
+                ContainerConfig(
+                    image=source_image,
+                    name=build_name,
+                    command="sleep infinity",
+                    detach=True,
+                    remove=False,
+                    tty=True,
+                    stdin_open=True,
+                    platform=platform,
+                    pull=source_image == base_image,
+                    labels={
+                        TARGET_LABEL: format_target(parameters.target),
+                        ROLE_LABEL: "build",
+                    },
+                )
+            )
+
+        try:
+            checkpoint()
+
+            if cached_image is None:
+                with self._metrics.span("package_install"):
+                    if previous is not None:
+                        self._apply_package_delta(
+                            container.id,
+                            previous.packages,
+                            parameters.packages,
+                            output,
+                        )
+                    else:
+                        self._install_packages(
+                            container.id, parameters.packages, output
+                        )
+
+                if self._minimize_script is not None:
+                    with self._metrics.span("minimize"):
+                        self._logger.info("Minimizing (name=%s)", parameters.name)
+                        self._run_apt(container.id, self._minimize_script, output)
+
+                if use_cache:
+                    with self._metrics.span("cache_store"):
+                        cached_image = self._image_cache.store(
+                            container.id, cache_key, base_image
+                        )
+
+            checkpoint()
+
+            squash = self._configuration.squash or (
+                self._container_manager.get_image_layers(cached_image or source_image)
+                >= self._configuration.max_layers
+            )
+            with self._metrics.span("commit_result"):
+                image = self._commit_result(
+                    container.id, parameters.name, cached_image, squash
+                )
+
+            # A retry after a crash past this point starts from the new image
+            self._manifests.put(
+                BuildManifest(
+                    name=parameters.name,
+                    distro=parameters.distro,
+                    release=parameters.release,
+                    architecture=parameters.architecture,
+                    base_image=base_image,
+                    base_digest=self._container_manager.get_image_digest(base_image),
+                    image=image,
+                    packages=sorted(set(parameters.packages)),
+                    updated_at=time.time(),
+                )
+            )
+
+            self._replace_application(container.id, parameters.name)
+        except BaseException:
+            self._discard(container.id)
+            raise
+
+        return "OS built"
+
+    def _replace_application(self, container_id: str, name: str) -> None:
+        """
+        Give a finished build container the build's name, removing the
+        container of the build it replaces.
+        """
+        if self._container_manager.application_exists(name):
+            self._container_manager.remove_application(name, force=True)
+        self._container_manager.rename_application(container_id, name)
+
+    def _discard(self, container_id: str) -> None:
+        """
+        Remove the container of a build that did not finish.
+        """
+        try:
+            self._container_manager.remove_application(container_id, force=True)
+        except Exception as e:
+            self._logger.warning(
+                "Error removing build container (container_id=%s): %s",
+                container_id,
+                e,
+            )
+
+    def _previous_build(
+        self,
+        parameters: OSBuildConfig,
+        manifest: Optional[BuildManifest],
+        base_image: str,
+    ) -> Optional[BuildManifest]:
+        """
+        Get the manifest of a previous build that can be rebuilt incrementally.
+        """
+        if manifest is None:
+            return None
+
+        if manifest.target != parameters.target:
+            self._logger.info(
+                "Target changed, rebuilding from scratch (name=%s)", parameters.name
+            )
+            return None
+
+        if not self._container_manager.image_exists(manifest.image):
+            self._logger.warning(
+                "Previous image is gone, rebuilding from scratch (image=%s)",
+                manifest.image,
+            )
+            return None
+
+        # A previous build on an older base would keep its stale packages
+        base_digest = self._container_manager.get_image_digest(base_image)
+        if manifest.base_digest is None or manifest.base_digest != base_digest:
+            self._logger.info(
+                "Base image changed, rebuilding from scratch (name=%s, image=%s)",
+                parameters.name,
+                base_image,
+            )
+            return None
+
+        return manifest
+
+    def _commit_result(
+        self,
+        container_id: str,
+        name: str,
+        cached_image: Optional[str],
+        squash: bool,
+    ) -> str:
+        """
+        Store the finished build as `image_repository:name`.
+        """
+        repository = self._configuration.image_repository
+
+        if squash:
+            self._container_manager.squash_application(container_id, repository, name)
+
+        # A cached image already holds exactly this container's contents
+        elif cached_image is not None:
+            self._container_manager.tag_image(cached_image, repository, name)
+        else:
+            self._container_manager.commit_application(container_id, repository, name)
+
+        return f"{repository}:{name}"
+
+    def _apply_package_delta(
+        self,
+        container_id: str,
+        installed: List[str],
+        packages: List[str],
+        output: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        """
+        Install and purge packages so a previous build matches a new list.
+        """
+        added = sorted(set(packages) - set(installed))
+        removed = sorted(set(installed) - set(packages))
+
+        self._logger.info(
+            "Applying package delta (added=%s, removed=%s)", added, removed
+        )
+
+        if removed:
+            self._run_apt(
+                container_id,
+                "apt-get purge -y " + " ".join(removed) + " && apt-get autoremove -y",
+                output,
+            )
+
+        self._install_packages(container_id, added, output)
+
+    def _install_packages(
+        self,
+        container_id: str,
+        packages: List[str],
+        output: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        """
+        Install packages in a build container.
+        """
+        if not packages:
+            return
+
+        self._logger.info("Installing packages (packages=%s)", packages)
+
+        self._run_apt(
+            container_id,
+            "apt-get update && apt-get install -y --no-install-recommends "
+            + " ".join(packages),
+            output,
+        )
+
+    def _run_apt(
+        self,
+        container_id: str,
+        script: str,
+        output: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        """
+        Run an APT shell script in a build container.
+        """
+        exit_code, result = self._container_manager.execute_in_application(
+            container_id,
+            f"sh -c '{script}'",
+            environment={"DEBIAN_FRONTEND": "noninteractive"},
+            output=output,
+        )
+
+        if exit_code != 0:
+            raise OSBuildFailedError(
+                f"Package operation failed with exit code {exit_code}: "
+                f"{result[-2000:]}"
+            )
@@ -0,0 +1,18 @@
+"""
+Enums for OS builder service.
+"""
+
+# Imports from standard library
+from enum import Enum
+
+
+# ------------------------------------
+# Enums
+# ------------------------------------
+
+
+class OSBuildStatus(Enum):
+    """OS build statuses"""
+
+    SUCCESS = "SUCCESS"
+    FAILED = "FAILED"
@@ -64,3 +64,21 @@ class OSBuildArchitectureNotSupportedError(InvalidOSBuildConfigError):
     """
     Exception for OS build architecture not supported.
     """
+
+
+class InvalidOSBuildNameError(InvalidOSBuildConfigError):
+    """
+    Exception for OS build names unsafe as container or file names.
+    """
+
+
+class InvalidPackageError(InvalidOSBuildConfigError):
+    """
+    Exception for package names unsafe to pass to apt-get.
+    """
+
+
+class UnknownPackageError(InvalidOSBuildConfigError):
+    """
+    Exception for packages missing from the target's package index.
+    """
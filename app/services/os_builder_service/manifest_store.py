@@ -0,0 +1,61 @@
+"""
+Module for persisting build manifests.
+"""
+
+# Imports from standard library
+import json
+import os
+import threading
+from dataclasses import asdict
+from typing import Optional
+
+# Imports from local modules
+from .models import BuildManifest
+
+
+class ManifestStore:
+    """
+    Build manifests stored as one JSON file per OS name.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        self._lock = threading.Lock()
+
+        os.makedirs(self._path, exist_ok=True)
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self._path, f"{name}.json")
+
+    def get(self, name: str) -> Optional[BuildManifest]:
+        """
+        Get the manifest of an OS, None if it was never built.
+        """
+        try:
+            with open(self._file(name), "r", encoding="utf-8") as f:
+                return BuildManifest(**json.load(f))
+        except FileNotFoundError:
+            return None
+        except (ValueError, TypeError):
+            return None
+
+    def put(self, manifest: BuildManifest) -> None:
+        """
+        Save the manifest of an OS.
+        """
+        path = self._file(manifest.name)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+
+        with self._lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(asdict(manifest), f, indent=2)
+            os.replace(tmp_path, path)
+
+    def delete(self, name: str) -> None:
+        """
+        Delete the manifest of an OS.
+        """
+        try:
+            os.unlink(self._file(name))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,103 @@
+"""
+Module for stripping built OSes of files they do not need at runtime.
+"""
+
+# Imports from standard library
+import re
+from typing import Iterable, List
+
+
+# Steps in the order they run
+MINIMIZE_STEPS = ("apt_cache", "apt_lists", "docs", "man_pages", "locales")
+
+# Keeps dpkg from installing excluded paths again on incremental rebuilds
+DPKG_CONFIG = "/etc/dpkg/dpkg.cfg.d/linux-builder-minimize"
+
+_LOCALE = re.compile(r"^[A-Za-z0-9_.@-]+$")
+
+
+def _in_directory(path: str, command: str) -> str:
+    return f"if [ -d {path} ]; then {command}; fi"
+
+
+def minimize_script(steps: Iterable[str], keep_locales: Iterable[str] = ()) -> str:
+    """
+    Shell script running the given steps in a build:
+    - apt_cache: downloaded packages and APT's package caches
+    - apt_lists: package lists, fetched again by the next `apt-get update`
+    - docs: /usr/share/doc, except copyright files
+    - man_pages: manual and info pages
+    - locales: translations, except `keep_locales`
+
+    The script holds no single quotes, so it can be wrapped in them.
+
+    Raises:
+        ValueError: If a step or locale is unknown
+    """
+    steps = set(steps)
+    unknown = steps - set(MINIMIZE_STEPS)
+    if unknown:
+        raise ValueError(
+            f"Unknown minimize steps {sorted(unknown)}, use {list(MINIMIZE_STEPS)}"
+        )
+
+    keep_locales = list(keep_locales)
+    for locale in keep_locales:
+        if not _LOCALE.match(locale):
+            raise ValueError(f"Invalid locale {locale!r}")
+
+    excludes: List[str] = []
+    commands: List[str] = []
+
+    if "apt_cache" in steps:
+        commands.append("apt-get clean")
+
+    if "apt_lists" in steps:
+        commands.append("rm -rf /var/lib/apt/lists/*")
+
+    if "docs" in steps:
+        excludes += [
+            "path-exclude=/usr/share/doc/*",
+            "path-include=/usr/share/doc/*/copyright",
+        ]
+        commands.append(
+            _in_directory(
+                "/usr/share/doc",
+                "find /usr/share/doc -mindepth 1 ! -type d ! -name copyright -delete"
+                " && find /usr/share/doc -mindepth 1 -type d -empty -delete",
+            )
+        )
+
+    if "man_pages" in steps:
+        excludes += [
+            "path-exclude=/usr/share/man/*",
+            "path-exclude=/usr/share/info/*",
+            "path-exclude=/usr/share/groff/*",
+        ]
+        commands.append("rm -rf /usr/share/man/* /usr/share/info/* /usr/share/groff/*")
+
+    if "locales" in steps:
+        excludes.append("path-exclude=/usr/share/locale/*")
+        excludes += [
+            f"path-include=/usr/share/locale/{locale}/*" for locale in keep_locales
+        ]
+        excludes.append("path-include=/usr/share/locale/locale.alias")
+        kept = "".join(f" ! -name {locale}" for locale in keep_locales)
+        commands.append(
+            _in_directory(
+                "/usr/share/locale",
+                "find /usr/share/locale -mindepth 1 -maxdepth 1"
+                f"{kept} ! -name locale.alias -exec rm -rf {{}} +",
+            )
+        )
+
+    # Rewritten every time, so it always matches the current policy
+    if excludes:
+        lines = " ".join(f'"{line}"' for line in excludes)
+        setup = (
+            f'mkdir -p /etc/dpkg/dpkg.cfg.d && printf "%s\\n" {lines} > {DPKG_CONFIG}'
+        )
+    else:
+        setup = f"rm -f {DPKG_CONFIG}"
+
+    return " && ".join([setup] + commands)
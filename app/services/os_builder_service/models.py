@@ -3,16 +3,83 @@ Module for OS builder service models.
 """
 
 # imports from standard library
-from dataclasses import dataclass
-from typing import List
+import hashlib
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Tuple
 
 # imports from local modules exceptions
 from app.services.os_builder_service.exceptions import (
     OSBuildDistroNotSupportedError,
     OSBuildReleaseNotSupportedError,
     OSBuildArchitectureNotSupportedError,
+    InvalidOSBuildNameError,
+    InvalidPackageError,
 )
 
+# imports from local modules enums
+from app.services.os_builder_service.enums import OSBuildStatus
+
+
+SUPPORTED_DISTROS = ("ubuntu", "debian")
+SUPPORTED_RELEASES = ("20.04", "22.04", "24.04", "latest")
+SUPPORTED_ARCHITECTURES = ("amd64", "arm64")
+
+# Build target of a container, as `distro:release/architecture`
+TARGET_LABEL = "linux_builder.target"
+
+# Names end up in container names, shell commands and artifact paths
+BUILD_NAME = re.compile(r"^[a-zA-Z0-9][a-zA-Z0-9_.-]*$")
+
+# A Debian package name with an optional `=version`, `:arch` or `/release`
+PACKAGE = re.compile(r"^[a-z0-9][a-z0-9+.-]+([=:/][A-Za-z0-9+.~:/-]+)?$")
+
+
+def validate_target(distro: str, release: str, architecture: str) -> None:
+    """
+    Check a build target is supported.
+
+    Raises:
+        OSBuildDistroNotSupportedError: If the distro is not supported
+        OSBuildReleaseNotSupportedError: If the release is not supported
+        OSBuildArchitectureNotSupportedError: If the architecture is not supported
+    """
+    if distro not in SUPPORTED_DISTROS:
+        raise OSBuildDistroNotSupportedError(f"Distro {distro} not supported")
+
+    if release not in SUPPORTED_RELEASES:
+        raise OSBuildReleaseNotSupportedError(f"Release {release} not supported")
+
+    if architecture not in SUPPORTED_ARCHITECTURES:
+        raise OSBuildArchitectureNotSupportedError(
+            f"Architecture {architecture} not supported"
+        )
+
+
+def parse_target(spec: str) -> Tuple[str, str, str]:
+    """
+    Parse and validate a `distro:release/architecture` target.
+    """
+    try:
+        image, architecture = spec.split("/")
+        distro, release = image.split(":")
+    except ValueError:
+        raise ValueError(
+            f"Target {spec!r} is not in the form distro:release/architecture"
+        ) from None
+
+    validate_target(distro, release, architecture)
+    return (distro, release, architecture)
+
+
+def format_target(target: Tuple[str, str, str]) -> str:
+    """
+    Format a target as `distro:release/architecture`.
+    """
+    distro, release, architecture = target
+    return f"{distro}:{release}/{architecture}"
+
 
 @dataclass
 class OSBuildConfig:
@@ -26,16 +93,158 @@ class OSBuildConfig:
     architecture: str
     packages: List[str]
 
-    def __post_init__(self):
-        if self.distro not in ["ubuntu", "debian"]:
-            raise OSBuildDistroNotSupportedError(f"Distro {self.distro} not supported")
+    # Build backend, None for the service's default
+    backend: Optional[str] = None
 
-        if self.release not in ["20.04", "22.04", "24.04", "latest"]:
-            raise OSBuildReleaseNotSupportedError(
-                f"Release {self.release} not supported"
+    def __post_init__(self):
+        if not BUILD_NAME.match(self.name):
+            raise InvalidOSBuildNameError(
+                f"Invalid name {self.name!r}, use letters, digits, '_', '.' and '-'"
             )
 
-        if self.architecture not in ["amd64", "arm64"]:
-            raise OSBuildArchitectureNotSupportedError(
-                f"Architecture {self.architecture} not supported"
-            )
+        for package in self.packages:
+            if not PACKAGE.match(package):
+                raise InvalidPackageError(f"Invalid package {package!r}")
+
+        validate_target(self.distro, self.release, self.architecture)
+
+    @property
+    def target(self) -> Tuple[str, str, str]:
+        """
+        Build target as (distro, release, architecture).
+        """
+        return (self.distro, self.release, self.architecture)
+
+    def cache_key(
+        self, minimize: Iterable[str] = (), keep_locales: Iterable[str] = ()
+    ) -> str:
+        """
+        Content hash of what the build installs and the minimize policy
+        stripping it.
+
+        The name is ignored and packages are sorted and deduplicated, so
+        equivalent builds share a key. Builds that are not minimized keep
+        the keys they had before minimizing existed.
+        """
+        content = {
+            "distro": self.distro,
+            "release": self.release,
+            "architecture": self.architecture,
+            "packages": sorted(set(self.packages)),
+        }
+        minimize = sorted(set(minimize))
+        if minimize:
+            content["minimize"] = minimize
+        if "locales" in minimize:
+            content["keep_locales"] = sorted(set(keep_locales))
+
+        canonical = json.dumps(content, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class OSBuilderServiceConfig:
+    """
+    Configuration for OS builder service.
+    """
+
+    backend: str = "docker"
+    max_workers: int = 4
+    max_builds_per_target: int = 1
+    image_repository: str = "linux_builder/os"
+    manifest_path: str = "cache/manifests"
+    export_after_build: bool = False
+
+    # Running base containers kept per target; 0 disables the pool
+    warm_pool_size: int = 0
+    warm_pool_targets: List[str] = field(default_factory=list)
+    warm_pool_max_idle: float = 600.0
+
+    # APT Packages indexes for pre-flight checks, see PackageIndexStore;
+    # None skips the checks
+    package_index_path: Optional[str] = None
+    package_index_fetch: bool = False
+    package_index_mirror: Optional[str] = None
+    package_index_components: List[str] = field(default_factory=lambda: ["main"])
+    package_index_max_age: float = 86400.0
+
+    # Steps stripping Docker builds before commit, see minimize_script;
+    # empty keeps builds as installed
+    minimize: List[str] = field(default_factory=list)
+    minimize_keep_locales: List[str] = field(default_factory=lambda: ["en"])
+    # Commit Docker builds as a single layer
+    squash: bool = False
+    # Incremental rebuilds add a layer each; results past this many layers
+    # are squashed, well below overlayfs' limit of about 127
+    max_layers: int = 64
+
+
+@dataclass
+class ChrootBackendConfig:
+    """
+    Configuration for the chroot backend.
+
+    Every build gets its own root under `root_path`, on a tmpfs of
+    `tmpfs_size` unless `tmpfs` is off. `mirror` replaces each distro's
+    default archive, e.g. `file:///srv/mirror` for a local mirror. Commands
+    run through sudo when `use_sudo` is on and time out after
+    `command_timeout` seconds.
+    """
+
+    root_path: str = "cache/chroot"
+    tmpfs: bool = True
+    tmpfs_size: str = "4G"
+    mirror: Optional[str] = None
+    variant: str = "minbase"
+    use_sudo: bool = False
+    command_timeout: int = 3600
+
+
+@dataclass
+class OSBuildResult:
+    """
+    Result of a build scheduled through OSBuilderService.build_many.
+    """
+
+    config: OSBuildConfig
+    status: OSBuildStatus
+    queued_time: float
+    started_at: float
+    duration: float
+    result: Optional[str] = None
+    error: Optional[Exception] = None
+
+
+@dataclass
+class PackageResolution:
+    """
+    Packages a build installs and their estimated size in bytes.
+
+    `packages` is the dependency closure of the requested packages, less
+    the packages every base image has.
+    """
+
+    packages: List[str]
+    download_size: int
+    installed_size: int
+
+
+@dataclass
+class BuildManifest:
+    """
+    Record of the last successful build of a named OS.
+    """
+
+    name: str
+    distro: str
+    release: str
+    architecture: str
+    base_image: str
+    base_digest: Optional[str]
+    image: str
+    packages: List[str] = field(default_factory=list)
+    updated_at: float = 0.0
+
+    @property
+    def target(self) -> Tuple[str, str, str]:
+        return (self.distro, self.release, self.architecture)
@@ -3,48 +3,193 @@ Module for OS builder service.
 """
 
 # Imports from standard library
-from typing import TYPE_CHECKING
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+)
 
 # Imports from local modules
-from .models import OSBuildConfig
+from .docker_backend import DockerBackend
+from .enums import OSBuildStatus
+from .models import (
+    OSBuildConfig,
+    OSBuilderServiceConfig,
+    OSBuildResult,
+    PackageResolution,
+)
+from .package_index import PackageIndexStore
+from .protocols import BuildBackend
 from .exceptions import (
-    OSBuildAlreadyExistsError,
+    InvalidOSBuildConfigError,
+    OSBuildFailedError,
+    OSBuildNotStartedError,
 )
 
 # Imports from services modules
-from app.services.container_manager import (
-    ContainerManagerService,
-    ContainerConfig,
-)
+from app.services.container_manager import ContainerManagerService
+from app.services.metrics_service import MetricsService
 
 if TYPE_CHECKING:
 
     # Imports from standard library
     import logging
 
-    # Imports from third party libraries
-    import docker
+    from concurrent.futures import Future
+
+    # Imports from services modules
+    from app.services.image_cache_service import ImageCacheService
+    from app.services.export_service import ExportService, ExportResult
+    from app.services.artifact_store_service import (
+        ArtifactStoreService,
+        ArtifactManifest,
+    )
 
 
 class OSBuilderService:
     """
     Service for building OS.
+
+    Builds run on a backend: "docker" builds images in containers, and
+    further backends, e.g. "chroot", are passed in by name. A build uses
+    its config's backend, or the configured default.
     """
 
     def __init__(
         self,
         logger: "logging.Logger",
         container_manager: "ContainerManagerService",
+        configuration: OSBuilderServiceConfig = None,
+        image_cache: "ImageCacheService" = None,
+        exporter: "ExportService" = None,
+        artifact_store: "ArtifactStoreService" = None,
+        metrics: Optional[MetricsService] = None,
+        backends: Optional[Dict[str, BuildBackend]] = None,
+        package_index: Optional[PackageIndexStore] = None,
     ):
         self._logger = logger.getChild("OSBuilderService")
         self._container_manager = container_manager
+        self._configuration = configuration or OSBuilderServiceConfig()
+        self._image_cache = image_cache
+        self._exporter = exporter
+        self._artifact_store = artifact_store
+
+        self._logger.debug("OSBuilderServiceConfig: %s", self._configuration)
+
+        self._metrics = metrics or MetricsService(logger)
+        self._builds_in_flight = self._metrics.gauge(
+            "builds_in_flight", "Builds currently running"
+        )
+        self._build_seconds = self._metrics.histogram(
+            "build_duration_seconds", "Duration of whole builds", ["status"]
+        )
+        self._builds = self._metrics.counter(
+            "builds_total", "Finished builds by status", ["status"]
+        )
+
+        self._docker = DockerBackend(
+            logger,
+            container_manager,
+            self._configuration,
+            image_cache=image_cache,
+            metrics=self._metrics,
+        )
+        self._backends: Dict[str, BuildBackend] = {
+            "docker": self._docker,
+            **(backends or {}),
+        }
+
+        self._package_index = package_index
+        if (
+            package_index is None
+            and self._configuration.package_index_path is not None
+        ):
+            self._package_index = PackageIndexStore(
+                logger,
+                self._configuration.package_index_path,
+                fetch=self._configuration.package_index_fetch,
+                mirror=self._configuration.package_index_mirror,
+                components=self._configuration.package_index_components,
+                max_age=self._configuration.package_index_max_age,
+            )
 
         self._logger.info("OSBuilderService initialized")
 
-    def build_os(self, parameters: OSBuildConfig) -> str:
+    @property
+    def backends(self) -> List[str]:
+        return list(self._backends)
+
+    def start(self) -> None:
+        """
+        Start every backend's background work, e.g. the Docker warm pool.
+        """
+        for backend in self._backends.values():
+            backend.start()
+
+    def stop(self) -> None:
+        """
+        Stop every backend, removing the Docker warm pool's idle containers.
+        """
+        for backend in self._backends.values():
+            backend.stop()
+
+    def remove_leftovers(self, parameters: OSBuildConfig) -> None:
+        """
+        Clean up after earlier attempts at a build that were cut short, so
+        it can be retried.
+        """
+        backend = self._backends.get(
+            parameters.backend or self._configuration.backend
+        )
+        if backend is not None:
+            backend.remove_leftovers(parameters.name)
+
+    def build_os(
+        self,
+        parameters: OSBuildConfig,
+        checkpoint: Optional[Callable[[], None]] = None,
+        output: Optional[Callable[[str], None]] = None,
+    ) -> str:
         """
         Build an OS.
+
+        With the Docker backend, a rebuild of a name with a manifest for
+        the same target starts from the previous result and only installs
+        or purges the packages that changed. The result is committed as
+        `image_repository:name`.
+
+        `checkpoint` is called between phases; it stops the build by
+        raising, e.g. OSBuildCancelledError or OSBuildTimeoutError.
+        `output` receives the package manager's output line by line.
+
+        Raises:
+            InvalidOSBuildConfigError: If the backend is not available
+            UnknownPackageError: If a package is not in the package index
         """
+        backend_name = parameters.backend or self._configuration.backend
+        backend = self._backends.get(backend_name)
+        if backend is None:
+            raise InvalidOSBuildConfigError(
+                f"Backend {backend_name} not available, use one of {self.backends}"
+            )
+
+        resolution = self.resolve_packages(parameters)
+        if resolution is not None:
+            self._logger.info(
+                "Resolved packages (name=%s, packages=%d, download=%d, installed=%d)",
+                parameters.name,
+                len(resolution.packages),
+                resolution.download_size,
+                resolution.installed_size,
+            )
+
         self._logger.info(
             "Building OS (name=%s, distro=%s, release=%s, architecture=%s, packages=%s)",
             parameters.name,
@@ -54,25 +199,156 @@ class OSBuilderService:
             parameters.packages,
         )
 
-        # Check if the OS already exists
-        if self._container_manager.application_exists(parameters.name):
-            raise OSBuildAlreadyExistsError(
-                f"OS with name={parameters.name} already exists"
-            )
+        started = time.perf_counter()
+        status = OSBuildStatus.FAILED
+        self._builds_in_flight.inc()
 
-        packages = " ".join(parameters.packages)
-
-        # Build the OS
-        self._container_manager.deploy_application(
-            ContainerConfig(
-                image=f"{parameters.distro}:{parameters.release}",
-                name=parameters.name,
-                command="sleep infinity",
-                detach=True,
-                remove=False,
-                tty=True,
-                stdin_open=True,
+        try:
+            result = backend.build(parameters, checkpoint or (lambda: None), output)
+            if backend is self._docker and self._configuration.export_after_build:
+                self.export_os(parameters.name)
+            status = OSBuildStatus.SUCCESS
+            return result
+        finally:
+            self._builds_in_flight.dec()
+            self._builds.inc(status=status.value)
+            self._build_seconds.observe(
+                time.perf_counter() - started, status=status.value
             )
+
+    def resolve_packages(
+        self, parameters: OSBuildConfig
+    ) -> Optional[PackageResolution]:
+        """
+        Resolve a build's packages against its target's package index
+        without starting anything.
+
+        Returns:
+            Packages the build installs and their estimated size, None
+            without a package index for the target
+
+        Raises:
+            UnknownPackageError: If a package is not in the package index
+        """
+        if self._package_index is None:
+            return None
+
+        return self._package_index.resolve(
+            parameters.distro,
+            parameters.release,
+            parameters.architecture,
+            parameters.packages,
         )
 
-        return "OS built"
+    def export_os(self, name: str, format: Optional[str] = None) -> "ExportResult":
+        """
+        Export a built OS's root filesystem to a compressed tarball.
+
+        Raises:
+            OSBuildNotStartedError: If no OS with the name exists
+        """
+        if self._exporter is None:
+            raise OSBuildFailedError("No exporter configured")
+
+        if not self._container_manager.application_exists(name):
+            raise OSBuildNotStartedError(f"OS with name={name} does not exist")
+
+        with self._metrics.span("export"):
+            return self._exporter.export_container(name, name, format)
+
+    def store_os(self, name: str) -> "ArtifactManifest":
+        """
+        Export a built OS's root filesystem into the deduplicating store.
+
+        Raises:
+            OSBuildNotStartedError: If no OS with the name exists
+        """
+        if self._artifact_store is None:
+            raise OSBuildFailedError("No artifact store configured")
+
+        if not self._container_manager.application_exists(name):
+            raise OSBuildNotStartedError(f"OS with name={name} does not exist")
+
+        with self._metrics.span("store"):
+            return self._artifact_store.put_container(name, name)
+
+    def build_many(self, configs: Iterable[OSBuildConfig]) -> Iterator[OSBuildResult]:
+        """
+        Build several OSes on a bounded worker pool.
+
+        At most `max_workers` builds run at once and at most
+        `max_builds_per_target` of them share the same (distro, release,
+        architecture). Results are yielded as builds finish, not in
+        submission order. A failed build is reported in its result and
+        does not stop the others.
+        """
+        pending = deque(configs)
+        if not pending:
+            return
+
+        max_workers = max(1, self._configuration.max_workers)
+        max_per_target = max(1, self._configuration.max_builds_per_target)
+
+        self._logger.info(
+            "Scheduling %s builds (max_workers=%s, max_builds_per_target=%s)",
+            len(pending),
+            max_workers,
+            max_per_target,
+        )
+
+        queued_at = time.monotonic()
+        running: Dict["Future", OSBuildConfig] = {}
+        active: Counter = Counter()
+
+        with ThreadPoolExecutor(
+            max_workers=min(max_workers, len(pending)),
+            thread_name_prefix="OSBuilder",
+        ) as executor:
+            while pending or running:
+
+                # Start every pending build whose target still has a free slot
+                deferred = deque()
+                while pending and len(running) < max_workers:
+                    config = pending.popleft()
+                    if active[config.target] >= max_per_target:
+                        deferred.append(config)
+                        continue
+
+                    active[config.target] += 1
+                    future = executor.submit(self._timed_build, config, queued_at)
+                    running[future] = config
+
+                pending.extendleft(reversed(deferred))
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    config = running.pop(future)
+                    active[config.target] -= 1
+                    yield future.result()
+
+    def _timed_build(self, parameters: OSBuildConfig, queued_at: float) -> OSBuildResult:
+        """
+        Run build_os and capture its outcome and timings.
+        """
+        started = time.monotonic()
+        started_at = time.time()
+        result = None
+        error = None
+
+        try:
+            result = self.build_os(parameters)
+            status = OSBuildStatus.SUCCESS
+        except Exception as e:
+            self._logger.error("Build failed (name=%s): %s", parameters.name, e)
+            status = OSBuildStatus.FAILED
+            error = e
+
+        return OSBuildResult(
+            config=parameters,
+            status=status,
+            queued_time=started - queued_at,
+            started_at=started_at,
+            duration=time.monotonic() - started,
+            result=result,
+            error=error,
+        )
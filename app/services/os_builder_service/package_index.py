@@ -0,0 +1,476 @@
+"""
+Module for resolving packages against APT package indexes.
+"""
+
+# Imports from standard library
+import array
+import bz2
+import gzip
+import lzma
+import mmap
+import os
+import re
+import shutil
+import struct
+import threading
+import time
+import urllib.request
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Imports from local modules
+from .chroot_backend import MIRRORS, release_codename
+from .exceptions import UnknownPackageError
+from .models import PackageResolution
+
+if TYPE_CHECKING:
+
+    # Imports from standard library
+    import logging
+
+
+# Header: magic, packages, dependency clauses, alternatives, name bytes
+_HEADER = struct.Struct("<8sIIII")
+_MAGIC = b"APTIDX01"
+
+# Package flags
+_VIRTUAL = 1
+_BASE = 2
+
+_RETRY_INTERVAL = 300.0
+
+_NAME = re.compile(r"\s*([A-Za-z0-9][A-Za-z0-9+.-]*)")
+
+_FIELDS = (
+    "Package",
+    "Priority",
+    "Essential",
+    "Pre-Depends",
+    "Depends",
+    "Provides",
+    "Size",
+    "Installed-Size",
+)
+
+_OPENERS = {".gz": gzip.open, ".xz": lzma.open, ".lzma": lzma.open, ".bz2": bz2.open}
+
+
+def _relations(value: str) -> List[List[str]]:
+    """
+    Parse a relationship field into clauses of alternative package names,
+    dropping version constraints and architecture qualifiers.
+    """
+    clauses = []
+    for clause in value.split(","):
+        alternatives = []
+        for alternative in clause.split("|"):
+            match = _NAME.match(alternative)
+            if match is not None:
+                alternatives.append(match.group(1).lower())
+        if alternatives:
+            clauses.append(alternatives)
+    return clauses
+
+
+def _stanzas(path: str) -> Iterator[Dict[str, str]]:
+    """
+    Read the fields of a `Packages` file this module uses, stanza by stanza.
+    """
+    opener = _OPENERS.get(os.path.splitext(path)[1], open)
+    with opener(path, "rt", encoding="utf-8", errors="replace") as f:
+        stanza: Dict[str, str] = {}
+        for line in f:
+            if not line.strip():
+                if stanza:
+                    yield stanza
+                    stanza = {}
+                continue
+            if line[0] in " \t":
+                # Continuation of a multi-line field, e.g. Description
+                continue
+            key, _, value = line.partition(":")
+            if key in _FIELDS:
+                stanza[key] = value.strip()
+        if stanza:
+            yield stanza
+
+
+def _is_source(name: str) -> bool:
+    """
+    Whether a file name is that of a `Packages` file this module can read.
+    """
+    stem, extension = os.path.splitext(name)
+    if extension in _OPENERS:
+        return stem.endswith("Packages")
+    return name.endswith("Packages")
+
+
+def _size(value: Optional[str], limit: int) -> int:
+    try:
+        return min(max(int(value), 0), limit)
+    except (TypeError, ValueError):
+        return 0
+
+
+def compile_index(sources: Iterable[str], path: str) -> int:
+    """
+    Compile APT `Packages` files, plain or compressed, into an index file.
+
+    A package in several sources keeps its last stanza. Names only
+    provided by other packages become virtual packages depending on any
+    of their providers.
+
+    Returns:
+        Number of names in the index
+    """
+    records: Dict[str, Tuple[int, int, int, List[List[str]]]] = {}
+    providers: Dict[str, List[str]] = {}
+
+    for source in sources:
+        for stanza in _stanzas(source):
+            name = stanza.get("Package", "").lower()
+            if not name:
+                continue
+
+            base = (
+                stanza.get("Essential") == "yes"
+                or stanza.get("Priority") == "required"
+            )
+            records[name] = (
+                _size(stanza.get("Size"), 2**64 - 1),
+                _size(stanza.get("Installed-Size"), 2**32 - 1),
+                _BASE if base else 0,
+                _relations(stanza.get("Pre-Depends", ""))
+                + _relations(stanza.get("Depends", "")),
+            )
+            for clause in _relations(stanza.get("Provides", "")):
+                for virtual in clause:
+                    provided_by = providers.setdefault(virtual, [])
+                    if name not in provided_by:
+                        provided_by.append(name)
+
+    names = sorted(set(records) | set(providers))
+    ids = {name: i for i, name in enumerate(names)}
+
+    download = array.array("Q")
+    installed = array.array("I")
+    name_offsets = array.array("I", [0])
+    dependency_starts = array.array("I", [0])
+    clause_starts = array.array("I", [0])
+    alternatives = array.array("I")
+    flags = bytearray()
+    strings = bytearray()
+
+    for name in names:
+        record = records.get(name)
+        if record is None:
+            record = (0, 0, _VIRTUAL, [providers[name]])
+        size, installed_size, flag, relations = record
+
+        download.append(size)
+        installed.append(installed_size)
+        flags.append(flag)
+
+        # Relations to names no source has cannot be resolved and are left out
+        for clause in relations:
+            resolved = [ids[other] for other in clause if other in ids]
+            if resolved:
+                alternatives.extend(resolved)
+                clause_starts.append(len(alternatives))
+        dependency_starts.append(len(clause_starts) - 1)
+
+        strings += name.encode("utf-8")
+        name_offsets.append(len(strings))
+
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(
+            _HEADER.pack(
+                _MAGIC,
+                len(names),
+                len(clause_starts) - 1,
+                len(alternatives),
+                len(strings),
+            )
+        )
+        # 8-byte items first keep every section aligned
+        for section in (
+            download,
+            installed,
+            name_offsets,
+            dependency_starts,
+            clause_starts,
+            alternatives,
+        ):
+            section.tofile(f)
+        f.write(flags)
+        f.write(strings)
+    os.replace(tmp_path, path)
+
+    return len(names)
+
+
+class PackageIndex:
+    """
+    Package index memory-mapped from a file written by `compile_index`.
+
+    Every table is an array read in place: names are binary searched in
+    the sorted name table and dependencies are offsets into flat arrays,
+    so opening an index parses nothing and its pages are shared by every
+    process mapping it. Arrays use the host's byte order; index files are
+    local caches, not for exchange.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, count, clauses, alternatives, strings = _HEADER.unpack_from(self._mmap)
+        if magic != _MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a package index")
+
+        view = memoryview(self._mmap)
+        offset = _HEADER.size
+
+        def section(format: str, length: int) -> memoryview:
+            nonlocal offset
+            size = length * array.array(format).itemsize
+            part = view[offset : offset + size].cast(format)
+            offset += size
+            return part
+
+        self._count = count
+        self._download = section("Q", count)
+        self._installed = section("I", count)
+        self._name_offsets = section("I", count + 1)
+        self._dependency_starts = section("I", count + 1)
+        self._clause_starts = section("I", clauses + 1)
+        self._alternatives = section("I", alternatives)
+        self._flags = section("B", count)
+        self._strings = section("B", strings)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, name: str) -> bool:
+        return self._find(name) >= 0
+
+    def resolve(self, packages: Iterable[str]) -> PackageResolution:
+        """
+        Dependency closure of packages and its estimated size.
+
+        Version constraints are ignored and the first alternative of a
+        dependency is taken, as apt does when none is installed yet.
+        Essential and required packages count as installed already.
+
+        Raises:
+            UnknownPackageError: If a package is not in the index
+        """
+        missing = []
+        pending = []
+        for package in packages:
+            # apt also takes "name=version", "name/release" and "name:arch"
+            match = _NAME.match(package)
+            i = self._find(match.group(1).lower()) if match is not None else -1
+            if i < 0:
+                missing.append(package)
+            else:
+                pending.append(i)
+
+        if missing:
+            raise UnknownPackageError(
+                f"Packages not in the package index: {', '.join(missing)}"
+            )
+
+        flags = self._flags
+        seen = set(pending)
+        selected = []
+        while pending:
+            i = pending.pop()
+            if flags[i] & _BASE:
+                continue
+            selected.append(i)
+
+            for clause in range(
+                self._dependency_starts[i], self._dependency_starts[i + 1]
+            ):
+                alternatives = self._alternatives[
+                    self._clause_starts[clause] : self._clause_starts[clause + 1]
+                ]
+                if any(a in seen or flags[a] & _BASE for a in alternatives):
+                    continue
+                seen.add(alternatives[0])
+                pending.append(alternatives[0])
+
+        selected = [i for i in selected if not flags[i] & _VIRTUAL]
+        return PackageResolution(
+            packages=sorted(self._name(i) for i in selected),
+            download_size=sum(self._download[i] for i in selected),
+            installed_size=sum(self._installed[i] for i in selected) * 1024,
+        )
+
+    def _name(self, i: int) -> str:
+        start, end = self._name_offsets[i], self._name_offsets[i + 1]
+        return bytes(self._strings[start:end]).decode("utf-8")
+
+    def _find(self, name: str) -> int:
+        """
+        Position of a name, -1 if missing.
+        """
+        key = name.encode("utf-8")
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            start = self._name_offsets[middle]
+            current = bytes(self._strings[start : self._name_offsets[middle + 1]])
+            if current < key:
+                low = middle + 1
+            elif current > key:
+                high = middle
+            else:
+                return middle
+        return -1
+
+
+class PackageIndexStore:
+    """
+    Package indexes per target, compiled from APT `Packages` files.
+
+    The sources of a target are the files in
+    `<path>/<distro>/<release>/<architecture>/`, plain or compressed, e.g.
+    copied from a host's /var/lib/apt/lists. They are compiled on first
+    use to `<path>/<distro>-<release>-<architecture>.index`, and again
+    when a source changes. With `fetch` on, each component's
+    `Packages.gz` is downloaded from `mirror`, or else the distro's
+    archive, when missing or older than `max_age` seconds; `file://`
+    mirrors work too.
+    """
+
+    def __init__(
+        self,
+        logger: "logging.Logger",
+        path: str,
+        fetch: bool = False,
+        mirror: Optional[str] = None,
+        components: Iterable[str] = ("main",),
+        max_age: float = 86400.0,
+    ):
+        self._logger = logger.getChild("PackageIndexStore")
+        self._path = path
+        self._fetch = fetch
+        self._mirror = mirror
+        self._components = list(components)
+        self._max_age = max_age
+
+        self._lock = threading.Lock()
+        self._target_locks: Dict[Tuple[str, str, str], threading.Lock] = {}
+        self._indexes: Dict[Tuple[str, str, str], Tuple[float, PackageIndex]] = {}
+
+        # Failed downloads by file, retried after `_RETRY_INTERVAL` seconds
+        self._failed: Dict[str, float] = {}
+
+        os.makedirs(self._path, exist_ok=True)
+
+    def get(
+        self, distro: str, release: str, architecture: str
+    ) -> Optional[PackageIndex]:
+        """
+        Index of a target, None if it has no sources.
+        """
+        target = (distro, release, architecture)
+        with self._lock:
+            lock = self._target_locks.setdefault(target, threading.Lock())
+
+        # Compiling takes seconds; other targets stay available meanwhile
+        with lock:
+            directory = os.path.join(self._path, distro, release, architecture)
+            if self._fetch:
+                self._download(directory, distro, release, architecture)
+
+            try:
+                sources = [
+                    entry.path
+                    for entry in os.scandir(directory)
+                    if entry.is_file() and _is_source(entry.name)
+                ]
+            except FileNotFoundError:
+                sources = []
+            if not sources:
+                return None
+
+            path = os.path.join(self._path, f"{distro}-{release}-{architecture}.index")
+            newest = max(os.path.getmtime(source) for source in sources)
+
+            if not os.path.exists(path) or os.path.getmtime(path) < newest:
+                started = time.monotonic()
+                count = compile_index(sorted(sources), path)
+                self._logger.info(
+                    "Compiled package index (path=%s, packages=%d, %.1fs)",
+                    path,
+                    count,
+                    time.monotonic() - started,
+                )
+
+            # A replaced index stays mapped until its last reader is done
+            modified = os.path.getmtime(path)
+            cached = self._indexes.get(target)
+            if cached is None or cached[0] != modified:
+                cached = self._indexes[target] = (modified, PackageIndex(path))
+            return cached[1]
+
+    def resolve(
+        self, distro: str, release: str, architecture: str, packages: Iterable[str]
+    ) -> Optional[PackageResolution]:
+        """
+        Resolve packages against a target's index, None if it has no
+        sources.
+
+        Raises:
+            UnknownPackageError: If a package is not in the index
+        """
+        index = self.get(distro, release, architecture)
+        if index is None:
+            return None
+        return index.resolve(packages)
+
+    def _download(
+        self, directory: str, distro: str, release: str, architecture: str
+    ) -> None:
+        """
+        Download the `Packages` files of a target that are missing or stale.
+        """
+        os.makedirs(directory, exist_ok=True)
+        mirror = (self._mirror or MIRRORS[(distro, architecture)]).rstrip("/")
+        suite = release_codename(distro, release)
+
+        for component in self._components:
+            path = os.path.join(directory, f"{component}_Packages.gz")
+            try:
+                if time.time() - os.path.getmtime(path) < self._max_age:
+                    continue
+            except FileNotFoundError:
+                pass
+            failed = self._failed.get(path)
+            if failed is not None and time.monotonic() - failed < _RETRY_INTERVAL:
+                continue
+
+            url = (
+                f"{mirror}/dists/{suite}/{component}/"
+                f"binary-{architecture}/Packages.gz"
+            )
+            tmp_path = f"{path}.tmp"
+            try:
+                with urllib.request.urlopen(url, timeout=60) as response:
+                    with open(tmp_path, "wb") as f:
+                        shutil.copyfileobj(response, f)
+                os.replace(tmp_path, path)
+                self._failed.pop(path, None)
+                self._logger.info("Downloaded package index %s", url)
+            except OSError as e:
+                self._failed[path] = time.monotonic()
+                # A stale index still catches most typos
+                self._logger.warning("Error downloading package index %s: %s", url, e)
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
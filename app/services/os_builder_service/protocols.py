@@ -0,0 +1,39 @@
+"""
+Module for OS builder service protocols.
+"""
+
+# Imports from standard library
+from typing import TYPE_CHECKING, Callable, Optional, Protocol
+
+
+if TYPE_CHECKING:
+
+    # Imports from local modules
+    from app.services.os_builder_service.models import OSBuildConfig
+
+
+class BuildBackend(Protocol):
+    """
+    Protocol for build backends.
+
+    `build` runs one build and returns a description of its result; it
+    calls `checkpoint` between phases and passes output lines to `output`.
+    Several builds may run at once on different threads.
+
+    `remove_leftovers` cleans up after builds of a name that were cut
+    short, before the build is retried. `start` and `stop` bracket the
+    background work of long-running processes, e.g. a warm pool.
+    """
+
+    def build(
+        self,
+        parameters: "OSBuildConfig",
+        checkpoint: Callable[[], None],
+        output: Optional[Callable[[str], None]] = None,
+    ) -> str: ...
+
+    def remove_leftovers(self, name: str) -> None: ...
+
+    def start(self) -> None: ...
+
+    def stop(self) -> None: ...
@@ -0,0 +1,244 @@
+"""
+Module for the pool of pre-started build containers.
+"""
+
+# Imports from standard library
+import atexit
+import threading
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Deque, Dict, Iterable, List, Optional, Tuple
+
+# Imports from local modules
+from .models import TARGET_LABEL, format_target
+
+# Imports from services modules
+from app.services.container_manager import (
+    ContainerConfig,
+    ROLE_LABEL,
+    build_container_name,
+)
+from app.services.metrics_service import MetricsService
+
+
+if TYPE_CHECKING:
+
+    # Imports from standard library
+    import logging
+
+    # Imports from third party libraries
+    import docker
+
+    # Imports from services modules
+    from app.services.container_manager import ContainerManagerService
+
+
+Target = Tuple[str, str, str]
+
+
+class WarmPool:
+    """
+    Running base containers kept ready for each build target.
+
+    Builds that start from a bare base image claim one of these and rename
+    it instead of creating and starting a container. A background thread
+    tops every target back up to `size` and removes containers that have
+    been idle for longer than `max_idle` seconds, so base images updated
+    in the meantime are picked up.
+    """
+
+    def __init__(
+        self,
+        logger: "logging.Logger",
+        container_manager: "ContainerManagerService",
+        targets: Iterable[Target],
+        size: int,
+        max_idle: float = 600.0,
+        interval: float = 5.0,
+        metrics: Optional[MetricsService] = None,
+    ):
+        self._logger = logger.getChild("WarmPool")
+        self._container_manager = container_manager
+        self._size = size
+        self._max_idle = max_idle
+        self._interval = interval
+
+        # Idle (container id, started at) per target, oldest first
+        self._idle: Dict[Target, Deque[Tuple[str, float]]] = {
+            tuple(target): deque() for target in targets
+        }
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._metrics = metrics or MetricsService(logger)
+        self._claims = self._metrics.counter(
+            "warm_pool_claims_total", "Warm container claims by result", ["result"]
+        )
+        self._idle_gauge = self._metrics.gauge(
+            "warm_pool_idle", "Idle warm containers", ["target"]
+        )
+
+    @property
+    def targets(self) -> List[Target]:
+        return list(self._idle)
+
+    def start(self) -> None:
+        """
+        Start filling the pool in the background.
+        """
+        if self._thread is not None:
+            return
+
+        self._logger.info(
+            "Starting warm pool (targets=%s, size=%s)", self.targets, self._size
+        )
+        self._thread = threading.Thread(target=self._run, name="WarmPool", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self) -> None:
+        """
+        Stop refilling and remove every idle container.
+        """
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._wake.set()
+
+        if self._thread is not None:
+            self._thread.join()
+
+        with self._lock:
+            idle = [
+                container_id
+                for entries in self._idle.values()
+                for container_id, _ in entries
+            ]
+            for entries in self._idle.values():
+                entries.clear()
+
+        for container_id in idle:
+            self._remove(container_id)
+
+    def claim(
+        self, target: Target, name: str
+    ) -> Optional["docker.models.containers.Container"]:
+        """
+        Take a running container for a target and rename it to `name`.
+
+        Returns:
+            The container, or None if the pool has none ready
+        """
+        target = tuple(target)
+        if target not in self._idle:
+            return None
+
+        while True:
+            with self._lock:
+                entries = self._idle[target]
+                entry = entries.popleft() if entries else None
+                self._update_gauge(target)
+
+            if entry is None:
+                self._claims.inc(result="miss")
+                self._wake.set()
+                return None
+
+            container_id, _ = entry
+            try:
+                container = self._container_manager.rename_application(
+                    container_id, name
+                )
+            except Exception as e:
+                # The container died or was removed behind our back
+                self._logger.warning(
+                    "Discarding warm container (container_id=%s): %s", container_id, e
+                )
+                self._remove(container_id)
+                continue
+
+            self._claims.inc(result="hit")
+            self._wake.set()
+            return container
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            # Cleared first so a claim made during the pass is not missed
+            self._wake.clear()
+
+            for target in self.targets:
+                if self._stopped.is_set():
+                    break
+                self._drain(target)
+                self._refill(target)
+
+            self._wake.wait(self._interval)
+
+    def _drain(self, target: Target) -> None:
+        """
+        Remove containers idle for longer than max_idle.
+        """
+        deadline = time.monotonic() - self._max_idle
+        expired = []
+
+        with self._lock:
+            entries = self._idle[target]
+            while entries and entries[0][1] < deadline:
+                expired.append(entries.popleft()[0])
+            self._update_gauge(target)
+
+        for container_id in expired:
+            self._logger.debug(
+                "Removing idle warm container (container_id=%s)", container_id
+            )
+            self._remove(container_id)
+
+    def _refill(self, target: Target) -> None:
+        """
+        Start containers until the target has `size` idle ones.
+        """
+        while not self._stopped.is_set():
+            with self._lock:
+                if len(self._idle[target]) >= self._size:
+                    return
+
+            try:
+                container = self._deploy(target)
+            except Exception as e:
+                self._logger.warning(
+                    "Error filling warm pool (target=%s): %s", target, e
+                )
+                return
+
+            with self._lock:
+                self._idle[target].append((container.id, time.monotonic()))
+                self._update_gauge(target)
+
+    def _deploy(self, target: Target) -> "docker.models.containers.Container":
+        distro, release, architecture = target
+        return self._container_manager.deploy_application(
+            ContainerConfig(
+                image=f"{distro}:{release}",
+                name=build_container_name(f"warm_{distro}_{release}_{architecture}"),
+                command="sleep infinity",
+                detach=True,
+                remove=False,
+                tty=True,
+                stdin_open=True,
+                platform=f"linux/{architecture}",
+                labels={TARGET_LABEL: format_target(target), ROLE_LABEL: "build"},
+            )
+        )
+
+    def _remove(self, container_id: str) -> None:
+        try:
+            self._container_manager.remove_application(container_id, force=True)
+        except Exception as e:
+            self._logger.warning(
+                "Error removing warm container (container_id=%s): %s", container_id, e
+            )
+
+    def _update_gauge(self, target: Target) -> None:
+        self._idle_gauge.set(len(self._idle[target]), target=format_target(target))
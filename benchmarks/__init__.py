@@ -0,0 +1,3 @@
+"""
+Benchmarks for linux_builder hot paths.
+"""
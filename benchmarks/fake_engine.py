@@ -0,0 +1,669 @@
+"""
+Fake Docker Engine API server for benchmarks.
+
+Serves the subset of the Engine API used by DockerService (through the
+docker SDK) and AsyncDockerService over a local unix socket, keeping
+containers, images and execs in memory. Every endpoint sleeps for a
+configurable latency before answering to model a real daemon.
+"""
+
+# Imports from standard library
+import io
+import itertools
+import json
+import os
+import queue
+import re
+import socketserver
+import struct
+import tarfile
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+
+# Latency groups and their defaults in seconds
+DEFAULT_LATENCIES = {
+    "inspect": 0.0,
+    "list": 0.0,
+    "pull": 0.0,
+    "create": 0.0,
+    "start": 0.0,
+    "stop": 0.0,
+    "remove": 0.0,
+    "exec": 0.0,
+    "commit": 0.0,
+    "export": 0.0,
+    "logs": 0.0,
+}
+
+
+def _frame(stream: int, data: bytes) -> bytes:
+    return struct.pack(">BxxxL", stream, len(data)) + data
+
+
+def _has_labels(labels: Dict[str, str], wanted: List[str]) -> bool:
+    """
+    Match Docker label filters, `key` or `key=value`.
+    """
+    for spec in wanted:
+        key, _, value = spec.partition("=")
+        if key not in labels or (value and labels[key] != value):
+            return False
+    return True
+
+
+class _EngineState:
+    """
+    In-memory containers, images and execs.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.containers: Dict[str, Dict[str, Any]] = {}
+        self.images: Dict[str, Dict[str, Any]] = {}
+        self.execs: Dict[str, Dict[str, Any]] = {}
+        self.subscribers: List["queue.Queue"] = []
+
+    def new_id(self) -> str:
+        return f"{next(self.ids):064x}"
+
+    def find_container(self, ref: str) -> Optional[Dict[str, Any]]:
+        for container in self.containers.values():
+            if ref in (container["Id"], container["Name"].lstrip("/")):
+                return container
+            if len(ref) >= 12 and container["Id"].startswith(ref):
+                return container
+        return None
+
+    def emit(self, action: str, container: Dict[str, Any], **attributes) -> None:
+        """
+        Send a container event to every open event stream.
+        """
+        event = {
+            "Type": "container",
+            "Action": action,
+            "status": action,
+            "id": container["Id"],
+            "Actor": {
+                "ID": container["Id"],
+                "Attributes": {
+                    **container["Config"]["Labels"],
+                    "image": container["Config"]["Image"],
+                    "name": container["Name"].lstrip("/"),
+                    **attributes,
+                },
+            },
+            "time": int(time.time()),
+            "timeNano": time.time_ns(),
+        }
+        for subscriber in self.subscribers:
+            subscriber.put(event)
+
+    def find_image(self, ref: str) -> Optional[Dict[str, Any]]:
+        if ":" not in ref.split("/")[-1] and not ref.startswith("sha256:"):
+            ref = f"{ref}:latest"
+        for image in self.images.values():
+            if ref == image["Id"] or ref in image["RepoTags"]:
+                return image
+        return None
+
+    def add_image(self, tag: str, size: int, parent: str = "") -> Dict[str, Any]:
+        for image in self.images.values():
+            if tag in image["RepoTags"]:
+                image["RepoTags"].remove(tag)
+
+        image_id = f"sha256:{self.new_id()}"
+        repository = tag.rpartition(":")[0]
+        layers = list(self.images[parent]["RootFS"]["Layers"]) if parent else []
+        image = {
+            "Id": image_id,
+            "RepoTags": [tag],
+            "RepoDigests": [f"{repository}@{image_id}"],
+            "Parent": parent,
+            "Size": size,
+            "Created": "2024-01-01T00:00:00Z",
+            "Os": "linux",
+            "Architecture": "amd64",
+            "Config": {"Labels": {}, "Env": []},
+            "RootFS": {"Type": "layers", "Layers": layers + [image_id]},
+        }
+        self.images[image_id] = image
+        return image
+
+
+class _EngineHandler(BaseHTTPRequestHandler):
+    """
+    Request handler for the fake engine.
+    """
+
+    protocol_version = "HTTP/1.1"
+    server: "FakeEngine"
+
+    # Unix socket peers have no address
+    def address_string(self) -> str:
+        return "fake-engine"
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self._dispatch("GET")
+
+    def do_POST(self) -> None:
+        self._dispatch("POST")
+
+    def do_DELETE(self) -> None:
+        self._dispatch("DELETE")
+
+    def do_HEAD(self) -> None:
+        self._dispatch("HEAD")
+
+    def _dispatch(self, method: str) -> None:
+        url = urlsplit(self.path)
+        path = re.sub(r"^/v[0-9.]+", "", url.path)
+        self.query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        self.query_lists = parse_qs(url.query)
+
+        if "chunked" in self.headers.get("Transfer-Encoding", ""):
+            body = self._read_chunked()
+        else:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+        self.body = json.loads(body) if body and self._is_json() else body
+
+        for pattern, handler_method, name in self.server.routes:
+            match = re.fullmatch(pattern, path)
+            if match and handler_method == method:
+                self.server.sleep(name)
+                # Streams until the client goes away, so it must not hold the lock
+                if name == "events":
+                    return self._events_get()
+                if name == "logs" and self.query.get("follow") in ("1", "true"):
+                    return self._logs_follow(*match.groups())
+                with self.server.state.lock:
+                    getattr(self, f"_{name}_{handler_method.lower()}")(*match.groups())
+                return
+
+        self._send_json(404, {"message": f"page not found: {method} {path}"})
+
+    def _read_chunked(self) -> bytes:
+        chunks = []
+        while True:
+            size = int(self.rfile.readline().split(b";")[0], 16)
+            if size == 0:
+                # Trailers end with an empty line
+                while self.rfile.readline().strip():
+                    pass
+                return b"".join(chunks)
+            chunks.append(self.rfile.read(size))
+            self.rfile.readline()
+
+    def _is_json(self) -> bool:
+        return "json" in self.headers.get("Content-Type", "")
+
+    def _send(
+        self, status: int, body: bytes = b"", content_type: str = "application/json"
+    ) -> None:
+        self.send_response(status)
+        if status not in (204, 304):
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _send_json(self, status: int, payload: Any) -> None:
+        self._send(status, json.dumps(payload).encode("utf-8"))
+
+    def _not_found(self, what: str) -> None:
+        self._send_json(404, {"message": f"No such {what}"})
+
+    @property
+    def state(self) -> _EngineState:
+        return self.server.state
+
+    # Ping
+
+    def _ping_get(self) -> None:
+        self._send(200, b"OK", "text/plain")
+
+    def _ping_head(self) -> None:
+        self._send(200, b"", "text/plain")
+
+    # Containers
+
+    def _list_get(self) -> None:
+        show_all = self.query.get("all") in ("1", "true", "True")
+        filters = json.loads(self.query.get("filters") or "{}")
+        containers = [
+            {
+                "Id": container["Id"],
+                "Names": [container["Name"]],
+                "Image": container["Config"]["Image"],
+                "ImageID": container["Image"],
+                "Labels": container["Config"]["Labels"],
+                "State": container["State"]["Status"],
+                "Status": container["State"]["Status"],
+                "Created": container["CreatedUnix"],
+            }
+            for container in self.state.containers.values()
+            if (show_all or container["State"]["Running"])
+            and _has_labels(container["Config"]["Labels"], filters.get("label", []))
+        ]
+        self._send_json(200, containers)
+
+    def _create_post(self) -> None:
+        body = self.body or {}
+        image = self.state.find_image(body.get("Image", ""))
+        if image is None:
+            return self._not_found(f"image: {body.get('Image')}")
+
+        name = self.query.get("name") or f"fake_{self.state.new_id()[:12]}"
+        if self.state.find_container(name) is not None:
+            return self._send_json(409, {"message": f"Conflict. {name} is in use"})
+
+        container_id = self.state.new_id()
+        self.state.containers[container_id] = {
+            "Id": container_id,
+            "Name": f"/{name}",
+            "Image": image["Id"],
+            "Created": "2024-01-01T00:00:00Z",
+            "CreatedUnix": int(time.time()),
+            "Config": {
+                "Image": body.get("Image"),
+                "Cmd": body.get("Cmd"),
+                "Env": body.get("Env") or [],
+                "Labels": body.get("Labels") or {},
+                "Tty": bool(body.get("Tty")),
+            },
+            "HostConfig": body.get("HostConfig") or {},
+            "State": {"Status": "created", "Running": False, "ExitCode": 0},
+            "Size": image["Size"],
+        }
+        self.state.emit("create", self.state.containers[container_id])
+        self._send_json(201, {"Id": container_id, "Warnings": []})
+
+    def _inspect_get(self, ref: str) -> None:
+        container = self.state.find_container(ref)
+        if container is None:
+            return self._not_found(f"container: {ref}")
+        self._send_json(200, container)
+
+    def _start_post(self, ref: str) -> None:
+        container = self.state.find_container(ref)
+        if container is None:
+            return self._not_found(f"container: {ref}")
+        container["State"].update(Status="running", Running=True)
+        self.state.emit("start", container)
+        self._send(204)
+
+    def _stop_post(self, ref: str) -> None:
+        container = self.state.find_container(ref)
+        if container is None:
+            return self._not_found(f"container: {ref}")
+        container["State"].update(Status="exited", Running=False)
+        self.state.emit("die", container, exitCode="0")
+        self.state.emit("stop", container)
+        self._send(204)
+
+    def _wait_post(self, ref: str) -> None:
+        self._send_json(200, {"StatusCode": 0})
+
+    def _remove_delete(self, ref: str) -> None:
+        container = self.state.find_container(ref)
+        if container is None:
+            return self._not_found(f"container: {ref}")
+        del self.state.containers[container["Id"]]
+        self.state.emit("destroy", container)
+        self._send(204)
+
+    def _logs_get(self, ref: str) -> None:
+        container = self.state.find_container(ref)
+        if container is None:
+            return self._not_found(f"container: {ref}")
+
+        lines = int(self.query.get("tail", "100") or 100)
+        body = b"".join(
+            _frame(1, f"log line {index}\n".encode()) for index in range(lines)
+        )
+        self._send(200, body, "application/vnd.docker.multiplexed-stream")
+
+    def _logs_follow(self, ref: str) -> None:
+        with self.state.lock:
+            container = self.state.find_container(ref)
+        if container is None:
+            return self._not_found(f"container: {ref}")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/vnd.docker.multiplexed-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self.close_connection = True
+
+        # A line per interval, alternating streams, until the container stops;
+        # frames are split mid-character to exercise incremental decoding
+        try:
+            for index in itertools.count():
+                if self.server.stopping or not container["State"]["Running"]:
+                    break
+                stream = 2 if index % 2 else 1
+                frame = _frame(stream, f"log line {index} \u2713\n".encode())
+                for part in (frame[:-3], frame[-3:]):
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(part), part))
+                self.wfile.flush()
+                time.sleep(self.server.log_interval)
+            self.wfile.write(b"0\r\n\r\n")
+        except OSError:
+            pass
+
+    def _export_get(self, ref: str) -> None:
+        container = self.state.find_container(ref)
+        if container is None:
+            return self._not_found(f"container: {ref}")
+        self._send(200, self.server.rootfs, "application/x-tar")
+
+    def _rename_post(self, ref: str) -> None:
+        container = self.state.find_container(ref)
+        if container is None:
+            return self._not_found(f"container: {ref}")
+        old_name = container["Name"]
+        container["Name"] = f"/{self.query.get('name')}"
+        self.state.emit("rename", container, oldName=old_name)
+        self._send(204)
+
+    def _events_get(self) -> None:
+        events: "queue.Queue" = queue.Queue()
+        with self.state.lock:
+            self.state.subscribers.append(events)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self.close_connection = True
+
+        try:
+            while not self.server.stopping:
+                try:
+                    event = events.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if event is None:
+                    break
+                data = json.dumps(event).encode("utf-8") + b"\n"
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.write(b"0\r\n\r\n")
+        except OSError:
+            pass
+        finally:
+            with self.state.lock:
+                self.state.subscribers.remove(events)
+
+    # Exec
+
+    def _exec_create_post(self, ref: str) -> None:
+        container = self.state.find_container(ref)
+        if container is None:
+            return self._not_found(f"container: {ref}")
+
+        exec_id = self.state.new_id()
+        self.state.execs[exec_id] = {"ID": exec_id, "Cmd": (self.body or {}).get("Cmd")}
+        self._send_json(201, {"Id": exec_id})
+
+    def _exec_start_post(self, exec_id: str) -> None:
+        if exec_id not in self.state.execs:
+            return self._not_found(f"exec instance: {exec_id}")
+
+        # Like the daemon, hijack the connection and stream raw frames
+        self.send_response(101, "UPGRADED")
+        self.send_header("Content-Type", "application/vnd.docker.raw-stream")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Upgrade", "tcp")
+        self.end_headers()
+        self.wfile.flush()
+
+        # The SDK reads frames from the raw socket after parsing headers,
+        # so they must not arrive in the same read as the headers
+        time.sleep(0.005)
+        self.wfile.write(_frame(1, b"Reading package lists... Done\n"))
+        self.wfile.flush()
+        self.close_connection = True
+
+    def _exec_inspect_get(self, exec_id: str) -> None:
+        if exec_id not in self.state.execs:
+            return self._not_found(f"exec instance: {exec_id}")
+        self._send_json(200, {"ID": exec_id, "Running": False, "ExitCode": 0})
+
+    # Images
+
+    def _pull_post(self) -> None:
+        if self.query.get("fromSrc") == "-":
+            return self._import_post()
+
+        repository = self.query.get("fromImage", "")
+        tag = self.query.get("tag") or "latest"
+        reference = f"{repository}:{tag}"
+
+        if self.state.find_image(reference) is None:
+            self.state.add_image(reference, self.server.image_size)
+
+        progress = [
+            {"status": f"Pulling from library/{repository}", "id": tag},
+            {"status": f"Status: Image is up to date for {reference}"},
+        ]
+        body = b"".join(json.dumps(event).encode() + b"\r\n" for event in progress)
+        self._send(200, body)
+
+    def _image_inspect_get(self, ref: str) -> None:
+        image = self.state.find_image(ref)
+        if image is None:
+            return self._not_found(f"image: {ref}")
+        self._send_json(200, image)
+
+    def _image_list_get(self) -> None:
+        self._send_json(
+            200,
+            [
+                {
+                    "Id": image["Id"],
+                    "RepoTags": image["RepoTags"],
+                    "RepoDigests": image["RepoDigests"],
+                    "Size": image["Size"],
+                    "Labels": image["Config"]["Labels"],
+                }
+                for image in self.state.images.values()
+            ],
+        )
+
+    def _image_tag_post(self, ref: str) -> None:
+        image = self.state.find_image(ref)
+        if image is None:
+            return self._not_found(f"image: {ref}")
+
+        tag = f"{self.query.get('repo')}:{self.query.get('tag') or 'latest'}"
+        for other in self.state.images.values():
+            if tag in other["RepoTags"]:
+                other["RepoTags"].remove(tag)
+        image["RepoTags"].append(tag)
+        self._send(201)
+
+    def _image_remove_delete(self, ref: str) -> None:
+        image = self.state.find_image(ref)
+        if image is None:
+            return self._not_found(f"image: {ref}")
+        del self.state.images[image["Id"]]
+        self._send_json(200, [{"Deleted": image["Id"]}])
+
+    def _commit_post(self) -> None:
+        container = self.state.find_container(self.query.get("container", ""))
+        if container is None:
+            return self._not_found(f"container: {self.query.get('container')}")
+
+        tag = f"{self.query.get('repo')}:{self.query.get('tag') or 'latest'}"
+        image = self.state.add_image(
+            tag, container["Size"] + self.server.layer_size, parent=container["Image"]
+        )
+        image["Config"]["Labels"] = dict(((self.body or {}).get("Labels")) or {})
+        container["Size"] = image["Size"]
+        self._send_json(201, {"Id": image["Id"]})
+
+    def _import_post(self) -> None:
+        tag = f"{self.query.get('repo')}:{self.query.get('tag') or 'latest'}"
+        image = self.state.add_image(tag, len(self.body or b""))
+
+        # Only the instructions a squash passes on are kept
+        for change in self.query_lists.get("changes", []):
+            instruction, _, argument = change.partition(" ")
+            key, _, value = argument.partition("=")
+            if instruction == "LABEL":
+                image["Config"]["Labels"][json.loads(key)] = json.loads(value)
+            elif instruction == "ENV":
+                image["Config"]["Env"].append(f"{key}={json.loads(value)}")
+            elif instruction == "CMD":
+                image["Config"]["Cmd"] = json.loads(argument)
+        self._send_json(200, {"status": image["Id"]})
+
+
+class FakeEngine(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Fake Engine API listening on a unix socket.
+
+    Args:
+        socket_path: Socket to listen on, a temp path if omitted
+        latencies: Seconds to sleep per endpoint group, see DEFAULT_LATENCIES
+        image_size: Size reported for pulled images
+        layer_size: Size each commit adds to an image
+        rootfs_size: Size of the tar archive served by container export
+        log_interval: Seconds between lines of followed container logs
+    """
+
+    daemon_threads = True
+
+    routes = [
+        (r"/_ping", "GET", "ping"),
+        (r"/_ping", "HEAD", "ping"),
+        (r"/containers/json", "GET", "list"),
+        (r"/containers/create", "POST", "create"),
+        (r"/containers/([^/]+)/json", "GET", "inspect"),
+        (r"/containers/([^/]+)/start", "POST", "start"),
+        (r"/containers/([^/]+)/stop", "POST", "stop"),
+        (r"/containers/([^/]+)/wait", "POST", "wait"),
+        (r"/containers/([^/]+)/logs", "GET", "logs"),
+        (r"/containers/([^/]+)/export", "GET", "export"),
+        (r"/containers/([^/]+)/rename", "POST", "rename"),
+        (r"/containers/([^/]+)/exec", "POST", "exec_create"),
+        (r"/containers/([^/]+)", "DELETE", "remove"),
+        (r"/exec/([^/]+)/start", "POST", "exec_start"),
+        (r"/exec/([^/]+)/json", "GET", "exec_inspect"),
+        (r"/images/create", "POST", "pull"),
+        (r"/images/json", "GET", "image_list"),
+        (r"/images/(.+)/json", "GET", "image_inspect"),
+        (r"/images/(.+)/tag", "POST", "image_tag"),
+        (r"/images/(.+)", "DELETE", "image_remove"),
+        (r"/commit", "POST", "commit"),
+        (r"/images/load", "POST", "import"),
+        (r"/events", "GET", "events"),
+    ]
+
+    # Endpoint handlers sharing a latency group
+    _latency_groups = {
+        "ping": "inspect",
+        "wait": "inspect",
+        "rename": "inspect",
+        "image_inspect": "inspect",
+        "image_list": "list",
+        "image_tag": "commit",
+        "image_remove": "remove",
+        "exec_create": "exec",
+        "exec_start": "exec",
+        "exec_inspect": "inspect",
+        "import": "commit",
+        "events": "inspect",
+    }
+
+    def __init__(
+        self,
+        socket_path: Optional[str] = None,
+        latencies: Optional[Dict[str, float]] = None,
+        image_size: int = 80 * 1024 * 1024,
+        layer_size: int = 20 * 1024 * 1024,
+        rootfs_size: int = 8 * 1024 * 1024,
+        log_interval: float = 0.01,
+    ):
+        if socket_path is None:
+            socket_path = os.path.join(
+                tempfile.mkdtemp(prefix="fake-engine-"), "docker.sock"
+            )
+
+        self.socket_path = socket_path
+        self.latencies = {**DEFAULT_LATENCIES, **(latencies or {})}
+        self.image_size = image_size
+        self.layer_size = layer_size
+        self.rootfs = self._make_rootfs(rootfs_size)
+        self.log_interval = log_interval
+        self.state = _EngineState()
+        self.stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+        super().__init__(socket_path, _EngineHandler)
+
+    @property
+    def base_url(self) -> str:
+        return f"unix://{self.socket_path}"
+
+    def sleep(self, name: str) -> None:
+        delay = self.latencies.get(self._latency_groups.get(name, name), 0.0)
+        if delay:
+            time.sleep(delay)
+
+    def start(self) -> "FakeEngine":
+        """
+        Serve in a background thread.
+        """
+        self._thread = threading.Thread(
+            target=self.serve_forever, name="FakeEngine", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Stop serving and remove the socket.
+        """
+        self.stopping = True
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def drop_event_streams(self) -> None:
+        """
+        End every open event stream, as a daemon restart would.
+        """
+        with self.state.lock:
+            for subscriber in self.state.subscribers:
+                subscriber.put(None)
+
+    def __enter__(self) -> "FakeEngine":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+    @staticmethod
+    def _make_rootfs(size: int) -> bytes:
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w") as tar:
+            for index in range(max(1, size // (64 * 1024))):
+                info = tarfile.TarInfo(f"usr/share/fake/{index:06d}")
+                info.size = 64 * 1024
+                tar.addfile(info, io.BytesIO(os.urandom(info.size)))
+        return buffer.getvalue()
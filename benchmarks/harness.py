@@ -0,0 +1,139 @@
+"""
+Timing helpers and JSON result files for benchmarks.
+"""
+
+# Imports from standard library
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+
+@dataclass
+class BenchmarkResult:
+    """
+    Timings of one benchmark in seconds.
+    """
+
+    name: str
+    samples: List[float]
+    unit: str = "s"
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def summary(self) -> Dict[str, float]:
+        ordered = sorted(self.samples)
+        return {
+            "count": len(ordered),
+            "mean": statistics.fmean(ordered),
+            "median": statistics.median(ordered),
+            "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+            "min": ordered[0],
+            "max": ordered[-1],
+            "stdev": statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["summary"] = self.summary
+        return data
+
+
+def measure(
+    name: str,
+    fn: Callable[[], Any],
+    iterations: int,
+    warmup: int = 1,
+    setup: Optional[Callable[[], Any]] = None,
+    **extra,
+) -> BenchmarkResult:
+    """
+    Time `iterations` calls of fn after `warmup` untimed calls.
+
+    `setup` runs untimed before every call.
+    """
+    for _ in range(warmup):
+        if setup is not None:
+            setup()
+        fn()
+
+    samples = []
+    for _ in range(iterations):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+
+    return BenchmarkResult(name=name, samples=samples, extra=extra)
+
+
+def environment() -> Dict[str, Any]:
+    """
+    Describe the machine and revision a run was made on.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def save_results(
+    results: List[BenchmarkResult], path: str, settings: Dict[str, Any]
+) -> None:
+    """
+    Write a run to a JSON file.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    document = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": environment(),
+        "settings": settings,
+        "results": {result.name: result.to_dict() for result in results},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+
+
+def compare(
+    results: List[BenchmarkResult], baseline_path: str
+) -> List[Dict[str, Optional[float]]]:
+    """
+    Compare medians against a previous run.
+
+    Returns:
+        Rows with the baseline and current medians and their ratio
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+
+    rows = []
+    for result in results:
+        current = result.summary["median"]
+        previous = baseline.get(result.name, {}).get("summary", {}).get("median")
+        rows.append(
+            {
+                "name": result.name,
+                "baseline": previous,
+                "current": current,
+                "ratio": current / previous if previous else None,
+            }
+        )
+    return rows
@@ -0,0 +1,333 @@
+"""
+Run the benchmark suite.
+
+Usage:
+    python -m benchmarks.run [--iterations N] [--latency exec=0.05 ...]
+                             [--only NAME ...] [--output PATH] [--compare PATH]
+
+Docker benchmarks run against the bundled fake Engine API, so no daemon
+is needed. Results are written as JSON to benchmarks/results/ unless
+--output is given; --compare prints median ratios against an earlier run.
+"""
+
+# Imports from standard library
+import argparse
+import itertools
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+# Imports from local modules
+from benchmarks.fake_engine import DEFAULT_LATENCIES, FakeEngine
+from benchmarks.harness import BenchmarkResult, compare, measure, save_results
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def bench_application_startup(args: argparse.Namespace) -> List[BenchmarkResult]:
+    """
+    Cold `Application()` construction in a fresh interpreter.
+    """
+    code = "from app.core.application.application import Application; Application()"
+    command = [sys.executable, "-c", code]
+
+    def start() -> None:
+        subprocess.run(
+            command,
+            cwd=PROJECT_ROOT,
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+    return [measure("application_startup", start, args.iterations)]
+
+
+def bench_commander(args: argparse.Namespace) -> List[BenchmarkResult]:
+    """
+    CommandExecutor.execute throughput for a trivial command and for a
+    command with a lot of output.
+    """
+    from app.core.base.commander import CommandExecutor
+
+    executor = CommandExecutor(_quiet_logger())
+    calls = args.iterations * 10
+
+    quick = measure("commander_execute_true", lambda: executor.execute("true"), calls)
+    quick.extra["calls_per_second"] = len(quick.samples) / sum(quick.samples)
+
+    output = measure(
+        "commander_execute_seq_100k",
+        lambda: executor.execute("seq 1 100000"),
+        args.iterations,
+    )
+    return [quick, output]
+
+
+def bench_logger(args: argparse.Namespace) -> List[BenchmarkResult]:
+    """
+    get_logger cost and per-record cost with console and file handlers.
+    """
+    from app.core.base.logger import LogConfig, get_logger
+
+    directory = tempfile.mkdtemp(prefix="bench-logs-")
+    names = itertools.count()
+    results = []
+
+    def config(name: str) -> "LogConfig":
+        return LogConfig(
+            name=name,
+            handlers=["console", "file"],
+            file_config={"path": directory, "max_bytes": 10 * 1024 * 1024},
+            use_colors=False,
+        )
+
+    # Repeated calls for one name, as every service's getChild parent does
+    repeated = config("bench_repeated")
+    result = measure("get_logger_repeated", lambda: get_logger(repeated), 200)
+    result.extra["handlers_after"] = len(logging.getLogger("bench_repeated").handlers)
+    results.append(result)
+
+    results.append(
+        measure(
+            "get_logger_new",
+            lambda: get_logger(config(f"bench_new_{next(names)}")),
+            200,
+        )
+    )
+
+    # Record emission, direct and through the queue listener; console
+    # output goes to /dev/null
+    records = 1000
+    with open(os.devnull, "w") as devnull:
+        variants = (("logger_info_1000", False), ("logger_info_1000_queue", True))
+        for name, use_queue in variants:
+            logger_config = config(f"bench_emit_{name}")
+            logger_config.use_queue = use_queue
+            logger = get_logger(logger_config)
+
+            handlers = _handlers_of(logger)
+            for handler in handlers:
+                if type(handler).__name__.endswith("StreamHandler"):
+                    handler.setStream(devnull)
+
+            def emit() -> None:
+                for index in range(records):
+                    logger.info("Benchmark record %s", index)
+
+            # Queued timings are the caller's cost only
+            result = measure(name, emit, args.iterations)
+            result.extra["handlers"] = [type(handler).__name__ for handler in handlers]
+            results.append(result)
+
+            listener = _listener_of(logger)
+            if listener is not None:
+                listener.stop()
+
+    return results
+
+
+def bench_build_os(args: argparse.Namespace) -> List[BenchmarkResult]:
+    """
+    End-to-end OSBuilderService.build_os against the fake engine.
+
+    Cold builds install a unique package set, cached builds reuse one
+    through the image cache, and rebuilds change one package of an
+    existing OS. Warm builds are cold builds claiming a container from a
+    filled warm pool.
+    """
+    from app.services.container_manager import ContainerManagerService
+    from app.services.docker_service import DockerService, DockerServiceConfig
+    from app.services.metrics_service import MetricsService
+    from app.services.image_cache_service import ImageCacheConfig, ImageCacheService
+    from app.services.os_builder_service import (
+        OSBuildConfig,
+        OSBuilderService,
+        OSBuilderServiceConfig,
+    )
+
+    latencies = {**DEFAULT_LATENCIES, **args.latency}
+    workdir = tempfile.mkdtemp(prefix="bench-build-")
+    logger = _quiet_logger()
+    counter = itertools.count()
+
+    with FakeEngine(
+        os.path.join(workdir, "docker.sock"), latencies=latencies
+    ) as engine:
+        docker_service = DockerService(
+            logger,
+            DockerServiceConfig(
+                base_url=engine.base_url, version="1.43", timeout=30
+            ),
+        )
+        container_manager = ContainerManagerService(logger, docker_service)
+        image_cache = ImageCacheService(
+            logger,
+            docker_service,
+            ImageCacheConfig(index_path=os.path.join(workdir, "image_cache.json")),
+        )
+        builder = OSBuilderService(
+            logger,
+            container_manager,
+            OSBuilderServiceConfig(manifest_path=os.path.join(workdir, "manifests")),
+            image_cache=image_cache,
+        )
+
+        def config(name: str, packages: List[str]) -> OSBuildConfig:
+            return OSBuildConfig(
+                name=name,
+                distro="ubuntu",
+                release="22.04",
+                architecture="amd64",
+                packages=packages,
+            )
+
+        def cold() -> None:
+            index = next(counter)
+            builder.build_os(config(f"cold_{index}", ["curl", f"pkg{index}"]))
+
+        def cached() -> None:
+            builder.build_os(config(f"cached_{next(counter)}", ["curl", "git"]))
+
+        builder.build_os(config("rebuild", ["curl"]))
+
+        def rebuild() -> None:
+            builder.build_os(config("rebuild", ["curl", f"pkg{next(counter)}"]))
+
+        metrics = MetricsService(logger)
+        warm_builder = OSBuilderService(
+            logger,
+            container_manager,
+            OSBuilderServiceConfig(
+                manifest_path=os.path.join(workdir, "manifests"),
+                warm_pool_size=1,
+                warm_pool_targets=["ubuntu:22.04/amd64"],
+            ),
+            metrics=metrics,
+        )
+        warm_builder.start()
+        idle = metrics.gauge("warm_pool_idle", "Idle warm containers", ["target"])
+
+        def wait_for_pool() -> None:
+            while idle.value(target="ubuntu:22.04/amd64") < 1:
+                time.sleep(0.001)
+
+        def warm() -> None:
+            index = next(counter)
+            warm_builder.build_os(config(f"warm_{index}", ["curl", f"pkg{index}"]))
+
+        results = [
+            measure("build_os_cold", cold, args.iterations, warmup=0),
+            measure("build_os_cached", cached, args.iterations),
+            measure("build_os_rebuild", rebuild, args.iterations, warmup=0),
+            measure("build_os_warm", warm, args.iterations, setup=wait_for_pool),
+        ]
+        warm_builder.stop()
+
+    for result in results:
+        result.extra["latencies"] = latencies
+    return results
+
+
+BENCHMARKS: Dict[str, Callable[[argparse.Namespace], List[BenchmarkResult]]] = {
+    "startup": bench_application_startup,
+    "commander": bench_commander,
+    "logger": bench_logger,
+    "build_os": bench_build_os,
+}
+
+
+def _listener_of(logger: logging.Logger):
+    from app.core.base.logger.logger import _queue_listeners
+
+    return _queue_listeners.get(logger.name)
+
+
+def _handlers_of(logger: logging.Logger) -> List[logging.Handler]:
+    """
+    Handlers writing a logger's records, including those behind a queue.
+    """
+    listener = _listener_of(logger)
+    return list(logger.handlers) + list(listener.handlers if listener else [])
+
+
+def _quiet_logger() -> logging.Logger:
+    logger = logging.getLogger("benchmarks")
+    logger.addHandler(logging.NullHandler())
+    logger.setLevel(logging.WARNING)
+    logger.propagate = False
+    return logger
+
+
+def _parse_latency(value: str):
+    name, _, seconds = value.partition("=")
+    if name not in DEFAULT_LATENCIES:
+        raise argparse.ArgumentTypeError(
+            f"Unknown latency {name}, expected one of {', '.join(DEFAULT_LATENCIES)}"
+        )
+    return name, float(seconds)
+
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run linux_builder benchmarks")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument(
+        "--only", nargs="+", choices=sorted(BENCHMARKS), default=list(BENCHMARKS)
+    )
+    parser.add_argument(
+        "--latency",
+        type=_parse_latency,
+        action="append",
+        default=[],
+        help="Fake engine latency in seconds, e.g. exec=0.05 (repeatable)",
+    )
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/)")
+    parser.add_argument("--compare", help="Earlier result file to compare against")
+
+    args = parser.parse_args(argv)
+    args.latency = dict(args.latency)
+    return args
+
+
+def main(argv: List[str] = None) -> int:
+    args = parse_args(argv)
+    os.chdir(PROJECT_ROOT)
+
+    results: List[BenchmarkResult] = []
+    for name in args.only:
+        print(f"Running {name}...", file=sys.stderr)
+        results += BENCHMARKS[name](args)
+
+    for result in results:
+        summary = result.summary
+        print(
+            f"{result.name:32} median {summary['median'] * 1000:10.3f} ms"
+            f"   p95 {summary['p95'] * 1000:10.3f} ms   n={summary['count']}"
+        )
+
+    output = args.output or os.path.join(
+        PROJECT_ROOT, "benchmarks", "results", time.strftime("%Y%m%d-%H%M%S.json")
+    )
+    save_results(
+        results,
+        output,
+        {"iterations": args.iterations, "only": args.only, "latency": args.latency},
+    )
+    print(f"Results written to {output}", file=sys.stderr)
+
+    if args.compare:
+        print()
+        for row in compare(results, args.compare):
+            ratio = f"{row['ratio']:.2f}x" if row["ratio"] else "n/a"
+            print(f"{row['name']:32} {ratio}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())